@@ -0,0 +1,142 @@
+"""Logging overhead per request under concurrency.
+
+    python benchmarks/logging_overhead.py
+    python benchmarks/logging_overhead.py --threads 32 --sink-delay-ms 2
+
+Worker threads run simulated requests that each write a few log lines with
+phone numbers and OTPs in them, the way the auth and ticket handlers do. Output
+goes to a sink whose writes take --sink-delay-ms, standing in for a stdout pipe
+that a busy log drain has backed up. Each mode is timed per request:
+
+    off              logging disabled - the cost of the request itself
+    print            synchronous print() of a JSON line, as before the logging change
+    sync handler     the JSON formatter and redaction on the request thread
+    queued           the queue handler from configure_logging()
+    queued, sampled  the same on a /tickets path, sampled at LOG_SAMPLE_TICKETS
+
+No database is needed.
+"""
+import argparse
+import atexit
+import json
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('HEALTH_PROBE_INTERVAL', '0')
+
+import main
+
+class SlowSink:
+    """File-like object whose writes block for a fixed time, like a full pipe"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.lines = 0
+
+    def write(self, text):
+        with self.lock:
+            if self.delay:
+                time.sleep(self.delay)
+            self.lines += text.count('\n')
+        return len(text)
+
+    def flush(self):
+        pass
+
+def print_lines(sink, technician_id):
+    print(json.dumps({"msg": "OTP sent", "contact": "9876543210", "otp": "123456"}), file=sink)
+    print(json.dumps({"msg": "Ticket status updated", "technician_id": technician_id, "ticket_id": 42}), file=sink)
+    print(json.dumps({"msg": "Parts used", "ticket_id": 42, "parts": 3}), file=sink)
+
+def log_lines(technician_id):
+    main.log.info("OTP sent", contact="9876543210", otp="123456")
+    main.log.info("Ticket status updated", ticket_id=42)
+    main.log.info("Parts used", ticket_id=42, parts=3)
+
+def worker(app, mode, path, sink, requests, latencies):
+    technician_id = threading.get_ident() % 1000
+    for _ in range(requests):
+        started = time.perf_counter()
+        with app.test_request_context(path):
+            main.assign_request_id()
+            main.g.technician_id = technician_id
+            if mode == 'print':
+                print_lines(sink, technician_id)
+            elif mode != 'off':
+                log_lines(technician_id)
+        latencies.append(time.perf_counter() - started)
+
+def stop_listener():
+    """Drain and stop the queue listener configure_logging() started"""
+    if main._log_listener:
+        main._log_listener.stop()
+        atexit.unregister(main._log_listener.stop)
+        main._log_listener = None
+
+def use_handler(mode, sink):
+    """Point the 'ostrich' logger at the sink the way `mode` logs"""
+    logger = logging.getLogger('ostrich')
+    stop_listener()
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    main._log_handler = main._log_listener = main._log_pid = None
+    logger.setLevel(logging.CRITICAL if mode in ('off', 'print') else logging.INFO)
+    if mode == 'sync handler':
+        handler = logging.StreamHandler(sink)
+        handler.setFormatter(main.JsonFormatter())
+        handler.addFilter(main.RequestContextFilter())
+        logger.addHandler(handler)
+        logger.propagate = False
+    elif mode.startswith('queued'):
+        stdout, sys.stdout = sys.stdout, sink
+        try:
+            main.configure_logging()
+        finally:
+            sys.stdout = stdout
+
+def run_mode(app, mode, args):
+    sink = SlowSink(args.sink_delay_ms / 1000)
+    use_handler(mode, sink)
+    path = main.API_PREFIX + ('/tickets/42/status' if mode == 'queued, sampled' else '/auth/send-otp')
+    latencies = []
+    threads = [threading.Thread(target=worker, args=(app, mode, path, sink, args.requests, latencies))
+               for _ in range(args.threads)]
+    clock = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - clock
+    dropped = main.logging_stats()['dropped']
+    stop_listener()
+    latencies.sort()
+    return {
+        "per_second": len(latencies) / elapsed,
+        "p50": statistics.median(latencies) * 1e6,
+        "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1e6,
+        "written": sink.lines,
+        "dropped": dropped,
+    }
+
+def run(args):
+    app = main.create_app({'TESTING': True})
+    print(f"{args.threads} threads x {args.requests} requests, 3 log lines each, sink write {args.sink_delay_ms} ms")
+    print(f"{'mode':16} {'req/s':>9} {'p50 us':>9} {'p99 us':>10} {'written':>8} {'dropped':>8}")
+    for mode in ('off', 'print', 'sync handler', 'queued', 'queued, sampled'):
+        result = run_mode(app, mode, args)
+        print(f"{mode:16} {result['per_second']:9.0f} {result['p50']:9.1f} {result['p99']:10.1f} "
+              f"{result['written']:8} {result['dropped']:8}")
+    return 0
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Logging overhead benchmark')
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=500, help='Requests per thread')
+    parser.add_argument('--sink-delay-ms', type=float, default=0.2, help='Time each write to the log sink blocks')
+    sys.exit(run(parser.parse_args()))
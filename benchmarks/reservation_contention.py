@@ -0,0 +1,134 @@
+"""Contention benchmark for stock reservations.
+
+    DB_HOST=127.0.0.1 DB_NAME=ostrich_service_test DB_SSL=false python benchmarks/reservation_contention.py
+    python benchmarks/reservation_contention.py --threads 32 --parts 3 --stock 200
+
+Many technicians reserve overlapping sets of the same few parts at once, the
+way a busy warehouse sees it. Each reservation goes through reserve_parts in
+its own transaction. The run prints throughput and latency, counts shortages
+and deadlocks, and then checks that no part was oversold. It writes BENCH-*
+rows and removes them afterwards, and refuses to run unless DB_NAME ends in
+_test.
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+import pymysql
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+import migrations
+
+PART_PREFIX = 'BENCH-'
+
+def setup(cursor, parts, stock):
+    cursor.executemany("""
+        INSERT INTO inventory (part_number, name, category, quantity_available, quantity_reserved, unit_cost, location)
+        VALUES (%s, %s, 'Benchmark', %s, 0, 1.00, 'Warehouse')
+        ON DUPLICATE KEY UPDATE quantity_available = VALUES(quantity_available), quantity_reserved = 0
+    """, [(f"{PART_PREFIX}{n:04d}", f"Benchmark part {n}", stock) for n in range(parts)])
+    cursor.execute("SELECT id FROM inventory WHERE part_number LIKE %s ORDER BY id", (PART_PREFIX + '%',))
+    return [row[0] for row in cursor.fetchall()][:parts]
+
+def cleanup(cursor):
+    cursor.execute("DELETE FROM inventory_reservations WHERE request_id LIKE %s", (PART_PREFIX + '%',))
+    cursor.execute("DELETE FROM inventory WHERE part_number LIKE %s", (PART_PREFIX + '%',))
+
+def worker(number, part_ids, args, results):
+    rng = random.Random(number)
+    latencies, shortages, deadlocks = [], 0, 0
+    for attempt in range(args.requests):
+        parts = [{"part_id": part_id, "quantity": rng.randint(1, 3)}
+                 for part_id in rng.sample(part_ids, min(args.parts_per_request, len(part_ids)))]
+        started = time.perf_counter()
+        with main.get_db_connection(read_only=False) as conn:
+            cursor = conn.cursor()
+            try:
+                main.reserve_parts(cursor, number, f"{PART_PREFIX}{number}-{attempt}", parts)
+                conn.commit()
+            except main.InsufficientStock:
+                conn.rollback()
+                shortages += 1
+            except pymysql.err.OperationalError as e:
+                conn.rollback()
+                if e.args[0] != 1213:
+                    raise
+                deadlocks += 1
+            cursor.close()
+        latencies.append(time.perf_counter() - started)
+    results[number] = (latencies, shortages, deadlocks)
+
+def check_stock(cursor, part_ids, stock):
+    """Problems found: stock below zero, or stock + reservations not adding up to the start"""
+    placeholders = ', '.join(['%s'] * len(part_ids))
+    cursor.execute(f"""
+        SELECT i.id, i.quantity_available, i.quantity_reserved, COALESCE(SUM(v.quantity), 0)
+        FROM inventory i LEFT JOIN inventory_reservations v ON v.part_id = i.id AND v.status = 'reserved'
+        WHERE i.id IN ({placeholders}) GROUP BY i.id, i.quantity_available, i.quantity_reserved
+    """, part_ids)
+    problems = []
+    for part_id, available, reserved, held in cursor.fetchall():
+        if available < 0 or reserved != held or available + reserved != stock:
+            problems.append(f"part {part_id}: available {available}, reserved {reserved}, held by reservations {held}")
+    return problems
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def run(args):
+    if not main.DB_CONFIG['database'].endswith('_test'):
+        print("DB_NAME must end in _test - the benchmark writes to inventory")
+        return 1
+    if migrations.upgrade() != 0:
+        return 1
+    with main.get_db_connection(read_only=False) as conn:
+        if not conn:
+            print("Database connection failed")
+            return 1
+        cursor = conn.cursor()
+        cleanup(cursor)
+        part_ids = setup(cursor, args.parts, args.stock)
+        conn.commit()
+
+        results = {}
+        threads = [threading.Thread(target=worker, args=(number, part_ids, args, results)) for number in range(args.threads)]
+        clock = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - clock
+
+        conn.rollback()
+        problems = check_stock(cursor, part_ids, args.stock)
+        cleanup(cursor)
+        conn.commit()
+        cursor.close()
+
+    latencies = sorted(latency for result in results.values() for latency in result[0])
+    shortages = sum(result[1] for result in results.values())
+    deadlocks = sum(result[2] for result in results.values())
+    print(f"{args.threads} threads x {args.requests} requests over {args.parts} parts "
+          f"({args.parts_per_request} per request, {args.stock} in stock each)")
+    print(f"{len(latencies) / elapsed:.0f} reservations/s, p50 {percentile(latencies, 0.5) * 1000:.1f} ms, "
+          f"p95 {percentile(latencies, 0.95) * 1000:.1f} ms, p99 {percentile(latencies, 0.99) * 1000:.1f} ms")
+    print(f"{shortages} refused for insufficient stock, {deadlocks} deadlocks")
+    for problem in problems:
+        print(f"OVERSOLD {problem}")
+    return 1 if problems or deadlocks else 0
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Stock reservation contention benchmark')
+    parser.add_argument('--threads', type=int, default=16, help='Concurrent technicians')
+    parser.add_argument('--requests', type=int, default=50, help='Reservations per technician')
+    parser.add_argument('--parts', type=int, default=4, help='Distinct parts everyone draws from')
+    parser.add_argument('--parts-per-request', type=int, default=3)
+    parser.add_argument('--stock', type=int, default=500, help='Starting stock per part')
+    args = parser.parse_args()
+    main.db_pool.size = max(main.db_pool.size, args.threads)
+    sys.exit(run(args))
@@ -0,0 +1,74 @@
+"""Cold-start benchmark: import time, create_app() time and time to first request.
+
+    python benchmarks/startup.py               # 10 fresh interpreters per scenario
+    python benchmarks/startup.py --runs 30
+
+Every run starts a new interpreter, the way a restarted dyno or worker does, and
+times `import main`, `create_app()`, the first GET /health and the first fetch
+of the OpenAPI spec. Scenarios cover the spec built on demand, loaded from a
+prebuilt cache file, and Swagger switched off as in production. No database is
+needed; the health probe is disabled.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the fresh interpreter; prints one JSON line of timings in milliseconds
+CHILD = '''
+import json, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+app = main.create_app({'TESTING': True})
+created = time.perf_counter()
+client = app.test_client()
+client.get('/health')
+first_request = time.perf_counter()
+spec = client.get(main.API_PREFIX + '/swagger.json')
+first_spec = time.perf_counter()
+print(json.dumps({
+    'import': (imported - started) * 1000,
+    'create_app': (created - imported) * 1000,
+    'first_request': (first_request - created) * 1000,
+    'first_spec': (first_spec - first_request) * 1000 if spec.status_code == 200 else None,
+}))
+'''
+
+def run_once(env):
+    output = subprocess.run([sys.executable, '-c', CHILD], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+def scenarios(workdir):
+    cache_path = os.path.join(workdir, 'openapi.json')
+    base = dict(os.environ, HEALTH_PROBE_INTERVAL='0', SHARED_STATE_PATH=os.path.join(workdir, 'shared.db'),
+                LOG_LEVEL='WARNING')
+    return [
+        ('spec built on demand', dict(base, OPENAPI_CACHE_PATH=''), None),
+        ('spec from cache file', dict(base, OPENAPI_CACHE_PATH=cache_path), cache_path),
+        ('swagger disabled', dict(base, SWAGGER_ENABLED='false', OPENAPI_CACHE_PATH=''), None),
+    ]
+
+def main(runs):
+    with tempfile.TemporaryDirectory(prefix='ostrich-startup-') as workdir:
+        print(f"{'scenario':22} {'import':>9} {'create_app':>11} {'1st request':>12} {'1st spec':>9}  (median ms of {runs})")
+        for name, env, cache_path in scenarios(workdir):
+            if cache_path:
+                run_once(env)  # Builds the cache file the measured runs load
+            timings = [run_once(env) for _ in range(runs)]
+            cells = []
+            for key in ('import', 'create_app', 'first_request', 'first_spec'):
+                values = [timing[key] for timing in timings if timing[key] is not None]
+                cells.append(f"{statistics.median(values):.1f}" if values else "-")
+            print(f"{name:22} {cells[0]:>9} {cells[1]:>11} {cells[2]:>12} {cells[3]:>9}")
+    return 0
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Cold-start benchmark')
+    parser.add_argument('--runs', type=int, default=10, help='Fresh interpreters per scenario')
+    sys.exit(main(parser.parse_args().runs))
@@ -1,24 +1,46 @@
+import abc
+import atexit
 import bcrypt
-from flask import Flask, request, jsonify
+import bisect
+from flask import Flask, Response, copy_current_request_context, current_app, g, has_app_context, has_request_context, request, jsonify
 from flask_cors import CORS
 from flask_restx import Api, Resource, fields, Namespace
 import os
 import jwt
+import hashlib
+import hmac
+import itertools
+import json
+import logging
+import math
+import mmap
+import queue
+import random
+import re
+import sqlite3
+import struct
+import sys
+import tempfile
+import threading
+import time
+import uuid
 from datetime import datetime, timedelta, timezone
 from functools import wraps
+from logging.handlers import QueueHandler, QueueListener
 import pymysql
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 from dotenv import load_dotenv
 
+try:
+    import fcntl
+except ImportError:  # Windows dev machines - limiter state stays per process
+    fcntl = None
+
 # Load environment variables
 load_dotenv()
 
-# Create Flask app first
-app = Flask(__name__)
-CORS(app, origins="*", allow_headers=["Content-Type", "Authorization"], methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"])
-
-# Add root route before API setup
-@app.route('/')
+# Root routes - registered on the app by create_app()
 def api_root():
     """Root endpoint - API information"""
     return jsonify({
@@ -26,9 +48,9 @@ def api_root():
         "status": True,
         "data": {
             "version": "1.0.0",
-            "docs": "/docs/",
+            "docs": "/docs/" if current_app.config['SWAGGER_ENABLED'] else None,
             "endpoints": {
-                "swagger_ui": "/docs/",
+                "swagger_ui": "/docs/" if current_app.config['SWAGGER_ENABLED'] else None,
                 "health": "/health",
                 "auth": "/auth/",
                 "dashboard": "/dashboard/",
@@ -42,48 +64,42 @@ def api_root():
         }
     })
 
-@app.route('/health')
 def health_check():
-    return jsonify({
-        "message": "Service is healthy",
-        "status": True,
+    if not health_status:
+        probe_databases()
+    databases = dict(health_status)
+    primary_up = databases.get('primary', {}).get('status') == 'up'
+    response = jsonify({
+        "message": "Service is healthy" if primary_up else "Database unavailable",
+        "status": primary_up,
         "data": {
             "service": "ostrich-service-api",
-            "timestamp": datetime.now().isoformat()
+            "timestamp": datetime.now().isoformat(),
+            "databases": databases,
+            "pool": db_pool.stats(),
+            "logging": logging_stats(),
+            "cache": cache_stats()
         }
     })
+    response.status_code = 200 if primary_up else 503
+    return response
 
-# Swagger API setup with comprehensive documentation
-api = Api(app, 
-    version='1.0', 
-    title='Ostrich Service Technician API',
-    description='Complete API for Service Technician Mobile App - Test all endpoints with Swagger UI',
-    doc='/docs/',
-    prefix='/api/v1',  # Add API prefix
-    authorizations={
-        'Bearer': {
-            'type': 'apiKey',
-            'in': 'header',
-            'name': 'Authorization',
-            'description': 'Add "Bearer " before your JWT token'
-        }
-    },
-    security='Bearer'
-)
-
-# Namespaces
-auth_ns = api.namespace('auth', description='Authentication Operations')
-dashboard_ns = api.namespace('dashboard', description='Dashboard & Overview')
-tickets_ns = api.namespace('tickets', description='Service Tickets Management')
-notifications_ns = api.namespace('notifications', description='Notifications')
-schedule_ns = api.namespace('schedule', description='Schedule & Calendar')
-profile_ns = api.namespace('profile', description='Technician Profile')
-reports_ns = api.namespace('reports', description='Reports & Analytics')
-inventory_ns = api.namespace('inventory', description='Parts & Inventory')
+API_PREFIX = '/api/v1'
+
+# Namespaces - added to the Api by create_app()
+auth_ns = Namespace('auth', description='Authentication Operations')
+dashboard_ns = Namespace('dashboard', description='Dashboard & Overview')
+tickets_ns = Namespace('tickets', description='Service Tickets Management')
+notifications_ns = Namespace('notifications', description='Notifications')
+schedule_ns = Namespace('schedule', description='Schedule & Calendar')
+profile_ns = Namespace('profile', description='Technician Profile')
+reports_ns = Namespace('reports', description='Reports & Analytics')
+inventory_ns = Namespace('inventory', description='Parts & Inventory')
+dispatch_ns = Namespace('dispatch', description='Nearby Tickets & Technicians')
+NAMESPACES = [auth_ns, dashboard_ns, tickets_ns, notifications_ns, schedule_ns, profile_ns, reports_ns, inventory_ns, dispatch_ns]
 
 # Configuration
 SECRET_KEY = os.getenv('SECRET_KEY', 'service-secret-key')
-app.config['SECRET_KEY'] = SECRET_KEY
 
 # Database configuration - Use environment variables for production
 DB_CONFIG = {
@@ -93,31 +109,635 @@ DB_CONFIG = {
     'database': os.getenv('DB_NAME', 'defaultdb'),
     'port': int(os.getenv('DB_PORT', 16599)),
     'charset': 'utf8mb4',
-    'ssl': {'ssl_mode': 'REQUIRED'}
+    # DB_SSL=false only for a local stand-in database, e.g. the query plan tests
+    'ssl': {'ssl_mode': 'REQUIRED'} if os.getenv('DB_SSL', 'true').lower() == 'true' else None,
+    'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', 5)),
+    'read_timeout': int(os.getenv('DB_READ_TIMEOUT', 30)),
+    'write_timeout': int(os.getenv('DB_WRITE_TIMEOUT', 30))
 }
 
+# Read replicas - "host:port,host:port"; user, password and database come from DB_CONFIG
+DB_REPLICAS = [
+    (host, int(port or DB_CONFIG['port']))
+    for host, _, port in (entry.strip().partition(':') for entry in os.getenv('DB_REPLICA_HOSTS', '').split(',') if entry.strip())
+]
+READ_YOUR_WRITES_SECONDS = float(os.getenv('READ_YOUR_WRITES_SECONDS', 5))
+_replica_counter = itertools.count()
+
+def app_setting(name, default):
+    """The running app's config value, or the environment-derived default outside an app (CLI scripts)"""
+    return current_app.config[name] if has_app_context() else default
+
+def primary_db_config():
+    return app_setting('DB_CONFIG', DB_CONFIG)
+
+# ==================== LOGGING ====================
+# Records are queued by the calling thread and written as JSON lines by one listener
+# thread per worker, so a slow stdout never blocks a request. A full queue drops
+# records (counted in /health) instead of waiting. INFO records are sampled per
+# namespace, once per request, so a kept request keeps all its lines.
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+LOG_SAMPLE_RATES = {
+    'default': 1.0,
+    'notifications': 0.1,
+    'tickets': 0.25
+}
+for _name in LOG_SAMPLE_RATES:
+    if os.getenv(f"LOG_SAMPLE_{_name.upper()}"):
+        LOG_SAMPLE_RATES[_name] = float(os.getenv(f"LOG_SAMPLE_{_name.upper()}"))
+REDACTED_FIELDS = {'otp', 'otp_code', 'password', 'password_hash', 'token', 'access_token', 'authorization', 'secret'}
+MASKED_FIELDS = {'phone', 'contact', 'phone_number'}
+_long_digits = re.compile(r'\d{6,}')
+
+def mask_value(value):
+    value = str(value)
+    return '*' * max(len(value) - 4, 0) + value[-4:]
+
+def redact(fields):
+    clean = {}
+    for name, value in fields.items():
+        if name.lower() in REDACTED_FIELDS:
+            clean[name] = '[REDACTED]'
+        elif name.lower() in MASKED_FIELDS and value:
+            clean[name] = mask_value(value)
+        elif isinstance(value, str):
+            clean[name] = _long_digits.sub(lambda m: mask_value(m.group()), value)
+        else:
+            clean[name] = value
+    return clean
+
+class StructuredLogger(logging.LoggerAdapter):
+    """log.info("Login failed", username=username) - keyword arguments become JSON fields"""
+
+    def process(self, msg, kwargs):
+        reserved = {name: kwargs.pop(name) for name in ('exc_info', 'stack_info', 'stacklevel') if name in kwargs}
+        return msg, dict(reserved, extra={'fields': kwargs})
+
+class RequestContextFilter(logging.Filter):
+    """Runs on the calling thread: attaches request ids and applies sampling"""
+
+    def filter(self, record):
+        record.request_id = record.technician_id = record.path = None
+        if not has_request_context():
+            return True
+        record.request_id = g.get('request_id')
+        record.technician_id = g.get('technician_id')
+        record.path = request.path
+        if record.levelno > logging.INFO:
+            return True
+        if 'log_sampled' not in g:
+            namespace = request.path[len(API_PREFIX) + 1:].split('/', 1)[0] if request.path.startswith(API_PREFIX + '/') else ''
+            g.log_sampled = random.random() < LOG_SAMPLE_RATES.get(namespace, LOG_SAMPLE_RATES['default'])
+        return g.log_sampled
+
+class NonBlockingQueueHandler(QueueHandler):
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Only resolve what depends on the calling thread; JSON encoding happens on the listener
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": _long_digits.sub(lambda m: mask_value(m.group()), record.getMessage())
+        }
+        for name in ('request_id', 'technician_id', 'path'):
+            if getattr(record, name, None) is not None:
+                entry[name] = getattr(record, name)
+        entry.update(redact(getattr(record, 'fields', {})))
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+log = StructuredLogger(logging.getLogger('ostrich'), {})
+_log_handler = None
+_log_listener = None
+_log_pid = None
+
+def configure_logging():
+    """Attach the queue handler and start this worker's listener thread (once per process)"""
+    global _log_handler, _log_listener, _log_pid
+    if _log_pid == os.getpid():
+        return
+    logger = logging.getLogger('ostrich')
+    if _log_handler:
+        logger.removeHandler(_log_handler)
+    
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter())
+    _log_handler = NonBlockingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+    _log_handler.addFilter(RequestContextFilter())
+    logger.addHandler(_log_handler)
+    logger.setLevel(LOG_LEVEL)
+    logger.propagate = False
+    _log_listener = QueueListener(_log_handler.queue, output)
+    _log_listener.start()
+    _log_pid = os.getpid()
+    atexit.register(_log_listener.stop)
+
+def logging_stats():
+    return {
+        "queued": _log_handler.queue.qsize() if _log_handler else 0,
+        "dropped": _log_handler.dropped if _log_handler else 0
+    }
+
+def assign_request_id():
+    """Correlate every log line of a request; honours an incoming X-Request-ID"""
+    incoming = request.headers.get('X-Request-ID', '')
+    g.request_id = incoming if 0 < len(incoming) <= 64 else uuid.uuid4().hex
+    return None
+
+def add_request_id_header(response):
+    if g.get('request_id'):
+        response.headers['X-Request-ID'] = g.request_id
+    return response
+
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 8))
+DB_POOL_IDLE_SECONDS = 300
+DB_POOL_PING_SECONDS = 30
+DB_CIRCUIT_FAILURES = int(os.getenv('DB_CIRCUIT_FAILURES', 3))
+DB_CIRCUIT_RESET_SECONDS = float(os.getenv('DB_CIRCUIT_RESET_SECONDS', 15))
+
+class RequestAborted(Exception):
+    """Ends a request early with a structured error response"""
+    status_code = 500
+    message = "Request aborted"
+
+    def data(self):
+        return None
+
+    def headers(self):
+        return {}
+
+class DatabaseUnavailable(RequestAborted):
+    """Raised instead of connecting while a database circuit is open"""
+    status_code = 503
+    message = "Database temporarily unavailable"
+
+    def __init__(self, target, retry_after):
+        super().__init__(f"Database {target} unavailable, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+    def data(self):
+        return {"retry_after": self.retry_after}
+
+    def headers(self):
+        return {'Retry-After': str(self.retry_after)}
+
+class DeadlineExceeded(RequestAborted):
+    """Raised when a request runs out of its latency budget before or during a query"""
+    status_code = 504
+    message = "Request exceeded its time budget"
+
+    def __init__(self, budget):
+        super().__init__(f"Request exceeded its {budget}s budget")
+        self.budget = budget
+
+    def data(self):
+        return {"budget_ms": int(self.budget * 1000)}
+
+class CircuitBreaker:
+    """Stops connection attempts to a database that keeps failing.
+
+    closed: connections allowed, consecutive failures counted.
+    open: fail fast for DB_CIRCUIT_RESET_SECONDS.
+    half_open: one probe connection is let through; success closes the
+    circuit, failure opens it again.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.lock = threading.Lock()
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0
+        self.probing = False
+
+    def allow(self):
+        with self.lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.time() - self.opened_at >= DB_CIRCUIT_RESET_SECONDS:
+                self.state = 'half_open'
+            if self.state == 'half_open' and not self.probing:
+                self.probing = True
+                return True
+            return False
+
+    def retry_after(self):
+        return max(1, int(self.opened_at + DB_CIRCUIT_RESET_SECONDS - time.time()) + 1)
+
+    def record_success(self):
+        with self.lock:
+            self.state = 'closed'
+            self.failures = 0
+            self.probing = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.probing = False
+            if self.state == 'half_open' or self.failures >= DB_CIRCUIT_FAILURES:
+                if self.state != 'open':
+                    log.warning("Database circuit opened", target=self.name, failures=self.failures)
+                self.state = 'open'
+                self.opened_at = time.time()
+
+class ConnectionPool:
+    """Per-worker pool of idle connections, one LIFO stack per database target"""
+
+    def __init__(self, size):
+        self.size = size
+        self.lock = threading.Lock()
+        self.idle = {}
+        self.breakers = {}
+        self.in_use = 0
+        self.created = 0
+        self.pid = os.getpid()
+
+    def target(self, config):
+        return f"{config['host']}:{config['port']}"
+
+    def breaker(self, config):
+        target = self.target(config)
+        with self.lock:
+            if target not in self.breakers:
+                self.breakers[target] = CircuitBreaker(target)
+            return self.breakers[target]
+
+    def acquire(self, config, timeout=None, deadline=None):
+        target = self.target(config)
+        breaker = self.breaker(config)
+        connection = None
+        with self.lock:
+            if self.pid != os.getpid():
+                # A forked worker must not share its parent's sockets; drop them unclosed,
+                # closing would send COM_QUIT on the parent's session
+                self.idle, self.in_use, self.pid = {}, 0, os.getpid()
+            stack = self.idle.get(target)
+            while stack and connection is None:
+                candidate, released_at = stack.pop()
+                if time.time() - released_at < DB_POOL_IDLE_SECONDS:
+                    connection = candidate
+                else:
+                    candidate.close()
+            self.in_use += 1
+        
+        try:
+            if connection is not None and time.time() - released_at > DB_POOL_PING_SECONDS:
+                try:
+                    connection.ping(reconnect=False)
+                except pymysql.MySQLError:
+                    connection.close()
+                    connection = None
+            if connection is None:
+                if not breaker.allow():
+                    raise DatabaseUnavailable(target, breaker.retry_after())
+                try:
+                    # The handshake is read with read_timeout, so a deadline bounds both
+                    timeouts = {'connect_timeout': timeout, 'read_timeout': timeout} if timeout else {}
+                    connection = pymysql.connect(**dict(config, **timeouts))
+                except pymysql.MySQLError:
+                    # A connect cut short by the request's own deadline says nothing about the server
+                    if not (timeout and timeout < config['connect_timeout']
+                            and deadline is not None and time.monotonic() >= deadline):
+                        breaker.record_failure()
+                    raise
+                breaker.record_success()
+                with self.lock:
+                    self.created += 1
+        except BaseException:
+            with self.lock:
+                self.in_use -= 1
+            raise
+        return connection
+
+    def release(self, config, connection, healthy=True):
+        set_read_timeout(connection, config['read_timeout'])
+        if healthy and connection.open:
+            try:
+                # End any read snapshot so the next user sees fresh data
+                connection.rollback()
+            except pymysql.MySQLError:
+                healthy = False
+        with self.lock:
+            self.in_use -= 1
+            stack = self.idle.setdefault(self.target(config), [])
+            if healthy and connection.open and len(stack) < self.size:
+                stack.append((connection, time.time()))
+                return
+        connection.close()
+
+    def stats(self):
+        with self.lock:
+            return {
+                "size": self.size,
+                "in_use": self.in_use,
+                "idle": sum(len(stack) for stack in self.idle.values()),
+                "created": self.created,
+                "circuits": {target: breaker.state for target, breaker in self.breakers.items()}
+            }
+
+db_pool = ConnectionPool(DB_POOL_SIZE)
+
 @contextmanager
-def get_db_connection():
+def get_db_connection(read_only=None, primary=False):
+    """Yield a pooled connection, or None if the database is unreachable.
+
+    read_only=None routes by request: GET/HEAD requests read from a replica
+    (round-robin) unless the technician wrote within READ_YOUR_WRITES_SECONDS,
+    anything else goes to the primary and starts that window. primary=True
+    reads from the primary without starting the window, for loads that every
+    worker then serves from a shared cache. While the primary's circuit is
+    open this raises DatabaseUnavailable immediately instead of waiting out
+    the connect timeout.
+    """
     connection = None
+    config, written_by = route_db_connection(read_only, primary)
+    deadline, budget = request_deadline()
+    if deadline is not None and time.monotonic() >= deadline:
+        raise DeadlineExceeded(budget)
+    connect_timeout = min(config['connect_timeout'], max(0.05, deadline - time.monotonic())) if deadline else None
+    
+    try:
+        try:
+            connection = db_pool.acquire(config, connect_timeout, deadline)
+        except (pymysql.MySQLError, DatabaseUnavailable) as e:
+            primary = primary_db_config()
+            if config is primary:
+                raise
+            log.warning("Replica unavailable, reading from primary", replica=config['host'], error=str(e))
+            config = primary
+            connection = db_pool.acquire(config, connect_timeout, deadline)
+        apply_deadline(connection, deadline, budget)
+    except pymysql.MySQLError as e:
+        if connection:
+            db_pool.release(config, connection, healthy=False)
+            connection = None
+        if deadline is not None and time.monotonic() >= deadline:
+            raise DeadlineExceeded(budget) from e
+        log.error("Database connection failed", error=str(e))
+    
+    timed_out = False
     try:
-        connection = pymysql.connect(**DB_CONFIG)
         yield connection
-    except Exception as e:
-        print(f"Database connection failed: {e}")
-        yield None
+    except pymysql.OperationalError as e:
+        if connection:
+            db_pool.release(config, connection, healthy=False)
+            connection = None
+        if deadline is not None and time.monotonic() >= deadline:
+            raise DeadlineExceeded(budget) from e
+        # Lost connection mid-query - count it against the circuit
+        db_pool.breaker(config).record_failure()
+        raise
+    except BaseException:
+        if connection:
+            db_pool.release(config, connection, healthy=False)
+            connection = None
+        raise
     finally:
         if connection:
-            connection.close()
+            # A handler that swallowed the read timeout still must not carry on past its budget
+            timed_out = not connection.open and deadline is not None and time.monotonic() >= deadline
+            db_pool.release(config, connection)
+        if written_by:
+            pin_to_primary(written_by)
+    if timed_out:
+        raise DeadlineExceeded(budget)
+
+# Request deadlines - seconds per namespace or path, overridable as REQUEST_BUDGET_<NAME>="8"
+REQUEST_BUDGETS = {
+    'default': 10.0,
+    'auth': 5.0,
+    'dashboard': 8.0,
+    'notifications': 5.0,
+    'schedule': 8.0,
+    'inventory': 8.0,
+    'tickets': 10.0,
+    'tickets/batch': 20.0,
+    # Long-lived stream - its only query runs when it opens
+    'notifications/stream': None,
+    # Long poll - its only query runs before it starts waiting
+    'notifications/poll': None
+}
+for _name in REQUEST_BUDGETS:
+    if os.getenv(f"REQUEST_BUDGET_{_name.upper().replace('/', '_')}"):
+        REQUEST_BUDGETS[_name] = float(os.getenv(f"REQUEST_BUDGET_{_name.upper().replace('/', '_')}"))
+
+def start_request_budget():
+    """Set the request's deadline on arrival; every DB call made for it honours what is left"""
+    if not request.path.startswith(API_PREFIX + '/'):
+        return None
+    path = request.path[len(API_PREFIX) + 1:].rstrip('/')
+    namespace = path.split('/', 1)[0]
+    budget = REQUEST_BUDGETS.get(path, REQUEST_BUDGETS.get(namespace, REQUEST_BUDGETS['default']))
+    if budget:
+        g.deadline = time.monotonic() + budget
+        g.budget = budget
+    return None
+
+def request_deadline():
+    if has_request_context() and g.get('deadline') is not None:
+        return g.deadline, g.budget
+    return None, None
+
+def set_read_timeout(connection, seconds):
+    """Change a pooled connection's read timeout.
+
+    pymysql only accepts read_timeout at connect time. It keeps the value in the
+    private _read_timeout and applies it to the socket before every read, so this
+    is the one place that writes it (checked against the pinned PyMySQL 1.1).
+    """
+    connection._read_timeout = seconds
+
+def apply_deadline(connection, deadline, budget):
+    """Bound the next queries on this connection by the request's remaining budget"""
+    if deadline is not None:
+        set_read_timeout(connection, max(0.05, deadline - time.monotonic()))
+    
+    # Server-side cap so a runaway SELECT stops even after the client gave up on it;
+    # only sent when the value differs from what this pooled connection already has
+    max_execution_ms = int(budget * 1000) if budget else 0
+    if getattr(connection, 'max_execution_ms', 0) != max_execution_ms:
+        cursor = connection.cursor()
+        try:
+            cursor.execute("SET SESSION MAX_EXECUTION_TIME = %s", (max_execution_ms,))
+        except pymysql.err.ProgrammingError:
+            pass  # Not MySQL (e.g. MariaDB) - the read timeout still applies
+        finally:
+            cursor.close()
+        connection.max_execution_ms = max_execution_ms
+
+def abort_request_responses(view):
+    """Turn RequestAborted (open circuit, exhausted budget) into its structured response
+    without logging a traceback per request"""
+    @wraps(view)
+    def decorated(*args, **kwargs):
+        try:
+            return view(*args, **kwargs)
+        except RequestAborted as e:
+            response = jsonify({
+                "message": e.message,
+                "status": False,
+                "data": e.data()
+            })
+            response.status_code = e.status_code
+            response.headers.update(e.headers())
+            return response
+    return decorated
+
+# Health - a background probe keeps the latest database status for /health
+HEALTH_PROBE_INTERVAL = float(os.getenv('HEALTH_PROBE_INTERVAL', 10))
+health_status = {}
+_health_probe = None
+
+def probe_databases():
+    primary = primary_db_config()
+    for role, config in [('primary', primary)] + [
+            (f"replica {host}:{port}", {**primary, 'host': host, 'port': port}) for host, port in DB_REPLICAS]:
+        started = time.perf_counter()
+        try:
+            connection = db_pool.acquire(config)
+            try:
+                cursor = connection.cursor()
+                cursor.execute("SELECT 1")
+                cursor.close()
+            finally:
+                db_pool.release(config, connection)
+            result = {"status": "up", "error": None}
+        except (pymysql.MySQLError, DatabaseUnavailable) as e:
+            result = {"status": "down", "error": str(e)}
+        result.update({
+            "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+            "circuit": db_pool.breaker(config).state,
+            "checked_at": datetime.now().isoformat()
+        })
+        health_status[role] = result
+
+def start_health_probe(app):
+    """One probe per process; it checks the databases of the first app that starts it"""
+    global _health_probe
+    if _health_probe is not None or HEALTH_PROBE_INTERVAL <= 0:
+        return
+    
+    def run():
+        with app.app_context():
+            while True:
+                try:
+                    probe_databases()
+                except Exception as e:
+                    log.warning("Health probe failed", error=str(e))
+                time.sleep(HEALTH_PROBE_INTERVAL)
+    
+    _health_probe = threading.Thread(target=run, name='health-probe', daemon=True)
+    _health_probe.start()
+
+# Shared state - a local SQLite file visible to every gunicorn worker on this host
+SHARED_STATE_PATH = os.getenv('SHARED_STATE_PATH', os.path.join(tempfile.gettempdir(), 'ostrich-service-shared.db'))
+SHARED_TABLES = []
+_shared_local = threading.local()
+
+def register_shared_table(ddl):
+    """Register a CREATE TABLE IF NOT EXISTS statement for the shared store"""
+    SHARED_TABLES.append(ddl)
+
+def get_shared_store():
+    """Per-thread autocommit connection to the shared store"""
+    conn = getattr(_shared_local, 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(SHARED_STATE_PATH, timeout=5, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        for ddl in SHARED_TABLES:
+            conn.execute(ddl)
+        _shared_local.conn = conn
+    return conn
+
+@contextmanager
+def shared_transaction():
+    """Write transaction on the shared store, serialized across workers"""
+    store = get_shared_store()
+    store.execute("BEGIN IMMEDIATE")
+    try:
+        yield store
+        store.execute("COMMIT")
+    except BaseException:
+        store.execute("ROLLBACK")
+        raise
+
+# Read/write routing
+register_shared_table("""
+    CREATE TABLE IF NOT EXISTS primary_pins (
+        technician_id TEXT PRIMARY KEY,
+        pinned_until REAL NOT NULL
+    )
+""")
+
+def route_db_connection(read_only, primary=False):
+    """Return (connection config, technician to pin to the primary after this connection)"""
+    if primary:
+        return primary_db_config(), None
+    technician_id = None
+    if has_request_context():
+        technician_id = g.get('technician_id')
+        if read_only is None:
+            read_only = request.method in ('GET', 'HEAD')
+    
+    primary = primary_db_config()
+    if not read_only:
+        return primary, (technician_id if DB_REPLICAS else None)
+    if not DB_REPLICAS or (technician_id and is_pinned_to_primary(technician_id)):
+        return primary, None
+    
+    host, port = DB_REPLICAS[next(_replica_counter) % len(DB_REPLICAS)]
+    return {**primary, 'host': host, 'port': port}, None
+
+def pin_to_primary(technician_id):
+    """Send this technician's reads to the primary until replicas have caught up with their write"""
+    now = time.time()
+    try:
+        store = get_shared_store()
+        store.execute("INSERT OR REPLACE INTO primary_pins (technician_id, pinned_until) VALUES (?, ?)",
+                      (str(technician_id), now + READ_YOUR_WRITES_SECONDS))
+        store.execute("DELETE FROM primary_pins WHERE pinned_until < ?", (now,))
+    except sqlite3.Error as e:
+        log.warning("Primary pin failed", error=str(e))
+
+def is_pinned_to_primary(technician_id):
+    try:
+        row = get_shared_store().execute("SELECT pinned_until FROM primary_pins WHERE technician_id = ?",
+                                         (str(technician_id),)).fetchone()
+    except sqlite3.Error:
+        return True
+    return bool(row) and row[0] > time.time()
 
 # JWT utilities
 def create_access_token(data):
     payload = data.copy()
     payload['exp'] = datetime.now(timezone.utc) + timedelta(hours=24)
-    return jwt.encode(payload, SECRET_KEY, algorithm="HS256")
+    return jwt.encode(payload, app_setting('SECRET_KEY', SECRET_KEY), algorithm="HS256")
 
 def verify_token(token):
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
+        payload = jwt.decode(token, app_setting('SECRET_KEY', SECRET_KEY), algorithms=["HS256"])
         return payload
     except:
         return None
@@ -125,58 +745,520 @@ def verify_token(token):
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
+        payload = None
         try:
             token = request.headers.get('Authorization')
             if token and token.startswith('Bearer '):
                 token = token[7:]
                 payload = verify_token(token)
-                if payload:
-                    return f(current_user=payload, *args, **kwargs)
-            return {'message': 'Token required', 'status': False, 'data': None}, 401
         except Exception as e:
             return {'message': 'Authentication failed', 'status': False, 'data': None}, 401
+        if not payload:
+            return {'message': 'Token required', 'status': False, 'data': None}, 401
+        
+        # Errors raised by the handler itself are no longer reported as auth failures
+        g.technician_id = payload.get('sub')
+        return f(current_user=payload, *args, **kwargs)
     return decorated
 
+# ==================== RATE LIMITING ====================
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+RATE_LIMIT_PATH = os.getenv('RATE_LIMIT_PATH', os.path.join(tempfile.gettempdir(), 'ostrich-service-ratelimit.bin'))
+RATE_LIMIT_SLOTS = int(os.getenv('RATE_LIMIT_SLOTS', 16384))
+RATE_LIMIT_IP_MULTIPLIER = int(os.getenv('RATE_LIMIT_IP_MULTIPLIER', 4))
+
+# Namespace -> (requests per minute, burst), overridable as RATE_LIMIT_<NAMESPACE>="120,60"
+RATE_LIMITS = {
+    'auth': (20, 10),
+    'tickets': (120, 60),
+    'notifications': (60, 30),
+    'default': (300, 100)
+}
+for _namespace in RATE_LIMITS:
+    if os.getenv(f'RATE_LIMIT_{_namespace.upper()}'):
+        _per_minute, _burst = os.getenv(f'RATE_LIMIT_{_namespace.upper()}').split(',')
+        RATE_LIMITS[_namespace] = (int(_per_minute), int(_burst))
+
+class SharedTokenBuckets:
+    """Token buckets in a memory-mapped file shared by every worker on the host.
+
+    Each key hashes to a pair of fixed-size slots (key hash, tokens, last
+    update). A slot pair is guarded by an fcntl byte-range lock across
+    processes and a thread lock within one, so the allow path is a hash,
+    two small locks and an in-place struct update - no syscalls beyond the
+    lock. Two-way probing keeps collisions rare; on a miss the least
+    recently touched slot is reused, which at worst resets a bucket to full.
+    """
+
+    SLOT = struct.Struct('<Qdd')
+
+    def __init__(self, path, slots):
+        self.slots = slots
+        size = (slots + 1) * self.SLOT.size
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self.fd).st_size < size:
+            os.ftruncate(self.fd, size)
+        self.map = mmap.mmap(self.fd, size)
+        self.lock = threading.Lock()
+
+    def acquire(self, key, per_minute, burst):
+        """Take one token; return 0 when allowed, otherwise seconds until a token is free"""
+        key_hash = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little') or 1
+        index = key_hash % self.slots
+        rate = per_minute / 60.0
+        with self.lock:
+            if fcntl:
+                fcntl.lockf(self.fd, fcntl.LOCK_EX, self.SLOT.size * 2, index * self.SLOT.size)
+            try:
+                now = time.time()
+                first = self.SLOT.unpack_from(self.map, index * self.SLOT.size)
+                second = self.SLOT.unpack_from(self.map, (index + 1) * self.SLOT.size)
+                if first[0] == key_hash:
+                    slot, tokens, updated = index, first[1], first[2]
+                elif second[0] == key_hash:
+                    slot, tokens, updated = index + 1, second[1], second[2]
+                else:
+                    slot = index if first[2] <= second[2] else index + 1
+                    tokens, updated = burst, now
+                
+                tokens = min(burst, tokens + (now - updated) * rate)
+                if tokens >= 1:
+                    tokens -= 1
+                    retry_after = 0
+                else:
+                    retry_after = (1 - tokens) / rate
+                self.SLOT.pack_into(self.map, slot * self.SLOT.size, key_hash, tokens, now)
+            finally:
+                if fcntl:
+                    fcntl.lockf(self.fd, fcntl.LOCK_UN, self.SLOT.size * 2, index * self.SLOT.size)
+        return retry_after
+
+_rate_limit_buckets = None
+
+def get_rate_limit_buckets():
+    """Map the shared bucket file on first use rather than at import"""
+    global _rate_limit_buckets
+    if _rate_limit_buckets is None:
+        _rate_limit_buckets = SharedTokenBuckets(RATE_LIMIT_PATH, RATE_LIMIT_SLOTS)
+    return _rate_limit_buckets
+
+def enforce_rate_limit():
+    if not current_app.config['RATE_LIMIT_ENABLED'] or request.method == 'OPTIONS' or not request.path.startswith(API_PREFIX + '/'):
+        return None
+    
+    rate_limit_buckets = get_rate_limit_buckets()
+    namespace = request.path[len(API_PREFIX) + 1:].split('/', 1)[0]
+    per_minute, burst = RATE_LIMITS.get(namespace, RATE_LIMITS['default'])
+    client_ip = request.access_route[-1] if request.access_route else request.remote_addr
+    
+    # Technicians get their own bucket; the per-IP bucket is wider to allow for shared NAT
+    retry_after = rate_limit_buckets.acquire(f"{namespace}:ip:{client_ip}",
+                                             per_minute * RATE_LIMIT_IP_MULTIPLIER, burst * RATE_LIMIT_IP_MULTIPLIER)
+    token = request.headers.get('Authorization', '')
+    if not retry_after and token.startswith('Bearer '):
+        payload = verify_token(token[7:])
+        if payload and payload.get('sub'):
+            retry_after = rate_limit_buckets.acquire(f"{namespace}:tech:{payload['sub']}", per_minute, burst)
+    
+    if retry_after:
+        retry_after = int(retry_after) + 1
+        response = jsonify({
+            "message": "Too many requests, please slow down",
+            "status": False,
+            "data": {"retry_after": retry_after}
+        })
+        response.status_code = 429
+        response.headers['Retry-After'] = str(retry_after)
+        return response
+    return None
+
+# ==================== IDEMPOTENCY ====================
+# Writes carrying an Idempotency-Key header run once per technician (or client IP),
+# method, path and key. The first response is kept in the shared store and replayed
+# for retries; a retry that arrives while the first is still running waits for it.
+IDEMPOTENCY_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv('IDEMPOTENCY_TTL_SECONDS', 86400))
+IDEMPOTENCY_MAX_KEYS = int(os.getenv('IDEMPOTENCY_MAX_KEYS', 100000))
+IDEMPOTENCY_IN_FLIGHT_SECONDS = 60
+IDEMPOTENCY_WAIT_SECONDS = 10
+IDEMPOTENCY_POLL_INTERVAL = 0.05
+IDEMPOTENCY_PRUNE_EVERY = 100
+REPLAYED_HEADERS = ('Content-Type', 'Retry-After')
+
+register_shared_table("""
+    CREATE TABLE IF NOT EXISTS idempotency_keys (
+        key TEXT PRIMARY KEY,
+        fingerprint TEXT NOT NULL,
+        status_code INTEGER,
+        headers TEXT,
+        body BLOB,
+        created_at REAL NOT NULL,
+        expires_at REAL NOT NULL
+    )
+""")
+register_shared_table("CREATE INDEX IF NOT EXISTS idx_idempotency_expires ON idempotency_keys (expires_at)")
+
+_idempotency_claims = itertools.count()
+
+def idempotency_error(message, status_code):
+    response = jsonify({"message": message, "status": False, "data": None})
+    response.status_code = status_code
+    return response
+
+def prune_idempotency_keys(store):
+    store.execute("DELETE FROM idempotency_keys WHERE expires_at < ?", (time.time(),))
+    store.execute("""
+        DELETE FROM idempotency_keys WHERE key IN (
+            SELECT key FROM idempotency_keys ORDER BY created_at
+            LIMIT MAX((SELECT COUNT(*) FROM idempotency_keys) - ?, 0)
+        )
+    """, (IDEMPOTENCY_MAX_KEYS,))
+
+def claim_idempotency_key():
+    """before_request hook - replay a stored response, wait for an in-flight one, or claim the key"""
+    key = request.headers.get('Idempotency-Key')
+    if not key or request.method not in IDEMPOTENCY_METHODS or not request.path.startswith(API_PREFIX + '/'):
+        return None
+    if len(key) > 255:
+        return idempotency_error("Idempotency-Key must be at most 255 characters", 400)
+    
+    token = request.headers.get('Authorization', '')
+    payload = verify_token(token[7:]) if token.startswith('Bearer ') else None
+    if payload and payload.get('sub'):
+        scope = f"tech:{payload['sub']}"
+    else:
+        scope = f"ip:{request.access_route[-1] if request.access_route else request.remote_addr}"
+    scoped_key = hashlib.sha256(f"{scope}|{request.method}|{request.path}|{key}".encode()).hexdigest()
+    fingerprint = hashlib.sha256(request.get_data()).hexdigest()
+    
+    if next(_idempotency_claims) % IDEMPOTENCY_PRUNE_EVERY == 0:
+        with shared_transaction() as store:
+            prune_idempotency_keys(store)
+    
+    deadline = time.time() + IDEMPOTENCY_WAIT_SECONDS
+    while True:
+        now = time.time()
+        with shared_transaction() as store:
+            row = store.execute(
+                "SELECT fingerprint, status_code, headers, body, expires_at FROM idempotency_keys WHERE key = ?",
+                (scoped_key,)).fetchone()
+            if row is None or row[4] < now:
+                # New key, or an expired one / a claim abandoned by a crashed worker
+                store.execute("""
+                    INSERT OR REPLACE INTO idempotency_keys (key, fingerprint, created_at, expires_at)
+                    VALUES (?, ?, ?, ?)
+                """, (scoped_key, fingerprint, now, now + IDEMPOTENCY_IN_FLIGHT_SECONDS))
+                g.idempotency_key = scoped_key
+                return None
+        
+        stored_fingerprint, status_code, headers, body, _ = row
+        if stored_fingerprint != fingerprint:
+            return idempotency_error("Idempotency-Key was already used with a different request body", 422)
+        if status_code is not None:
+            response = Response(body, status=status_code, headers=json.loads(headers))
+            response.headers['Idempotent-Replayed'] = 'true'
+            return response
+        if now >= deadline:
+            return idempotency_error("A request with this Idempotency-Key is still in progress", 409)
+        time.sleep(IDEMPOTENCY_POLL_INTERVAL)
+
+def store_idempotent_response(response):
+    """after_request hook - keep the response for replays; server errors release the key for a retry"""
+    scoped_key = g.pop('idempotency_key', None)
+    if scoped_key is None:
+        return response
+    try:
+        store = get_shared_store()
+        if response.status_code >= 500 or response.is_streamed:
+            store.execute("DELETE FROM idempotency_keys WHERE key = ?", (scoped_key,))
+        else:
+            headers = {name: response.headers[name] for name in REPLAYED_HEADERS if name in response.headers}
+            store.execute("""
+                UPDATE idempotency_keys SET status_code = ?, headers = ?, body = ?, expires_at = ?
+                WHERE key = ?
+            """, (response.status_code, json.dumps(headers), response.get_data(),
+                  time.time() + IDEMPOTENCY_TTL_SECONDS, scoped_key))
+    except sqlite3.Error as e:
+        log.warning("Idempotency store failed", error=str(e))
+    return response
+
+def release_idempotency_key(error=None):
+    """teardown_request hook - a request that died before after_request gives its key back"""
+    scoped_key = g.pop('idempotency_key', None)
+    if scoped_key is not None:
+        try:
+            get_shared_store().execute("DELETE FROM idempotency_keys WHERE key = ?", (scoped_key,))
+        except sqlite3.Error as e:
+            log.warning("Idempotency store failed", error=str(e))
+
+# ==================== ID ALLOCATION ====================
+# Sequences live in MySQL, but each worker reserves a block of ID_BLOCK_SIZE values
+# per round trip and hands them out from memory. Values are unique across workers
+# and dynos and increase over time; a restart only leaves a gap.
+ID_BLOCK_SIZE = int(os.getenv('ID_BLOCK_SIZE', 100))
+
+class IdAllocator:
+    def __init__(self, sequence, prefix, block_size=ID_BLOCK_SIZE):
+        self.sequence = sequence
+        self.prefix = prefix
+        self.block_size = block_size
+        self.lock = threading.Lock()
+        self.pid = None
+        self.next_value = self.end_value = 0
+
+    def reserve_block(self):
+        # Own connection and commit - the block must stay taken even if the caller rolls back
+        with get_db_connection(read_only=False) as conn:
+            if not conn:
+                raise DatabaseUnavailable('primary', int(DB_CIRCUIT_RESET_SECONDS))
+            cursor = conn.cursor()
+            cursor.execute("INSERT IGNORE INTO id_sequences (name, next_value) VALUES (%s, 1)", (self.sequence,))
+            cursor.execute("""
+                UPDATE id_sequences SET next_value = LAST_INSERT_ID(next_value + %s) WHERE name = %s
+            """, (self.block_size, self.sequence))
+            cursor.execute("SELECT LAST_INSERT_ID()")
+            end_value = cursor.fetchone()[0]
+            conn.commit()
+            cursor.close()
+        return end_value - self.block_size, end_value
+
+    def next(self):
+        """Next integer in the sequence"""
+        with self.lock:
+            # A forked worker must not reuse its parent's block
+            if self.pid != os.getpid() or self.next_value >= self.end_value:
+                self.next_value, self.end_value = self.reserve_block()
+                self.pid = os.getpid()
+            value = self.next_value
+            self.next_value += 1
+            return value
+
+    def next_id(self):
+        """Formatted id, e.g. REQ20250115-0000042"""
+        return f"{self.prefix}{datetime.now().strftime('%Y%m%d')}-{self.next():07d}"
+
+parts_request_ids = IdAllocator('parts_request', 'REQ')
+
+# ==================== SHARED CACHE ====================
+# Two tiers: a per-worker LRU (L1) in front of a table in the shared store (L2) that
+# every gunicorn worker on this host reads. Keys carry a version per (cache, scope);
+# invalidate() bumps it in the shared store, so every worker misses on its next read
+# instead of serving its old copy. Superseded entries are never read again and age out.
+CACHE_L1_SIZE = int(os.getenv('CACHE_L1_SIZE', 1000))
+CACHE_L2_SIZE = int(os.getenv('CACHE_L2_SIZE', 20000))
+CACHE_PRUNE_EVERY = 200
+
+register_shared_table("""
+    CREATE TABLE IF NOT EXISTS cache_versions (
+        scope TEXT PRIMARY KEY,
+        version INTEGER NOT NULL
+    )
+""")
+register_shared_table("""
+    CREATE TABLE IF NOT EXISTS cache_entries (
+        key TEXT PRIMARY KEY,
+        cache TEXT NOT NULL,
+        value TEXT NOT NULL,
+        expires_at REAL NOT NULL
+    )
+""")
+register_shared_table("CREATE INDEX IF NOT EXISTS idx_cache_entries_expires ON cache_entries (expires_at)")
+
+CACHES = {}
+
+class TieredCache:
+    def __init__(self, name, ttl, l1_size=CACHE_L1_SIZE):
+        self.name = name
+        self.ttl = ttl
+        self.l1_size = l1_size
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.l1_bytes = 0
+        self.counters = {'l1_hits': 0, 'l1_misses': 0, 'l2_hits': 0, 'l2_misses': 0, 'loads': 0, 'errors': 0}
+        self.writes = 0
+        CACHES[name] = self
+
+    def count(self, counter):
+        with self.lock:
+            self.counters[counter] += 1
+
+    def remember(self, key, expires_at, value):
+        """Put a serialized value in L1, evicting the least recently used entries"""
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous:
+                self.l1_bytes -= len(previous[1])
+            self.entries[key] = (expires_at, value)
+            self.l1_bytes += len(value)
+            while len(self.entries) > self.l1_size:
+                self.l1_bytes -= len(self.entries.pop(next(iter(self.entries)))[1])
+
+    def get(self, scope, key, load):
+        """Cached result of load(); load returns (value, ttl) and a ttl of 0 is not cached"""
+        try:
+            store = get_shared_store()
+            row = store.execute("SELECT version FROM cache_versions WHERE scope = ?", (f"{self.name}:{scope}",)).fetchone()
+        except sqlite3.Error as e:
+            # Without the version no entry can be trusted - read straight through
+            log.warning("Shared cache unavailable", cache=self.name, error=str(e))
+            self.count('errors')
+            return load()[0]
+        cache_key = f"{self.name}:{scope}:{row[0] if row else 0}:{key}"
+        now = time.time()
+        
+        with self.lock:
+            entry = self.entries.pop(cache_key, None)
+            if entry and entry[0] > now:
+                # Re-inserting keeps the dict in least recently used order
+                self.entries[cache_key] = entry
+                self.counters['l1_hits'] += 1
+                return json.loads(entry[1])
+            if entry:
+                self.l1_bytes -= len(entry[1])
+            self.counters['l1_misses'] += 1
+        
+        try:
+            row = store.execute("SELECT value, expires_at FROM cache_entries WHERE key = ? AND expires_at > ?",
+                                (cache_key, now)).fetchone()
+        except sqlite3.Error as e:
+            log.warning("Shared cache read failed", cache=self.name, error=str(e))
+            self.count('errors')
+            row = None
+        if row:
+            self.count('l2_hits')
+            self.remember(cache_key, row[1], row[0])
+            return json.loads(row[0])
+        self.count('l2_misses')
+        
+        value, ttl = load()
+        self.count('loads')
+        if not ttl:
+            return value
+        serialized = json.dumps(value, default=str)
+        expires_at = now + ttl
+        self.remember(cache_key, expires_at, serialized)
+        try:
+            store.execute("INSERT OR REPLACE INTO cache_entries (key, cache, value, expires_at) VALUES (?, ?, ?, ?)",
+                          (cache_key, self.name, serialized, expires_at))
+            self.writes += 1
+            if self.writes % CACHE_PRUNE_EVERY == 0:
+                prune_shared_cache(store)
+        except sqlite3.Error as e:
+            log.warning("Shared cache write failed", cache=self.name, error=str(e))
+            self.count('errors')
+        # Same shape on every tier - datetimes and decimals come back as strings
+        return json.loads(serialized)
+
+    def invalidate(self, scope):
+        """Drop every entry under scope, in this worker and all others"""
+        prefix = f"{self.name}:{scope}:"
+        with self.lock:
+            for cache_key in [k for k in self.entries if k.startswith(prefix)]:
+                self.l1_bytes -= len(self.entries.pop(cache_key)[1])
+        try:
+            get_shared_store().execute("""
+                INSERT INTO cache_versions (scope, version) VALUES (?, 1)
+                ON CONFLICT (scope) DO UPDATE SET version = version + 1
+            """, (f"{self.name}:{scope}",))
+        except sqlite3.Error as e:
+            log.warning("Shared cache invalidation failed", cache=self.name, scope=scope, error=str(e))
+            self.count('errors')
+
+    def stats(self):
+        with self.lock:
+            counters = dict(self.counters)
+            entries, size = len(self.entries), self.l1_bytes
+        l1_lookups = counters['l1_hits'] + counters['l1_misses']
+        l2_lookups = counters['l2_hits'] + counters['l2_misses']
+        return {
+            "l1": {
+                "hits": counters['l1_hits'], "misses": counters['l1_misses'],
+                "hit_ratio": round(counters['l1_hits'] / l1_lookups, 3) if l1_lookups else None,
+                "entries": entries, "bytes": size
+            },
+            "l2": {
+                "hits": counters['l2_hits'], "misses": counters['l2_misses'],
+                "hit_ratio": round(counters['l2_hits'] / l2_lookups, 3) if l2_lookups else None
+            },
+            "loads": counters['loads'],
+            "errors": counters['errors']
+        }
+
+def prune_shared_cache(store):
+    """Drop expired L2 entries, then the soonest to expire beyond CACHE_L2_SIZE"""
+    now = time.time()
+    store.execute("DELETE FROM cache_entries WHERE expires_at < ?", (now,))
+    store.execute("""
+        DELETE FROM cache_entries WHERE key IN (
+            SELECT key FROM cache_entries ORDER BY expires_at DESC LIMIT -1 OFFSET ?
+        )
+    """, (CACHE_L2_SIZE,))
+
+def cache_stats():
+    """Per-cache hit ratios for this worker; L2 size is shared by all workers"""
+    stats = {name: cache.stats() for name, cache in CACHES.items()}
+    try:
+        rows = get_shared_store().execute("""
+            SELECT cache, COUNT(*), SUM(LENGTH(value)) FROM cache_entries WHERE expires_at > ? GROUP BY cache
+        """, (time.time(),)).fetchall()
+    except sqlite3.Error:
+        rows = []
+    sizes = {cache: (entries, size) for cache, entries, size in rows}
+    for name, entry in stats.items():
+        entries, size = sizes.get(name, (0, 0))
+        entry["l2"].update({"entries": entries, "bytes": size})
+    return stats
+
 # ==================== MODELS ====================
 # Auth Models
-login_model = api.model('Login', {
+login_model = auth_ns.model('Login', {
     'username': fields.String(required=True, description='Technician username', example='demo.tech'),
     'password': fields.String(required=True, description='Password', example='password123')
 })
 
 # Signup model removed - service staff don't self-register
 
-otp_model = api.model('SendOTP', {
+otp_model = auth_ns.model('SendOTP', {
     'contact': fields.String(required=True, description='Phone number', example='9876543210')
 })
 
-verify_otp_model = api.model('VerifyOTP', {
+verify_otp_model = auth_ns.model('VerifyOTP', {
     'contact': fields.String(required=True, description='Phone number', example='9876543210'),
     'otp': fields.String(required=True, description='OTP code', example='123456')
 })
 
 # Ticket Models
-ticket_status_model = api.model('TicketStatus', {
+ticket_status_model = tickets_ns.model('TicketStatus', {
     'status': fields.String(required=True, description='New status', enum=['SCHEDULED', 'IN_PROGRESS', 'COMPLETED', 'CANCELLED'], example='IN_PROGRESS'),
     'notes': fields.String(required=False, description='Status update notes', example='Started working on the motor'),
     'work_performed': fields.String(required=False, description='Work performed description', example='Checked motor connections'),
     'parts_used': fields.List(fields.Raw, required=False, description='Parts used in service')
 })
 
-location_model = api.model('Location', {
+location_model = tickets_ns.model('Location', {
     'latitude': fields.Float(required=True, description='Latitude', example=19.0760),
     'longitude': fields.Float(required=True, description='Longitude', example=72.8777)
 })
 
-parts_model = api.model('PartsUsed', {
+parts_model = tickets_ns.model('PartsUsed', {
     'parts': fields.List(fields.Raw, required=True, description='List of parts used', example=[
         {'part_id': 1, 'name': 'Motor Belt', 'quantity': 1, 'cost': 250.0},
         {'part_id': 2, 'name': 'Oil Filter', 'quantity': 2, 'cost': 150.0}
     ])
 })
 
+ticket_batch_model = tickets_ns.model('TicketBatch', {
+    'operations': fields.List(fields.Raw, required=True, description='Ordered operations: status, parts, location or signature', example=[
+        {'op': 'status', 'ticket_id': 1, 'status': 'IN_PROGRESS', 'notes': 'Started working on the motor'},
+        {'op': 'location', 'ticket_id': 1, 'latitude': 19.0760, 'longitude': 72.8777},
+        {'op': 'parts', 'ticket_id': 1, 'parts': [{'part_id': 1, 'name': 'Motor Belt', 'quantity': 1, 'cost': 250.0}]},
+        {'op': 'signature', 'ticket_id': 1, 'customer_name': 'John Customer'}
+    ]),
+    'atomic': fields.Boolean(required=False, default=False, description='Roll back every operation if any one fails')
+})
+
 # Profile Models
-profile_update_model = api.model('ProfileUpdate', {
+profile_update_model = profile_ns.model('ProfileUpdate', {
     'full_name': fields.String(required=False, description='Full name'),
     'phone': fields.String(required=False, description='Phone number'),
     'email': fields.String(required=False, description='Email address'),
@@ -184,7 +1266,7 @@ profile_update_model = api.model('ProfileUpdate', {
 })
 
 # Inventory Models
-inventory_request_model = api.model('InventoryRequest', {
+inventory_request_model = inventory_ns.model('InventoryRequest', {
     'parts': fields.List(fields.Raw, required=True, description='Parts to request', example=[
         {'part_id': 1, 'quantity': 5, 'urgency': 'normal'},
         {'part_id': 2, 'quantity': 2, 'urgency': 'urgent'}
@@ -192,6 +1274,15 @@ inventory_request_model = api.model('InventoryRequest', {
     'reason': fields.String(required=False, description='Reason for request', example='Stock running low')
 })
 
+parts_request_status_model = inventory_ns.model('PartsRequestStatus', {
+    'status': fields.String(required=True, description='New status', enum=['approved', 'rejected', 'cancelled', 'delivered'], example='cancelled')
+})
+
+notification_bulk_model = notifications_ns.model('NotificationBulk', {
+    'ids': fields.List(fields.Integer, required=False, description='Notification ids to update', example=[1, 2, 3]),
+    'before': fields.String(required=False, description='Apply to notifications created before this ISO timestamp', example='2025-01-15T00:00:00')
+})
+
 # ==================== FALLBACK DATA ====================
 FALLBACK_DATA = {
     "technicians": [
@@ -225,7 +1316,7 @@ def authenticate_user(username, password):
         if conn:
             cursor = conn.cursor(pymysql.cursors.DictCursor)
             cursor.execute("""
-                SELECT * FROM users 
+                SELECT id, username, first_name, last_name, role, password_hash FROM users 
                 WHERE username = %s AND role = 'service_staff' AND is_active = 1
             """, (username,))
             user = cursor.fetchone()
@@ -237,33 +1328,63 @@ def authenticate_user(username, password):
                     if bcrypt.checkpw(password.encode('utf-8'), user['password_hash'].encode('utf-8')):
                         return user
                 except Exception as e:
-                    print(f"Password verification error: {e}")
+                    log.warning("Password verification error", error=str(e))
             
     return None
 
-def get_technician_data(technician_id):
+# Technician records - cached for TECHNICIAN_CACHE_SECONDS, missing ids for
+# TECHNICIAN_MISS_SECONDS. Profile changes invalidate the record for every worker.
+TECHNICIAN_CACHE_SECONDS = int(os.getenv('TECHNICIAN_CACHE_SECONDS', 300))
+TECHNICIAN_MISS_SECONDS = int(os.getenv('TECHNICIAN_MISS_SECONDS', 30))
+TICKET_CACHE_SECONDS = int(os.getenv('TICKET_CACHE_SECONDS', 60))
+
+technician_cache = TieredCache('technician', TECHNICIAN_CACHE_SECONDS)
+ticket_cache = TieredCache('tickets', TICKET_CACHE_SECONDS)
+
+def load_technician_record(technician_id):
+    """(found, record) - found is None when the database is unavailable"""
     with get_db_connection() as conn:
-        if conn:
-            cursor = conn.cursor(pymysql.cursors.DictCursor)
-            cursor.execute("SELECT * FROM users WHERE id = %s AND role = 'service_staff'", (technician_id,))
-            result = cursor.fetchone()
-            cursor.close()
-            if result:
-                # Map user fields to technician format
-                return {
-                    'id': result['id'],
-                    'employee_id': f"EMP{result['id']:03d}",
-                    'full_name': f"{result.get('first_name', '')} {result.get('last_name', '')}".strip(),
-                    'email': result.get('email', ''),
-                    'phone': result.get('phone', ''),
-                    'role': result.get('role', 'service_staff'),
-                    'specializations': ['Motors', 'Pumps'],  # Default for now
-                    'experience_years': 5
-                }
-        # Return None if no database result instead of fallback
-        return None
+        if not conn:
+            return None, None
+        cursor = conn.cursor(pymysql.cursors.DictCursor)
+        cursor.execute("""
+            SELECT id, first_name, last_name, email, phone, role, career_start_date, created_at
+            FROM users WHERE id = %s AND role = 'service_staff'
+        """, (technician_id,))
+        result = cursor.fetchone()
+        specializations = []
+        if result:
+            cursor.execute("""
+                SELECT specialization FROM technician_specializations
+                WHERE technician_id = %s ORDER BY specialization
+            """, (technician_id,))
+            specializations = [row['specialization'] for row in cursor.fetchall()]
+        cursor.close()
+    if not result:
+        return False, None
+    
+    started = result.get('career_start_date') or result.get('created_at')
+    # Map user fields to technician format
+    return True, {
+        'id': result['id'],
+        'employee_id': f"EMP{result['id']:03d}",
+        'full_name': f"{result.get('first_name') or ''} {result.get('last_name') or ''}".strip(),
+        'email': result.get('email', ''),
+        'phone': result.get('phone', ''),
+        'role': result.get('role', 'service_staff'),
+        'specializations': specializations,
+        'experience_years': (datetime.now().date() - (started.date() if isinstance(started, datetime) else started)).days // 365 if started else None
+    }
+
+def get_technician_data(technician_id):
+    def load():
+        found, record = load_technician_record(technician_id)
+        # Nothing is cached while the database is unavailable
+        return record, (TECHNICIAN_CACHE_SECONDS if found else TECHNICIAN_MISS_SECONDS if found is False else 0)
+    return technician_cache.get(technician_id, '', load)
 
-def get_technician_tickets(technician_id, status=None):
+def load_technician_tickets(technician_id, status=None, limit=None):
+    """(tickets, ttl) - nothing is cached when the query could not run"""
     with get_db_connection() as conn:
         if conn:
             cursor = conn.cursor(pymysql.cursors.DictCursor)
@@ -272,21 +1393,27 @@ def get_technician_tickets(technician_id, status=None):
             if status:
                 query += " AND st.status = %s"
                 params.append(status.upper())
+            if limit:
+                query += " ORDER BY st.scheduled_date DESC LIMIT %s"
+                params.append(limit)
             try:
                 cursor.execute(query, params)
                 results = cursor.fetchall()
                 cursor.close()
-                if results:
-                    # Convert datetime objects to strings for JSON serialization
-                    for result in results:
-                        for key, value in result.items():
-                            if hasattr(value, 'isoformat'):
-                                result[key] = value.isoformat()
-                    return results
+                # Convert datetime objects to strings for JSON serialization
+                for result in results:
+                    for key, value in result.items():
+                        if hasattr(value, 'isoformat'):
+                            result[key] = value.isoformat()
+                return list(results), TICKET_CACHE_SECONDS
             except Exception as e:
-                print(f"Database query error: {e}")
+                log.error("Database query error", error=str(e))
                 cursor.close()
-    return []  # Return empty list instead of fallback data
+    return [], 0  # Return empty list instead of fallback data
+
+def get_technician_tickets(technician_id, status=None, limit=None):
+    return ticket_cache.get(technician_id, f"{(status or '').upper()}:{limit or ''}",
+                            lambda: load_technician_tickets(technician_id, status, limit))
 
 def get_technician_notifications(technician_id):
     with get_db_connection() as conn:
@@ -307,6 +1434,443 @@ def get_technician_notifications(technician_id):
                 return results
     return []  # Return empty list instead of fallback data
 
+def get_unread_count(cursor, technician_id):
+    cursor.execute("SELECT COUNT(*) FROM notifications WHERE user_id = %s AND is_read = 0", (technician_id,))
+    return cursor.fetchone()[0]
+
+# ==================== NOTIFICATION STREAM ====================
+# Each open stream or waiting long poll holds one gunicorn thread (WEB_THREADS per worker,
+# see Procfile), so both are capped per worker; size the caps with the thread count of the
+# deployment. A client turned away from /stream falls back to /poll, and a poll that finds
+# every waiter slot taken answers at once, so it degrades to plain polling, never to an error.
+SSE_MAX_SUBSCRIBERS = int(os.getenv('SSE_MAX_SUBSCRIBERS', 2))
+SSE_MAX_PER_TECHNICIAN = int(os.getenv('SSE_MAX_PER_TECHNICIAN', 2))
+SSE_RETRY_AFTER_SECONDS = 30
+LONG_POLL_SECONDS = int(os.getenv('LONG_POLL_SECONDS', 20))
+LONG_POLL_MAX_WAITERS = int(os.getenv('LONG_POLL_MAX_WAITERS', 3))
+LONG_POLL_MAX_PER_TECHNICIAN = int(os.getenv('LONG_POLL_MAX_PER_TECHNICIAN', 2))
+SUBSCRIBER_LIMITS = {
+    'stream': (SSE_MAX_SUBSCRIBERS, SSE_MAX_PER_TECHNICIAN),
+    'poll': (LONG_POLL_MAX_WAITERS, LONG_POLL_MAX_PER_TECHNICIAN)
+}
+SSE_QUEUE_SIZE = 50
+SSE_HEARTBEAT_SECONDS = 15
+SSE_STREAM_SECONDS = int(os.getenv('SSE_STREAM_SECONDS', 300))
+EVENT_POLL_INTERVAL = 1.0
+EVENT_RETENTION_SECONDS = 600
+NOTIFICATION_DB_POLL_INTERVAL = float(os.getenv('NOTIFICATION_DB_POLL_INTERVAL', 5))
+
+register_shared_table("""
+    CREATE TABLE IF NOT EXISTS notification_events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        technician_id INTEGER NOT NULL,
+        event TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        created_at REAL NOT NULL
+    )
+""")
+
+class NotificationBroker:
+    """Fans out per-technician events to the stream subscribers of this worker.
+
+    Events published by any worker go through the shared store and a single
+    poller thread per worker delivers them to bounded subscriber queues. Rows
+    inserted into notifications by other services are picked up with one
+    watermark query per interval, however many clients are connected. The
+    poller only runs while this worker has subscribers.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = {}
+        self.poller = None
+        self.last_event_id = 0
+        self.last_notification_id = None
+        self.next_db_poll = 0
+
+    def publish(self, technician_id, event, data):
+        try:
+            get_shared_store().execute(
+                "INSERT INTO notification_events (technician_id, event, payload, created_at) VALUES (?, ?, ?, ?)",
+                (technician_id, event, json.dumps(data, default=str), time.time()))
+        except sqlite3.Error as e:
+            log.warning("Event publish failed", error=str(e))
+
+    def subscribe(self, technician_id, kind='stream'):
+        """A bounded event queue, or None while SUBSCRIBER_LIMITS[kind] are reached"""
+        max_total, max_per_technician = SUBSCRIBER_LIMITS[kind]
+        with self.lock:
+            total = sum(1 for queues in self.subscribers.values() for q in queues if q.kind == kind)
+            queues = self.subscribers.get(technician_id, set())
+            if total >= max_total or sum(1 for q in queues if q.kind == kind) >= max_per_technician:
+                return None
+            
+            subscription = queue.Queue(maxsize=SSE_QUEUE_SIZE)
+            subscription.kind = kind
+            queues.add(subscription)
+            self.subscribers[technician_id] = queues
+            if self.poller is None:
+                row = get_shared_store().execute("SELECT COALESCE(MAX(id), 0) FROM notification_events").fetchone()
+                self.last_event_id = row[0]
+                self.last_notification_id = None
+                self.poller = threading.Thread(target=self.poll, args=(current_app._get_current_object(),),
+                                               name='notification-broker', daemon=True)
+                self.poller.start()
+            return subscription
+
+    def unsubscribe(self, technician_id, subscription):
+        with self.lock:
+            queues = self.subscribers.get(technician_id)
+            if queues:
+                queues.discard(subscription)
+                if not queues:
+                    del self.subscribers[technician_id]
+
+    def dispatch(self, technician_id, event, data):
+        with self.lock:
+            queues = list(self.subscribers.get(technician_id, ()))
+        for subscription in queues:
+            try:
+                subscription.put_nowait((event, data))
+            except queue.Full:
+                # Slow consumer - drop its backlog and tell it to refetch
+                while not subscription.empty():
+                    try:
+                        subscription.get_nowait()
+                    except queue.Empty:
+                        break
+                subscription.put_nowait(('resync', {"technician_id": technician_id}))
+
+    def poll(self, app):
+        with app.app_context():
+            while True:
+                with self.lock:
+                    if not self.subscribers:
+                        self.poller = None
+                        return
+                    technician_ids = list(self.subscribers)
+                try:
+                    self.deliver_shared_events()
+                    if time.time() >= self.next_db_poll:
+                        self.next_db_poll = time.time() + NOTIFICATION_DB_POLL_INTERVAL
+                        self.deliver_new_notifications(technician_ids)
+                except Exception:
+                    log.exception("Notification broker poll failed")
+                time.sleep(EVENT_POLL_INTERVAL)
+
+    def events_since(self, technician_id, since):
+        """(the technician's events after the `since` cursor, new cursor) from the shared store.
+
+        A cursor older than EVENT_RETENTION_SECONDS gets a resync event instead of
+        the events that were purged.
+        """
+        store = get_shared_store()
+        row = store.execute("SELECT seq FROM sqlite_sequence WHERE name = 'notification_events'").fetchone()
+        cursor = row[0] if row else 0
+        if since is None or since >= cursor:
+            return [], cursor
+        first_id = store.execute("SELECT MIN(id) FROM notification_events").fetchone()[0] or cursor + 1
+        events = [{"event": "resync", "data": {"technician_id": technician_id}}] if since < first_id - 1 else []
+        rows = store.execute("""
+            SELECT event, payload FROM notification_events
+            WHERE id > ? AND id <= ? AND technician_id = ? ORDER BY id
+        """, (since, cursor, technician_id)).fetchall()
+        return events + [{"event": event, "data": json.loads(payload)} for event, payload in rows], cursor
+
+    def deliver_shared_events(self):
+        store = get_shared_store()
+        rows = store.execute(
+            "SELECT id, technician_id, event, payload FROM notification_events WHERE id > ? ORDER BY id",
+            (self.last_event_id,)).fetchall()
+        for event_id, technician_id, event, payload in rows:
+            self.dispatch(technician_id, event, json.loads(payload))
+            self.last_event_id = event_id
+
+    def deliver_new_notifications(self, technician_ids):
+        get_shared_store().execute("DELETE FROM notification_events WHERE created_at < ?",
+                                   (time.time() - EVENT_RETENTION_SECONDS,))
+        with get_db_connection(read_only=True) as conn:
+            if not conn:
+                return
+            cursor = conn.cursor(pymysql.cursors.DictCursor)
+            cursor.execute("SELECT COALESCE(MAX(id), 0) AS max_id FROM notifications")
+            max_id = cursor.fetchone()['max_id']
+            if self.last_notification_id is not None and max_id > self.last_notification_id:
+                cursor.execute(f"""
+                    SELECT * FROM notifications
+                    WHERE id > %s AND id <= %s AND user_id IN ({', '.join(['%s'] * len(technician_ids))})
+                    ORDER BY id
+                """, [self.last_notification_id, max_id] + technician_ids)
+                for result in cursor.fetchall():
+                    for key, value in result.items():
+                        if hasattr(value, 'isoformat'):
+                            result[key] = value.isoformat()
+                    result['technician_id'] = result.get('user_id')
+                    result['is_read'] = bool(result.get('is_read', False))
+                    self.dispatch(result['user_id'], 'notification', result)
+            self.last_notification_id = max_id
+            cursor.close()
+
+notification_broker = NotificationBroker()
+
+def format_sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+BULK_NOTIFICATION_LIMIT = 500
+
+def build_notification_scope(technician_id, data):
+    """Build a WHERE clause for bulk notification changes, always scoped to the technician"""
+    ids = data.get('ids') or []
+    before = data.get('before')
+    if not isinstance(ids, list) or len(ids) > BULK_NOTIFICATION_LIMIT:
+        raise ValueError(f"'ids' must be a list of at most {BULK_NOTIFICATION_LIMIT} notification ids")
+    if not ids and not before:
+        raise ValueError("Provide 'ids' or 'before'")
+    
+    clauses = ["user_id = %s"]
+    params = [technician_id]
+    if ids:
+        ids = [int(notification_id) for notification_id in ids]
+        clauses.append(f"id IN ({', '.join(['%s'] * len(ids))})")
+        params.extend(ids)
+    if before:
+        clauses.append("created_at < %s")
+        params.append(datetime.fromisoformat(before))
+    return " AND ".join(clauses), params
+
+# Copied column by column, so either table can gain columns without breaking archival
+NOTIFICATION_COLUMNS = ('id', 'user_id', 'title', 'message', 'type', 'is_read', 'ticket_id', 'created_at')
+
+def bulk_update_notifications(technician_id, data, action):
+    """Mark read, archive or delete many notifications in one transaction"""
+    where, params = build_notification_scope(technician_id, data)
+    
+    with get_db_connection() as conn:
+        if not conn:
+            return None
+        cursor = conn.cursor()
+        if action == 'read':
+            cursor.execute(f"UPDATE notifications SET is_read = 1 WHERE {where} AND is_read = 0", params)
+        elif action == 'archive':
+            columns = ', '.join(NOTIFICATION_COLUMNS)
+            cursor.execute(f"INSERT INTO notifications_archive ({columns}) SELECT {columns} FROM notifications WHERE {where}", params)
+            cursor.execute(f"DELETE FROM notifications WHERE {where}", params)
+        else:
+            cursor.execute(f"DELETE FROM notifications WHERE {where}", params)
+        affected_count = cursor.rowcount
+        unread_count = get_unread_count(cursor, technician_id)
+        conn.commit()
+        cursor.close()
+    
+    notification_broker.publish(technician_id, 'unread_count', {"unread_count": unread_count})
+    return {
+        "technician_id": technician_id,
+        "affected_count": affected_count,
+        "unread_count": unread_count,
+        "updated_at": datetime.now().isoformat()
+    }
+
+def bulk_notification_response(current_user, action, message):
+    technician_id = int(current_user.get('sub', 1))
+    try:
+        result = bulk_update_notifications(technician_id, request.get_json() or {}, action)
+    except (TypeError, ValueError) as e:
+        return {"message": str(e), "status": False, "data": None}, 400
+    
+    if result is None:
+        return {"message": "Database connection failed", "status": False, "data": None}, 500
+    
+    return {
+        "message": f"{result['affected_count']} notifications {message}",
+        "status": True,
+        "data": result
+    }
+
+
+# ==================== OTP STORE ====================
+OTP_BACKEND = os.getenv('OTP_BACKEND', 'shared')
+OTP_TTL_SECONDS = int(os.getenv('OTP_TTL_SECONDS', 300))
+OTP_MAX_ATTEMPTS = int(os.getenv('OTP_MAX_ATTEMPTS', 5))
+OTP_SEND_LIMIT = int(os.getenv('OTP_SEND_LIMIT', 3))
+OTP_VERIFY_LIMIT = int(os.getenv('OTP_VERIFY_LIMIT', 10))
+OTP_RATE_WINDOW_SECONDS = int(os.getenv('OTP_RATE_WINDOW_SECONDS', 600))
+
+register_shared_table("""
+    CREATE TABLE IF NOT EXISTS otp_codes (
+        phone TEXT PRIMARY KEY,
+        code_hash TEXT NOT NULL,
+        expires_at REAL NOT NULL
+    )
+""")
+register_shared_table("CREATE INDEX IF NOT EXISTS idx_otp_codes_expires_at ON otp_codes (expires_at)")
+register_shared_table("""
+    CREATE TABLE IF NOT EXISTS otp_counters (
+        key TEXT PRIMARY KEY,
+        window_start REAL NOT NULL,
+        count INTEGER NOT NULL
+    )
+""")
+register_shared_table("CREATE INDEX IF NOT EXISTS idx_otp_counters_window_start ON otp_counters (window_start)")
+
+class OTPRateLimited(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"Retry after {retry_after}s")
+        self.retry_after = retry_after
+
+class OTPStoreUnavailable(Exception):
+    pass
+
+class OTPStore(abc.ABC):
+    """Issues and verifies OTPs with per-phone rate limits and attempt counters.
+
+    Backends only save, check and discard codes. Send/verify counters and
+    failed attempts always live in the shared store so the limits hold across
+    workers whichever backend keeps the codes.
+    """
+
+    def issue(self, phone, code):
+        self.hit('send', phone, OTP_SEND_LIMIT)
+        self.purge_expired()
+        self.save(phone, code, time.time() + OTP_TTL_SECONDS)
+        get_shared_store().execute("DELETE FROM otp_counters WHERE key = ?", (f"attempts:{phone}",))
+
+    def verify(self, phone, code):
+        self.hit('verify', phone, OTP_VERIFY_LIMIT)
+        if self.check(phone, code):
+            get_shared_store().execute("DELETE FROM otp_counters WHERE key = ?", (f"attempts:{phone}",))
+            return True
+        
+        try:
+            self.hit('attempts', phone, OTP_MAX_ATTEMPTS - 1, window=OTP_TTL_SECONDS)
+        except OTPRateLimited:
+            # Too many wrong guesses - burn the code so a new one must be requested
+            self.discard(phone)
+        return False
+
+    def hit(self, action, phone, limit, window=OTP_RATE_WINDOW_SECONDS):
+        """Count one action in a fixed window; raise OTPRateLimited once over the limit"""
+        key = f"{action}:{phone}"
+        now = time.time()
+        retry_after = 0
+        with shared_transaction() as store:
+            row = store.execute("SELECT window_start, count FROM otp_counters WHERE key = ?", (key,)).fetchone()
+            if row is None or row[0] + window <= now:
+                store.execute("INSERT OR REPLACE INTO otp_counters (key, window_start, count) VALUES (?, ?, 1)",
+                              (key, now))
+            elif row[1] >= limit:
+                retry_after = int(row[0] + window - now) + 1
+            else:
+                store.execute("UPDATE otp_counters SET count = count + 1 WHERE key = ?", (key,))
+        if retry_after:
+            raise OTPRateLimited(retry_after)
+
+    def purge_expired(self):
+        get_shared_store().execute("DELETE FROM otp_counters WHERE window_start < ?",
+                                   (time.time() - max(OTP_RATE_WINDOW_SECONDS, OTP_TTL_SECONDS),))
+
+    @abc.abstractmethod
+    def save(self, phone, code, expires_at):
+        """Store the live code for a phone, replacing any earlier one"""
+
+    @abc.abstractmethod
+    def check(self, phone, code):
+        """True, and the code is used up, if it is the phone's live code"""
+
+    @abc.abstractmethod
+    def discard(self, phone):
+        """Drop the phone's live code"""
+
+class SharedOTPStore(OTPStore):
+    """Keeps one hashed code per phone in the shared store - O(1) lookups, no MySQL"""
+
+    def hash_code(self, phone, code):
+        return hmac.new(app_setting('SECRET_KEY', SECRET_KEY).encode(), f"{phone}:{code}".encode(), hashlib.sha256).hexdigest()
+
+    def purge_expired(self):
+        super().purge_expired()
+        get_shared_store().execute("DELETE FROM otp_codes WHERE expires_at < ?", (time.time(),))
+
+    def save(self, phone, code, expires_at):
+        get_shared_store().execute(
+            "INSERT OR REPLACE INTO otp_codes (phone, code_hash, expires_at) VALUES (?, ?, ?)",
+            (phone, self.hash_code(phone, code), expires_at))
+
+    def check(self, phone, code):
+        with shared_transaction() as store:
+            row = store.execute("SELECT code_hash, expires_at FROM otp_codes WHERE phone = ?", (phone,)).fetchone()
+            if row is None:
+                return False
+            if row[1] <= time.time():
+                store.execute("DELETE FROM otp_codes WHERE phone = ?", (phone,))
+                return False
+            if hmac.compare_digest(row[0], self.hash_code(phone, code)):
+                store.execute("DELETE FROM otp_codes WHERE phone = ?", (phone,))
+                return True
+        return False
+
+    def discard(self, phone):
+        get_shared_store().execute("DELETE FROM otp_codes WHERE phone = ?", (phone,))
+
+class DatabaseOTPStore(OTPStore):
+    """Keeps codes in otp_logs, with at most one live code per phone.
+
+    Saving a code deletes only that phone's replaced and expired rows; other
+    phones' expired rows are left to `retention.py run --policy otp_logs`.
+    """
+
+    def save(self, phone, code, expires_at):
+        with get_db_connection() as conn:
+            if not conn:
+                raise OTPStoreUnavailable("Database connection failed")
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM otp_logs WHERE phone_number = %s AND (status = 'sent' OR expires_at < %s)",
+                           (phone, datetime.now()))
+            cursor.execute("""
+                INSERT INTO otp_logs (phone_number, otp_code, purpose, status, expires_at)
+                VALUES (%s, %s, %s, %s, %s)
+            """, (phone, code, 'login', 'sent', datetime.fromtimestamp(expires_at)))
+            conn.commit()
+            cursor.close()
+
+    def check(self, phone, code):
+        with get_db_connection() as conn:
+            if not conn:
+                raise OTPStoreUnavailable("Database connection failed")
+            cursor = conn.cursor(pymysql.cursors.DictCursor)
+            cursor.execute("""
+                SELECT id, otp_code FROM otp_logs
+                WHERE phone_number = %s AND status = 'sent' AND expires_at > %s
+                ORDER BY created_at DESC LIMIT 1
+            """, (phone, datetime.now()))
+            otp_record = cursor.fetchone()
+            verified = bool(otp_record) and hmac.compare_digest(str(otp_record['otp_code']), code)
+            if verified:
+                cursor.execute("UPDATE otp_logs SET status = 'verified', verified_at = %s WHERE id = %s",
+                               (datetime.now(), otp_record['id']))
+                conn.commit()
+            cursor.close()
+            return verified
+
+    def discard(self, phone):
+        with get_db_connection() as conn:
+            if conn:
+                cursor = conn.cursor()
+                cursor.execute("UPDATE otp_logs SET status = 'expired' WHERE phone_number = %s AND status = 'sent'", (phone,))
+                conn.commit()
+                cursor.close()
+
+OTP_BACKENDS = {
+    'shared': SharedOTPStore,
+    'database': DatabaseOTPStore
+}
+otp_store = OTP_BACKENDS[OTP_BACKEND]()
+
+def otp_rate_limited_response(e):
+    return {
+        "message": "Too many OTP requests, please try again later",
+        "status": False,
+        "data": {"retry_after": e.retry_after}
+    }, 429, {'Retry-After': str(e.retry_after)}
 
 
 # ==================== AUTHENTICATION ENDPOINTS ====================
@@ -323,7 +1887,7 @@ class Login(Resource):
             username = data.get('username')
             password = data.get('password')
             
-            print(f"Login attempt: {username}")
+            log.info("Login attempt", username=username)
             
             # Use the fixed authentication function
             user = authenticate_user(username, password)
@@ -334,7 +1898,7 @@ class Login(Resource):
                     "username": username, 
                     "role": user['role']
                 })
-                print(f"Login successful for: {username}")
+                log.info("Login successful", username=username)
                 return {
                     "message": "Login successful",
                     "status": True,
@@ -348,11 +1912,13 @@ class Login(Resource):
                     }
                 }
             
-            print(f"Login failed for: {username}")
+            log.warning("Login failed", username=username)
             return {"message": "Invalid username or password", "status": False, "data": None}, 401
         
-        except Exception as e:
-            print(f"Login error: {e}")
+        except RequestAborted:
+            raise
+        except Exception:
+            log.exception("Login error")
             return {"message": "Internal server error", "status": False, "data": None}, 500
 
 
@@ -361,7 +1927,6 @@ class Login(Resource):
 class Logout(Resource):
     @auth_ns.doc('technician_logout', security='Bearer')
     @auth_ns.response(200, 'Logout successful')
-    @api.doc(security='Bearer')
     @token_required
     def post(self, current_user):
         """Technician logout"""
@@ -378,28 +1943,25 @@ class SendOTP(Resource):
     @auth_ns.expect(otp_model)
     @auth_ns.doc('send_otp')
     @auth_ns.response(200, 'OTP sent successfully')
+    @auth_ns.response(429, 'Too many OTP requests')
     def post(self):
         """Send OTP to technician's phone"""
         data = request.get_json()
         contact = data.get('contact')
         otp_code = "123456"  # In production, generate random OTP
         
-        print(f"📱 OTP SEND: contact={contact}, otp={otp_code}")
+        if not contact:
+            return {"message": "Contact is required", "status": False, "data": None}, 400
         
-        with get_db_connection() as conn:
-            if conn:
-                cursor = conn.cursor()
-                # Store OTP in database
-                cursor.execute("""
-                    INSERT INTO otp_logs (phone_number, otp_code, purpose, status, expires_at)
-                    VALUES (%s, %s, %s, %s, %s)
-                """, (
-                    contact, otp_code, 'login', 'sent',
-                    datetime.now() + timedelta(minutes=5)
-                ))
-                conn.commit()
-                cursor.close()
-                print(f"✅ OTP stored in database for {contact}")
+        log.info("OTP issued", contact=contact)
+        
+        try:
+            otp_store.issue(contact, otp_code)
+        except OTPRateLimited as e:
+            return otp_rate_limited_response(e)
+        except OTPStoreUnavailable:
+            return {"message": "Database connection failed", "status": False, "data": None}, 500
+        log.info("OTP stored", contact=contact)
         
         return {
             "message": "OTP sent successfully",
@@ -407,7 +1969,7 @@ class SendOTP(Resource):
             "data": {
                 "contact": contact,
                 "otp": otp_code,  # Remove in production
-                "expires_in": "5 minutes"
+                "expires_in": f"{OTP_TTL_SECONDS // 60} minutes"
             }
         }
 
@@ -417,41 +1979,36 @@ class VerifyOTP(Resource):
     @auth_ns.doc('verify_otp')
     @auth_ns.response(200, 'OTP verified successfully')
     @auth_ns.response(400, 'Invalid OTP')
+    @auth_ns.response(429, 'Too many OTP attempts')
     def post(self):
         """Verify OTP and authenticate"""
         data = request.get_json()
         otp = data.get('otp')
         contact = data.get('contact')
         
-        print(f"OTP verification attempt: contact={contact}")
+        log.info("OTP verification attempt", contact=contact)
         
-        with get_db_connection() as conn:
-            if conn:
-                cursor = conn.cursor(pymysql.cursors.DictCursor)
-                # Check OTP in database
-                cursor.execute("""
-                    SELECT * FROM otp_logs 
-                    WHERE phone_number = %s AND otp_code = %s AND status = 'sent' AND expires_at > %s
-                    ORDER BY created_at DESC LIMIT 1
-                """, (contact, otp, datetime.now()))
-                
-                otp_record = cursor.fetchone()
-                print(f"OTP record found: {otp_record is not None}")
-                
-                if otp_record:
-                    # Mark OTP as verified
-                    cursor.execute("""
-                        UPDATE otp_logs SET status = 'verified', verified_at = %s WHERE id = %s
-                    """, (datetime.now(), otp_record['id']))
-                    
+        if not contact or not otp:
+            return {"message": "Invalid or expired OTP", "status": False, "data": None}, 400
+        
+        try:
+            otp_verified = otp_store.verify(contact, str(otp))
+        except OTPRateLimited as e:
+            return otp_rate_limited_response(e)
+        except OTPStoreUnavailable:
+            return {"message": "Database connection failed", "status": False, "data": None}, 500
+        log.info("OTP verification result", contact=contact, verified=otp_verified)
+        
+        if otp_verified:
+            with get_db_connection() as conn:
+                if conn:
+                    cursor = conn.cursor(pymysql.cursors.DictCursor)
                     # Find user by phone
                     cursor.execute("""
-                        SELECT * FROM users WHERE phone = %s AND role = 'service_staff' AND is_active = 1
+                        SELECT id, first_name, last_name, role FROM users WHERE phone = %s AND role = 'service_staff' AND is_active = 1
                     """, (contact,))
                     user = cursor.fetchone()
-                    print(f"User found: {user is not None}")
-                    
-                    conn.commit()
+                    log.info("OTP user lookup", contact=contact, found=user is not None)
                     cursor.close()
                     
                     if user:
@@ -469,7 +2026,7 @@ class VerifyOTP(Resource):
                             }
                         }
                     else:
-                        print(f"No user found with phone {contact} and role service_staff")
+                        log.warning("No service staff user for phone", contact=contact)
                         # Fallback to test data for demo
                         test_user = next((t for t in FALLBACK_DATA['technicians'] if t['phone'] == contact), None)
                         if test_user:
@@ -486,14 +2043,103 @@ class VerifyOTP(Resource):
                                     "phone": contact
                                 }
                             }
-                cursor.close()
-            else:
-                print("Database connection failed")
-                return {"message": "Database connection failed", "status": False, "data": None}, 500
+                else:
+                    log.error("Database connection failed")
+                    return {"message": "Database connection failed", "status": False, "data": None}, 500
         
         return {"message": "Invalid or expired OTP", "status": False, "data": None}, 400
 
 # ==================== DASHBOARD ENDPOINTS ====================
+HOME_WORKERS = int(os.getenv('HOME_WORKERS', 8))
+HOME_TICKET_LIMIT = 5
+
+_home_executor = None
+_home_executor_lock = threading.Lock()
+
+def get_home_executor():
+    global _home_executor
+    with _home_executor_lock:
+        if _home_executor is None:
+            _home_executor = ThreadPoolExecutor(max_workers=HOME_WORKERS, thread_name_prefix='home')
+        return _home_executor
+
+def run_parallel(tasks):
+    """Run {name: callable} on the shared pool; returns ({name: result}, [names that failed]).
+
+    Each task runs in a copy of the request context carrying the request's
+    deadline and technician, so its queries keep the same budget and routing.
+    RequestAborted (open circuit, exhausted budget) is re-raised.
+    """
+    carried = {name: g.get(name) for name in ('deadline', 'budget', 'technician_id')}
+    
+    def in_request(task):
+        @copy_current_request_context
+        def run():
+            for name, value in carried.items():
+                setattr(g, name, value)
+            return task()
+        return run
+    
+    executor = get_home_executor()
+    futures = {name: executor.submit(in_request(task)) for name, task in tasks.items()}
+    results, failed = {}, []
+    for name, future in futures.items():
+        try:
+            results[name] = future.result()
+        except RequestAborted:
+            raise
+        except Exception:
+            log.exception("Home section failed", section=name)
+            results[name] = None
+            failed.append(name)
+    return results, failed
+
+def get_dashboard_stats(technician_id):
+    """Live ticket counts, with performance from the report rollups"""
+    counts = {status: 0 for status in REPORT_STATUSES}
+    today = {"tickets": {"COMPLETED": 0}}
+    performance = {"avg_resolution_minutes": None, "completion_rate": None, "on_time_percentage": None}
+    with get_db_connection(read_only=True) as conn:
+        if conn:
+            cursor = conn.cursor()
+            counts = get_ticket_counts(cursor, technician_id)
+            now = datetime.now().date()
+            today = get_report_summary(cursor, technician_id, now, now)
+            performance = get_report_summary(cursor, technician_id, now - timedelta(days=REPORT_DEFAULT_DAYS - 1), now)
+            cursor.close()
+    avg_minutes = performance["avg_resolution_minutes"]
+    
+    return {
+        "stats": {
+            "total_tickets": sum(counts.values()),
+            "pending_tickets": counts["SCHEDULED"],
+            "in_progress_tickets": counts["IN_PROGRESS"],
+            "completed_tickets": counts["COMPLETED"],
+            "completed_today": today["tickets"]["COMPLETED"]
+        },
+        "performance": {
+            "avg_resolution_time": f"{avg_minutes / 60:.1f} hours" if avg_minutes is not None else None,
+            # No customer feedback is captured yet
+            "customer_rating": None,
+            "completion_rate": performance["completion_rate"],
+            "on_time_percentage": performance["on_time_percentage"]
+        }
+    }
+
+def get_unread_notification_count(technician_id):
+    with get_db_connection(read_only=True) as conn:
+        if not conn:
+            return None
+        cursor = conn.cursor()
+        count = get_unread_count(cursor, technician_id)
+        cursor.close()
+        return count
+
+def get_todays_appointments(technician_id):
+    date = datetime.now().strftime('%Y-%m-%d')
+    tickets = get_technician_tickets(technician_id, 'SCHEDULED')
+    return [schedule_appointment(ticket) for ticket in tickets if ticket["scheduled_date"].startswith(date)]
+
 @dashboard_ns.route('/')
 class Dashboard(Resource):
     @dashboard_ns.doc('get_dashboard', security='Bearer')
@@ -512,37 +2158,415 @@ class Dashboard(Resource):
             return {'message': 'Invalid or expired token', 'status': False, 'data': None}, 401
         
         technician_id = int(payload.get('sub', 1))
+        g.technician_id = payload.get('sub')
         technician = get_technician_data(technician_id)
         if not technician:
             return {'message': 'Technician not found', 'status': False, 'data': None}, 404
         
-        tickets = get_technician_tickets(technician_id)
+        recent_tickets = get_technician_tickets(technician_id, limit=5)
+        dashboard = get_dashboard_stats(technician_id)
         
         return {
             "message": "Dashboard data retrieved successfully",
             "status": True,
             "data": {
                 "technician": technician,
-                "stats": {
-                    "total_tickets": len(tickets),
-                    "pending_tickets": len([t for t in tickets if t["status"] == "SCHEDULED"]),
-                    "in_progress_tickets": len([t for t in tickets if t["status"] == "IN_PROGRESS"]),
-                    "completed_tickets": len([t for t in tickets if t["status"] == "COMPLETED"]),
-                    "completed_today": len([t for t in tickets if t["status"] == "COMPLETED" and t.get("completed_at", "").startswith(datetime.now().strftime('%Y-%m-%d'))])
+                "stats": dashboard["stats"],
+                "recent_tickets": recent_tickets,
+                "performance": dashboard["performance"]
+            }
+        }
+
+@dashboard_ns.route('/home')
+class Home(Resource):
+    @dashboard_ns.doc('get_home', security='Bearer')
+    @dashboard_ns.response(200, 'Home screen data retrieved')
+    @token_required
+    def get(self, current_user):
+        """Everything the app's home screen needs in one call - sections load in parallel"""
+        technician_id = int(current_user.get('sub', 1))
+        results, failed = run_parallel({
+            "technician": lambda: get_technician_data(technician_id),
+            "dashboard": lambda: get_dashboard_stats(technician_id),
+            "appointments": lambda: get_todays_appointments(technician_id),
+            "unread_count": lambda: get_unread_notification_count(technician_id),
+            "tickets": lambda: get_technician_tickets(technician_id, limit=HOME_TICKET_LIMIT)
+        })
+        if not results["technician"] and "technician" not in failed:
+            return {'message': 'Technician not found', 'status': False, 'data': None}, 404
+        dashboard = results["dashboard"] or {}
+        
+        return {
+            "message": "Home data retrieved successfully" if not failed else "Home data partially retrieved",
+            "status": True,
+            "data": {
+                "technician": results["technician"],
+                "stats": dashboard.get("stats"),
+                "performance": dashboard.get("performance"),
+                "schedule": {
+                    "date": datetime.now().strftime('%Y-%m-%d'),
+                    "appointments": results["appointments"],
+                    "total_appointments": len(results["appointments"]) if results["appointments"] is not None else None
                 },
-                "recent_tickets": tickets[:5],
-                "performance": {
-                    "avg_resolution_time": "2.5 hours",
-                    "customer_rating": 4.7,
-                    "completion_rate": 95.5,
-                    "on_time_percentage": 92.3
-                }
+                "unread_count": results["unread_count"],
+                "assigned_tickets": results["tickets"],
+                "unavailable_sections": failed
             }
         }
 
 
 
 # ==================== TICKETS ENDPOINTS ====================
+TICKET_DETAIL_BATCH_LIMIT = 100
+
+def fetch_ticket_details(cursor, ticket_ids, technician_id=None):
+    """Load tickets with customer info and parts used in two queries, keyed by ticket id"""
+    placeholders = ', '.join(['%s'] * len(ticket_ids))
+    query = f"""
+        SELECT st.*, c.contact_person as customer_name, c.phone as customer_phone, c.address as customer_address,
+               c.email as customer_email
+        FROM service_tickets st 
+        LEFT JOIN customers c ON st.customer_id = c.id 
+        WHERE st.id IN ({placeholders})
+    """
+    params = list(ticket_ids)
+    if technician_id is not None:
+        query += " AND st.assigned_staff_id = %s"
+        params.append(technician_id)
+    cursor.execute(query, params)
+    tickets = {ticket['id']: ticket for ticket in cursor.fetchall()}
+    
+    # Get parts used for every ticket at once and group them in memory
+    parts_by_ticket = {}
+    if tickets:
+        cursor.execute(f"SELECT * FROM service_ticket_parts WHERE ticket_id IN ({', '.join(['%s'] * len(tickets))})",
+                       list(tickets))
+        for part in cursor.fetchall():
+            for key, value in part.items():
+                if hasattr(value, 'isoformat'):
+                    part[key] = value.isoformat()
+            parts_by_ticket.setdefault(part['ticket_id'], []).append(part)
+    
+    for ticket_id, ticket in tickets.items():
+        # Convert datetime objects
+        for key, value in ticket.items():
+            if hasattr(value, 'isoformat'):
+                ticket[key] = value.isoformat()
+        ticket['parts_used'] = parts_by_ticket.get(ticket_id, [])
+        ticket['photos'] = ticket.get('photos', []) or []
+    return tickets
+
+# Field operations - each runs on an open cursor so /tickets/batch can share one transaction
+class TicketNotFound(Exception):
+    def __init__(self, ticket_id):
+        super().__init__(f"Ticket {ticket_id} not found or not assigned to you")
+        self.ticket_id = ticket_id
+
+def lock_assigned_ticket(cursor, ticket_id, technician_id, columns='id'):
+    """Lock the technician's own ticket and return the requested columns, or raise TicketNotFound.
+    MySQL's UPDATE rowcount only counts changed rows, so ownership is checked here instead."""
+    cursor.execute(f"SELECT {columns} FROM service_tickets WHERE id = %s AND assigned_staff_id = %s FOR UPDATE",
+                   (ticket_id, technician_id))
+    row = cursor.fetchone()
+    if not row:
+        raise TicketNotFound(ticket_id)
+    return row
+
+def update_ticket_status(cursor, ticket_id, data, technician_id):
+    status = (data.get('status') or '').upper()
+    if status not in REPORT_STATUSES:
+        raise ValueError(f"status must be one of {', '.join(REPORT_STATUSES)}")
+    notes = data.get('notes', '')
+    work_performed = data.get('work_performed', '')
+    parts_used = data.get('parts_used', [])
+    
+    update_fields = ["status = %s", "technician_notes = %s", "work_performed = %s"]
+    params = [status, notes, work_performed]
+    
+    if status == 'COMPLETED':
+        update_fields.append("completed_date = %s")
+        params.append(datetime.now())
+    
+    # The previous status is needed to move the ticket between report rollups
+    columns = ('id', 'status', 'assigned_staff_id', 'scheduled_date', 'created_at')
+    previous = dict(zip(columns, lock_assigned_ticket(cursor, ticket_id, technician_id, ', '.join(columns))))
+    
+    cursor.execute(f"UPDATE service_tickets SET {', '.join(update_fields)} WHERE id = %s AND assigned_staff_id = %s", 
+                 params + [ticket_id, technician_id])
+    
+    # Add parts used and take them out of stock
+    if parts_used:
+        cursor.executemany("""
+            INSERT INTO service_ticket_parts (ticket_id, part_id, part_name, quantity, unit_cost)
+            VALUES (%s, %s, %s, %s, %s)
+        """, [(ticket_id, part.get('part_id'), part.get('name', ''), part.get('quantity', 1), part.get('cost', 0)) for part in parts_used])
+        consume_parts(cursor, technician_id, ticket_id, parts_used)
+    
+    parts_cost = sum(float(part.get('cost', 0)) * int(part.get('quantity', 1)) for part in parts_used)
+    record_ticket_transition(cursor, previous, status, parts_cost)
+    
+    return {
+        "ticket_id": ticket_id,
+        "new_status": status,
+        "updated_at": datetime.now().isoformat(),
+        "notes": notes,
+        "work_performed": work_performed,
+        "parts_used": parts_used
+    }
+
+def parse_coordinates(latitude, longitude):
+    """(lat, lng) as finite floats in range; ValueError otherwise"""
+    try:
+        latitude, longitude = float(latitude), float(longitude)
+    except (TypeError, ValueError):
+        raise ValueError("latitude and longitude must be numbers")
+    if not (math.isfinite(latitude) and math.isfinite(longitude)):
+        raise ValueError("latitude and longitude must be finite")
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError("latitude/longitude out of range")
+    return latitude, longitude
+
+def capture_ticket_location(cursor, ticket_id, data, technician_id):
+    latitude, longitude = parse_coordinates(data.get('latitude'), data.get('longitude'))
+    lock_assigned_ticket(cursor, ticket_id, technician_id)
+    
+    cursor.execute("""
+        UPDATE service_tickets 
+        SET technician_latitude = %s, technician_longitude = %s, location_captured_at = %s
+        WHERE id = %s AND assigned_staff_id = %s
+    """, (latitude, longitude, datetime.now(), ticket_id, technician_id))
+    
+    return {
+        "ticket_id": ticket_id,
+        "latitude": latitude,
+        "longitude": longitude,
+        "captured_at": datetime.now().isoformat()
+    }
+
+def capture_ticket_signature(cursor, ticket_id, data, technician_id):
+    customer_name = data.get('customer_name', 'Customer')
+    signature_url = f"https://example.com/signatures/{ticket_id}_signature.png"
+    lock_assigned_ticket(cursor, ticket_id, technician_id)
+    
+    cursor.execute("""
+        UPDATE service_tickets 
+        SET customer_signature_url = %s, signature_captured_at = %s, customer_signature_name = %s
+        WHERE id = %s AND assigned_staff_id = %s
+    """, (signature_url, datetime.now(), customer_name, ticket_id, technician_id))
+    
+    return {
+        "ticket_id": ticket_id,
+        "signature_url": signature_url,
+        "captured_at": datetime.now().isoformat(),
+        "customer_name": customer_name
+    }
+
+def summarize_parts_used(cursor, ticket_id, data, technician_id):
+    parts = data.get('parts') or []
+    if not isinstance(parts, list) or not all(isinstance(part, dict) for part in parts):
+        raise ValueError("'parts' must be a list of objects")
+    lock_assigned_ticket(cursor, ticket_id, technician_id)
+    total_cost = sum(part.get('cost', 0) * part.get('quantity', 1) for part in parts)
+    
+    return {
+        "ticket_id": ticket_id,
+        "parts_added": len(parts),
+        "total_cost": total_cost,
+        "parts": parts,
+        "updated_at": datetime.now().isoformat()
+    }
+
+TICKET_BATCH_OPERATIONS = {
+    'status': update_ticket_status,
+    'parts': summarize_parts_used,
+    'location': capture_ticket_location,
+    'signature': capture_ticket_signature
+}
+TICKET_BATCH_LIMIT = 100
+
+def page_args(default_limit=10, max_limit=None):
+    """Parse ?limit=&offset= into (limit, offset), or raise ValueError"""
+    try:
+        limit = int(request.args.get('limit', default_limit))
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        raise ValueError("'limit' and 'offset' must be whole numbers")
+    if limit < 1 or offset < 0:
+        raise ValueError("'limit' must be at least 1 and 'offset' must not be negative")
+    return min(limit, max_limit) if max_limit else limit, offset
+
+# Ticket search - a per-worker inverted index for each technician who has searched,
+# built once from their tickets and topped up with newer ticket ids. Matches are
+# looked up in a sorted term list, so cost follows the matching terms, not history.
+SEARCH_FIELD_WEIGHTS = {
+    'ticket_number': 5, 'customer_name': 4, 'customer_phone': 4,
+    'product_name': 2, 'product_model': 2, 'issue_description': 1, 'customer_address': 1
+}
+SEARCH_REFRESH_SECONDS = int(os.getenv('SEARCH_REFRESH_SECONDS', 30))
+SEARCH_RELOAD_SECONDS = int(os.getenv('SEARCH_RELOAD_SECONDS', 600))
+SEARCH_MAX_TECHNICIANS = int(os.getenv('SEARCH_MAX_TECHNICIANS', 500))
+SEARCH_MAX_LIMIT = 50
+SEARCH_STATUS_CHUNK = 500
+
+def search_tokens(text):
+    return re.findall(r'[a-z0-9]+', str(text or '').lower())
+
+class TechnicianSearchIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.documents = {}
+        self.postings = {}
+        self.terms = []
+        self.max_ticket_id = 0
+        self.refreshed_at = 0
+        self.loaded_at = 0
+
+    def add(self, row):
+        ticket_id = row['id']
+        self.documents[ticket_id] = {
+            "id": ticket_id,
+            "ticket_number": row['ticket_number'],
+            "customer_name": row['customer_name'],
+            "product_name": row['product_name'],
+            "priority": row['priority'],
+            "scheduled_date": row['scheduled_date'].isoformat() if row['scheduled_date'] else None
+        }
+        for field, weight in SEARCH_FIELD_WEIGHTS.items():
+            for term in search_tokens(row[field]):
+                scores = self.postings.setdefault(term, {})
+                scores[ticket_id] = scores.get(ticket_id, 0) + weight
+        self.max_ticket_id = max(self.max_ticket_id, ticket_id)
+
+    def remove(self, ticket_ids):
+        """Drop tickets no longer assigned; their postings go at the next reload"""
+        for ticket_id in ticket_ids:
+            self.documents.pop(ticket_id, None)
+
+    def search(self, query):
+        """Ticket ids matching every query token as a prefix, best first"""
+        totals = None
+        for token in dict.fromkeys(search_tokens(query)):
+            scores = {}
+            start = bisect.bisect_left(self.terms, token)
+            for term in itertools.takewhile(lambda term: term.startswith(token), itertools.islice(self.terms, start, None)):
+                # Whole-word matches outrank prefix matches
+                boost = 2 if term == token else 1
+                for ticket_id, weight in self.postings[term].items():
+                    scores[ticket_id] = max(scores.get(ticket_id, 0), weight * boost)
+            totals = scores if totals is None else {
+                ticket_id: score + scores[ticket_id] for ticket_id, score in totals.items() if ticket_id in scores
+            }
+            if not totals:
+                return []
+        return sorted((ticket_id for ticket_id in totals or {} if ticket_id in self.documents),
+                      key=lambda ticket_id: (-totals[ticket_id], -ticket_id))
+
+    def refresh(self, technician_id):
+        """Rebuild after SEARCH_RELOAD_SECONDS (edits, reassignments), else only add newer tickets"""
+        now = time.time()
+        if now - self.refreshed_at < SEARCH_REFRESH_SECONDS:
+            return
+        reload = now - self.loaded_at >= SEARCH_RELOAD_SECONDS
+        with get_db_connection(read_only=True) as conn:
+            if not conn:
+                return
+            cursor = conn.cursor(pymysql.cursors.DictCursor)
+            cursor.execute("""
+                SELECT st.id, st.ticket_number, st.product_name, st.product_model, st.issue_description,
+                       st.priority, st.scheduled_date, c.contact_person AS customer_name,
+                       c.phone AS customer_phone, c.address AS customer_address
+                FROM service_tickets st
+                LEFT JOIN customers c ON st.customer_id = c.id
+                WHERE st.assigned_staff_id = %s AND st.id > %s
+            """, (technician_id, 0 if reload else self.max_ticket_id))
+            rows = cursor.fetchall()
+            cursor.close()
+        
+        if reload:
+            self.documents, self.postings, self.max_ticket_id = {}, {}, 0
+            self.loaded_at = now
+        for row in rows:
+            self.add(row)
+        if rows or reload:
+            self.terms = sorted(self.postings)
+        self.refreshed_at = now
+
+_search_indexes = {}
+_search_indexes_lock = threading.Lock()
+
+def get_search_index(technician_id):
+    with _search_indexes_lock:
+        index = _search_indexes.pop(technician_id, None) or TechnicianSearchIndex()
+        # Re-inserting keeps the dict in least recently used order
+        _search_indexes[technician_id] = index
+        if len(_search_indexes) > SEARCH_MAX_TECHNICIANS:
+            _search_indexes.pop(next(iter(_search_indexes)))
+    return index
+
+@tickets_ns.route('/search')
+class TicketSearch(Resource):
+    @tickets_ns.doc('search_tickets', security='Bearer')
+    @tickets_ns.param('q', 'Words or word prefixes from ticket number, customer, phone, address, product or issue', required=True)
+    @tickets_ns.param('limit', 'Number of tickets to return', type=int, default=10)
+    @tickets_ns.param('offset', 'Number of tickets to skip', type=int, default=0)
+    @tickets_ns.response(400, 'Invalid query or paging')
+    @token_required
+    def get(self, current_user):
+        """Search the technician's tickets, best matches first"""
+        technician_id = int(current_user.get('sub', 1))
+        query = request.args.get('q', '')
+        try:
+            limit, offset = page_args(max_limit=SEARCH_MAX_LIMIT)
+        except ValueError as e:
+            return {"message": f"Invalid paging: {e}", "status": False, "data": None}, 400
+        if not search_tokens(query):
+            return {"message": "Query 'q' must contain letters or digits", "status": False, "data": None}, 400
+        
+        index = get_search_index(technician_id)
+        with index.lock:
+            index.refresh(technician_id)
+            matches = index.search(query)
+        
+        # Assignment and status change often, so both are read fresh for the matches only -
+        # tickets reassigned since the last reload leave the index, the page and the count
+        statuses = None
+        if matches:
+            with get_db_connection(read_only=True) as conn:
+                if conn:
+                    cursor = conn.cursor()
+                    statuses = {}
+                    for start in range(0, len(matches), SEARCH_STATUS_CHUNK):
+                        chunk = matches[start:start + SEARCH_STATUS_CHUNK]
+                        cursor.execute(f"""
+                            SELECT id, status FROM service_tickets
+                            WHERE id IN ({', '.join(['%s'] * len(chunk))}) AND assigned_staff_id = %s
+                        """, (*chunk, technician_id))
+                        statuses.update(cursor.fetchall())
+                    cursor.close()
+                    reassigned = [ticket_id for ticket_id in matches if ticket_id not in statuses]
+                    matches = [ticket_id for ticket_id in matches if ticket_id in statuses]
+                    if reassigned:
+                        with index.lock:
+                            index.remove(reassigned)
+        
+        with index.lock:
+            page = [dict(index.documents[ticket_id]) for ticket_id in matches[offset:offset + limit]
+                    if ticket_id in index.documents]
+        if statuses is not None:
+            page = [{**ticket, "status": statuses[ticket['id']]} for ticket in page]
+        
+        return {
+            "message": "Ticket search completed",
+            "status": True,
+            "data": {
+                "query": query,
+                "tickets": page,
+                "total_count": len(matches),
+                "limit": limit,
+                "offset": offset
+            }
+        }
+
 @tickets_ns.route('/assigned')
 class AssignedTickets(Resource):
     @tickets_ns.doc('get_assigned_tickets', security='Bearer')
@@ -556,8 +2580,10 @@ class AssignedTickets(Resource):
         technician_id = int(current_user.get('sub', 1))
         status = request.args.get('status')
         priority = request.args.get('priority')
-        limit = int(request.args.get('limit', 10))
-        offset = int(request.args.get('offset', 0))
+        try:
+            limit, offset = page_args()
+        except ValueError as e:
+            return {"message": f"Invalid paging: {e}", "status": False, "data": None}, 400
         
         tickets = get_technician_tickets(technician_id, status)
         
@@ -587,8 +2613,10 @@ class CompletedTickets(Resource):
     def get(self, current_user):
         """Get completed tickets"""
         technician_id = int(current_user.get('sub', 1))
-        limit = int(request.args.get('limit', 10))
-        offset = int(request.args.get('offset', 0))
+        try:
+            limit, offset = page_args()
+        except ValueError as e:
+            return {"message": f"Invalid paging: {e}", "status": False, "data": None}, 400
         
         tickets = get_technician_tickets(technician_id, 'COMPLETED')
         total_count = len(tickets)
@@ -603,6 +2631,39 @@ class CompletedTickets(Resource):
             }
         }
 
+@tickets_ns.route('/')
+class TicketDetails(Resource):
+    @tickets_ns.doc('get_ticket_details_batch', security='Bearer')
+    @tickets_ns.param('ids', 'Comma-separated ticket ids, e.g. 1,2,3', required=True)
+    @tickets_ns.response(200, 'Ticket details retrieved')
+    @tickets_ns.response(400, 'Invalid ticket ids')
+    @token_required
+    def get(self, current_user):
+        """Get detailed information for several assigned tickets at once"""
+        technician_id = int(current_user.get('sub', 1))
+        try:
+            ticket_ids = list(dict.fromkeys(int(i) for i in request.args.get('ids', '').split(',') if i.strip()))
+        except ValueError:
+            ticket_ids = []
+        if not ticket_ids or len(ticket_ids) > TICKET_DETAIL_BATCH_LIMIT:
+            return {"message": f"Provide between 1 and {TICKET_DETAIL_BATCH_LIMIT} numeric ticket ids", "status": False, "data": None}, 400
+        
+        with get_db_connection() as conn:
+            if not conn:
+                return {"message": "Database connection failed", "status": False, "data": None}, 500
+            cursor = conn.cursor(pymysql.cursors.DictCursor)
+            tickets = fetch_ticket_details(cursor, ticket_ids, technician_id)
+            cursor.close()
+        
+        return {
+            "message": "Ticket details retrieved successfully",
+            "status": True,
+            "data": {
+                "tickets": [tickets[ticket_id] for ticket_id in ticket_ids if ticket_id in tickets],
+                "not_found": [ticket_id for ticket_id in ticket_ids if ticket_id not in tickets]
+            }
+        }
+
 @tickets_ns.route('/<int:ticket_id>')
 class TicketDetail(Resource):
     @tickets_ns.doc('get_ticket_details', security='Bearer')
@@ -614,35 +2675,15 @@ class TicketDetail(Resource):
         with get_db_connection() as conn:
             if conn:
                 cursor = conn.cursor(pymysql.cursors.DictCursor)
-                cursor.execute("""
-                    SELECT st.*, c.contact_person as customer_name, c.phone as customer_phone, c.address as customer_address,
-                           c.email as customer_email
-                    FROM service_tickets st 
-                    LEFT JOIN customers c ON st.customer_id = c.id 
-                    WHERE st.id = %s
-                """, (ticket_id,))
-                ticket = cursor.fetchone()
+                ticket = fetch_ticket_details(cursor, [ticket_id]).get(ticket_id)
+                cursor.close()
                 
                 if ticket:
-                    # Get parts used
-                    cursor.execute("SELECT * FROM service_ticket_parts WHERE ticket_id = %s", (ticket_id,))
-                    parts_used = cursor.fetchall()
-                    
-                    # Convert datetime objects
-                    for key, value in ticket.items():
-                        if hasattr(value, 'isoformat'):
-                            ticket[key] = value.isoformat()
-                    
-                    ticket['parts_used'] = parts_used or []
-                    ticket['photos'] = ticket.get('photos', []) or []
-                    cursor.close()
-                    
                     return {
                         "message": "Ticket details retrieved successfully",
                         "status": True,
                         "data": {"ticket": ticket}
                     }
-                cursor.close()
         
         return {"message": "Ticket not found", "status": False, "data": None}, 404
 
@@ -656,46 +2697,35 @@ class UpdateTicketStatus(Resource):
     def put(self, ticket_id, current_user):
         """Update ticket status and add notes"""
         data = request.get_json()
-        status = data.get('status', '').upper()
-        notes = data.get('notes', '')
-        work_performed = data.get('work_performed', '')
-        parts_used = data.get('parts_used', [])
         
         with get_db_connection() as conn:
-            if conn:
-                cursor = conn.cursor()
-                update_fields = ["status = %s", "technician_notes = %s", "work_performed = %s"]
-                params = [status, notes, work_performed]
-                
-                if status == 'COMPLETED':
-                    update_fields.append("completed_date = %s")
-                    params.append(datetime.now())
-                
-                cursor.execute(f"UPDATE service_tickets SET {', '.join(update_fields)} WHERE id = %s", 
-                             params + [ticket_id])
-                
-                # Add parts used
-                if parts_used:
-                    for part in parts_used:
-                        cursor.execute("""
-                            INSERT INTO service_ticket_parts (ticket_id, part_name, quantity, unit_cost)
-                            VALUES (%s, %s, %s, %s)
-                        """, (ticket_id, part.get('name', ''), part.get('quantity', 1), part.get('cost', 0)))
-                
-                conn.commit()
-                cursor.close()
+            if not conn:
+                return {"message": "Database connection failed", "status": False, "data": None}, 500
+            cursor = conn.cursor()
+            try:
+                result = update_ticket_status(cursor, ticket_id, data, int(current_user.get('sub', 1)))
+            except TicketNotFound as e:
+                conn.rollback()
+                return {"message": str(e), "status": False, "data": None}, 404
+            except (TypeError, ValueError) as e:
+                conn.rollback()
+                return {"message": f"Invalid status update: {e}", "status": False, "data": None}, 400
+            except InsufficientStock as e:
+                conn.rollback()
+                return {"message": str(e), "status": False, "data": {"shortages": e.shortages}}, 409
+            conn.commit()
+            cursor.close()
         
+        ticket_cache.invalidate(int(current_user.get('sub', 1)))
+        if result['parts_used']:
+            inventory_cache.invalidate('all')
+        notification_broker.publish(int(current_user.get('sub', 1)), 'ticket_updated',
+                                    {"ticket_id": ticket_id, "status": result['new_status']})
+        spatial_index.publish('ticket', ticket_id, status=result['new_status'])
         return {
             "message": "Ticket status updated successfully",
             "status": True,
-            "data": {
-                "ticket_id": ticket_id,
-                "new_status": status,
-                "updated_at": datetime.now().isoformat(),
-                "notes": notes,
-                "work_performed": work_performed,
-                "parts_used": parts_used
-            }
+            "data": result
         }
 
 @tickets_ns.route('/<int:ticket_id>/location')
@@ -703,39 +2733,41 @@ class CaptureLocation(Resource):
     @tickets_ns.expect(location_model)
     @tickets_ns.doc('capture_location', security='Bearer')
     @tickets_ns.response(200, 'Location captured successfully')
+    @tickets_ns.response(404, 'Ticket not found')
     @token_required
     def post(self, ticket_id, current_user):
         """Capture technician location for ticket"""
-        data = request.get_json()
-        latitude = data.get('latitude')
-        longitude = data.get('longitude')
+        data = request.get_json() or {}
+        try:
+            parse_coordinates(data.get('latitude'), data.get('longitude'))
+        except ValueError as e:
+            return {"message": f"Invalid location: {e}", "status": False, "data": None}, 400
         
         with get_db_connection() as conn:
-            if conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    UPDATE service_tickets 
-                    SET technician_latitude = %s, technician_longitude = %s, location_captured_at = %s
-                    WHERE id = %s
-                """, (latitude, longitude, datetime.now(), ticket_id))
-                conn.commit()
-                cursor.close()
+            if not conn:
+                return {"message": "Database connection failed", "status": False, "data": None}, 500
+            cursor = conn.cursor()
+            try:
+                result = capture_ticket_location(cursor, ticket_id, data, int(current_user.get('sub', 1)))
+            except TicketNotFound as e:
+                conn.rollback()
+                return {"message": str(e), "status": False, "data": None}, 404
+            conn.commit()
+            cursor.close()
         
+        ticket_cache.invalidate(int(current_user.get('sub', 1)))
+        spatial_index.publish('technician', int(current_user.get('sub', 1)), result['latitude'], result['longitude'])
         return {
             "message": "Location captured successfully",
             "status": True,
-            "data": {
-                "ticket_id": ticket_id,
-                "latitude": latitude,
-                "longitude": longitude,
-                "captured_at": datetime.now().isoformat()
-            }
+            "data": result
         }
 
 @tickets_ns.route('/<int:ticket_id>/photos')
 class UploadPhotos(Resource):
     @tickets_ns.doc('upload_photos', security='Bearer')
     @tickets_ns.response(200, 'Photos uploaded successfully')
+    @tickets_ns.response(404, 'Ticket not found')
     @token_required
     def post(self, ticket_id, current_user):
         """Upload photos for ticket"""
@@ -751,13 +2783,19 @@ class UploadPhotos(Resource):
         with get_db_connection() as conn:
             if conn:
                 cursor = conn.cursor()
+                try:
+                    lock_assigned_ticket(cursor, ticket_id, int(current_user.get('sub', 1)))
+                except TicketNotFound as e:
+                    conn.rollback()
+                    return {"message": str(e), "status": False, "data": None}, 404
                 cursor.execute("""
                     UPDATE service_tickets 
                     SET photos = %s, photo_count = %s
-                    WHERE id = %s
-                """, (json.dumps(photo_urls), len(photo_urls), ticket_id))
+                    WHERE id = %s AND assigned_staff_id = %s
+                """, (json.dumps(photo_urls), len(photo_urls), ticket_id, int(current_user.get('sub', 1))))
                 conn.commit()
                 cursor.close()
+                ticket_cache.invalidate(int(current_user.get('sub', 1)))
         
         return {
             "message": "Photos uploaded successfully",
@@ -774,6 +2812,7 @@ class UploadPhotos(Resource):
 class CaptureSignature(Resource):
     @tickets_ns.doc('capture_signature', security='Bearer')
     @tickets_ns.response(200, 'Signature captured successfully')
+    @tickets_ns.response(404, 'Ticket not found')
     @token_required
     def post(self, ticket_id, current_user):
         """Capture customer signature"""
@@ -782,29 +2821,23 @@ class CaptureSignature(Resource):
         except:
             data = {}
         
-        customer_name = data.get('customer_name', 'Customer')
-        signature_url = f"https://example.com/signatures/{ticket_id}_signature.png"
-        
         with get_db_connection() as conn:
-            if conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    UPDATE service_tickets 
-                    SET customer_signature_url = %s, signature_captured_at = %s, customer_signature_name = %s
-                    WHERE id = %s
-                """, (signature_url, datetime.now(), customer_name, ticket_id))
-                conn.commit()
-                cursor.close()
+            if not conn:
+                return {"message": "Database connection failed", "status": False, "data": None}, 500
+            cursor = conn.cursor()
+            try:
+                result = capture_ticket_signature(cursor, ticket_id, data, int(current_user.get('sub', 1)))
+            except TicketNotFound as e:
+                conn.rollback()
+                return {"message": str(e), "status": False, "data": None}, 404
+            conn.commit()
+            cursor.close()
         
+        ticket_cache.invalidate(int(current_user.get('sub', 1)))
         return {
             "message": "Customer signature captured successfully",
             "status": True,
-            "data": {
-                "ticket_id": ticket_id,
-                "signature_url": signature_url,
-                "captured_at": datetime.now().isoformat(),
-                "customer_name": customer_name
-            }
+            "data": result
         }
 
 @tickets_ns.route('/<int:ticket_id>/parts')
@@ -812,23 +2845,121 @@ class AddPartsUsed(Resource):
     @tickets_ns.expect(parts_model)
     @tickets_ns.doc('add_parts_used', security='Bearer')
     @tickets_ns.response(200, 'Parts information updated')
+    @tickets_ns.response(400, 'Invalid parts')
+    @tickets_ns.response(404, 'Ticket not found')
     @token_required
     def post(self, ticket_id, current_user):
         """Add parts used in service"""
-        data = request.get_json()
-        parts = data.get('parts', [])
+        data = request.get_json() or {}
+        if not isinstance(data, dict):
+            return {"message": "Request body must be a JSON object", "status": False, "data": None}, 400
         
-        total_cost = sum(part.get('cost', 0) * part.get('quantity', 1) for part in parts)
+        with get_db_connection() as conn:
+            if not conn:
+                return {"message": "Database connection failed", "status": False, "data": None}, 500
+            cursor = conn.cursor()
+            try:
+                result = summarize_parts_used(cursor, ticket_id, data, int(current_user.get('sub', 1)))
+            except TicketNotFound as e:
+                conn.rollback()
+                return {"message": str(e), "status": False, "data": None}, 404
+            except (TypeError, ValueError) as e:
+                conn.rollback()
+                return {"message": str(e), "status": False, "data": None}, 400
+            conn.commit()
+            cursor.close()
         
         return {
             "message": "Parts information updated successfully",
             "status": True,
+            "data": result
+        }
+
+@tickets_ns.route('/batch')
+class TicketBatch(Resource):
+    @tickets_ns.expect(ticket_batch_model)
+    @tickets_ns.doc('submit_ticket_batch', security='Bearer')
+    @tickets_ns.response(200, 'Batch applied')
+    @tickets_ns.response(400, 'Invalid batch')
+    @token_required
+    def post(self, current_user):
+        """Apply queued offline operations in order, in one transaction"""
+        data = request.get_json() or {}
+        operations = data.get('operations') or []
+        atomic = bool(data.get('atomic', False))
+        technician_id = int(current_user.get('sub', 1))
+        
+        if not isinstance(operations, list) or len(operations) > TICKET_BATCH_LIMIT:
+            return {"message": f"'operations' must be a list of at most {TICKET_BATCH_LIMIT} items", "status": False, "data": None}, 400
+        
+        results = []
+        updated_tickets = {}
+        captured_location = None
+        with get_db_connection() as conn:
+            if not conn:
+                return {"message": "Database connection failed", "status": False, "data": None}, 500
+            cursor = conn.cursor()
+            for index, operation in enumerate(operations):
+                op = operation.get('op') if isinstance(operation, dict) else None
+                ticket_id = operation.get('ticket_id') if isinstance(operation, dict) else None
+                result = {"index": index, "op": op, "ticket_id": ticket_id, "status": False, "message": None, "data": None}
+                results.append(result)
+                
+                if op not in TICKET_BATCH_OPERATIONS or not isinstance(ticket_id, int):
+                    result["message"] = f"Unknown operation or missing ticket_id; expected one of {sorted(TICKET_BATCH_OPERATIONS)}"
+                    continue
+                
+                # Each operation gets a savepoint so one bad entry doesn't undo the rest
+                cursor.execute("SAVEPOINT batch_operation")
+                try:
+                    result["data"] = TICKET_BATCH_OPERATIONS[op](cursor, ticket_id, operation, technician_id)
+                    cursor.execute("RELEASE SAVEPOINT batch_operation")
+                    result["status"] = True
+                    result["message"] = "Applied"
+                    if op == 'status':
+                        updated_tickets[ticket_id] = result["data"]["new_status"]
+                    elif op == 'location':
+                        captured_location = (result["data"]["latitude"], result["data"]["longitude"])
+                except (InsufficientStock, TicketNotFound, TypeError, ValueError) as e:
+                    cursor.execute("ROLLBACK TO SAVEPOINT batch_operation")
+                    result["message"] = str(e)
+                    if isinstance(e, InsufficientStock):
+                        result["data"] = {"shortages": e.shortages}
+                except Exception:
+                    log.exception("Batch operation failed", index=index, op=op, ticket_id=ticket_id)
+                    cursor.execute("ROLLBACK TO SAVEPOINT batch_operation")
+                    result["message"] = "Operation failed"
+            
+            failed_count = len([r for r in results if not r["status"]])
+            if atomic and failed_count:
+                conn.rollback()
+                updated_tickets = {}
+                captured_location = None
+                for result in results:
+                    if result["status"]:
+                        result.update({"status": False, "message": "Rolled back"})
+            else:
+                conn.commit()
+            cursor.close()
+        
+        if any(result["status"] for result in results):
+            ticket_cache.invalidate(technician_id)
+        if any(result["status"] and result["op"] == 'status' and result["data"]["parts_used"] for result in results):
+            inventory_cache.invalidate('all')
+        for ticket_id, status in updated_tickets.items():
+            notification_broker.publish(technician_id, 'ticket_updated', {"ticket_id": ticket_id, "status": status})
+            spatial_index.publish('ticket', ticket_id, status=status)
+        if captured_location:
+            spatial_index.publish('technician', technician_id, *captured_location)
+        
+        return {
+            "message": "Batch applied" if not failed_count else f"Batch applied with {failed_count} failed operations",
+            "status": failed_count == 0,
             "data": {
-                "ticket_id": ticket_id,
-                "parts_added": len(parts),
-                "total_cost": total_cost,
-                "parts": parts,
-                "updated_at": datetime.now().isoformat()
+                "results": results,
+                "applied_count": len([r for r in results if r["status"]]),
+                "failed_count": failed_count,
+                "atomic": atomic
             }
         }
 
@@ -838,12 +2969,14 @@ class Notifications(Resource):
     @notifications_ns.doc('get_notifications', security='Bearer')
     @notifications_ns.param('limit', 'Number of notifications to return', type=int, default=20)
     @notifications_ns.param('unread_only', 'Show only unread notifications', type=bool, default=False)
-    @api.doc(security='Bearer')
     @token_required
     def get(self, current_user):
         """Get technician notifications"""
         technician_id = int(current_user.get('sub', 1))
-        limit = int(request.args.get('limit', 20))
+        try:
+            limit, _ = page_args(default_limit=20)
+        except ValueError as e:
+            return {"message": f"Invalid paging: {e}", "status": False, "data": None}, 400
         unread_only = request.args.get('unread_only', 'false').lower() == 'true'
         
         notifications = get_technician_notifications(technician_id)
@@ -865,14 +2998,14 @@ class Notifications(Resource):
 class MarkNotificationRead(Resource):
     @notifications_ns.doc('mark_notification_read', security='Bearer')
     @notifications_ns.response(200, 'Notification marked as read')
-    @api.doc(security='Bearer')
     @token_required
     def put(self, notification_id, current_user):
         """Mark notification as read"""
         with get_db_connection() as conn:
             if conn:
                 cursor = conn.cursor()
-                cursor.execute("UPDATE notifications SET is_read = 1 WHERE id = %s", (notification_id,))
+                cursor.execute("UPDATE notifications SET is_read = 1 WHERE id = %s AND user_id = %s",
+                             (notification_id, int(current_user.get('sub', 1))))
                 conn.commit()
                 cursor.close()
         
@@ -888,13 +3021,16 @@ class MarkNotificationRead(Resource):
 @notifications_ns.route('/unread-count')
 class UnreadCount(Resource):
     @notifications_ns.doc('get_unread_count', security='Bearer')
-    @api.doc(security='Bearer')
     @token_required
     def get(self, current_user):
         """Get unread notifications count"""
         technician_id = int(current_user.get('sub', 1))
-        notifications = get_technician_notifications(technician_id)
-        unread_count = len([n for n in notifications if not n["is_read"]])
+        with get_db_connection() as conn:
+            if not conn:
+                return {"message": "Database connection failed", "status": False, "data": None}, 500
+            cursor = conn.cursor()
+            unread_count = get_unread_count(cursor, technician_id)
+            cursor.close()
         
         return {
             "message": "Unread count retrieved successfully",
@@ -905,7 +3041,6 @@ class UnreadCount(Resource):
 @notifications_ns.route('/mark-all-read')
 class MarkAllRead(Resource):
     @notifications_ns.doc('mark_all_read', security='Bearer')
-    @api.doc(security='Bearer')
     @token_required
     def put(self, current_user):
         """Mark all notifications as read"""
@@ -914,35 +3049,353 @@ class MarkAllRead(Resource):
         with get_db_connection() as conn:
             if conn:
                 cursor = conn.cursor()
-                cursor.execute("UPDATE notifications SET is_read = 1 WHERE user_id = %s", (technician_id,))
-                updated_count = cursor.rowcount
-                conn.commit()
+                cursor.execute("UPDATE notifications SET is_read = 1 WHERE user_id = %s", (technician_id,))
+                updated_count = cursor.rowcount
+                conn.commit()
+                cursor.close()
+                notification_broker.publish(technician_id, 'unread_count', {"unread_count": 0})
+            else:
+                updated_count = 0
+        
+        return {
+            "message": "All notifications marked as read",
+            "status": True,
+            "data": {
+                "technician_id": technician_id,
+                "updated_count": updated_count,
+                "marked_at": datetime.now().isoformat()
+            }
+        }
+
+@notifications_ns.route('/stream')
+class NotificationStream(Resource):
+    @notifications_ns.doc('stream_notifications', security='Bearer')
+    @notifications_ns.response(200, 'Server-Sent Events stream')
+    @notifications_ns.response(503, 'Too many open streams - use /notifications/poll instead')
+    @token_required
+    def get(self, current_user):
+        """Stream new notifications and ticket updates as Server-Sent Events.
+
+        When this worker's streams are all taken the response is 503 with a Retry-After
+        header; the client should long-poll /notifications/poll until then.
+        """
+        technician_id = int(current_user.get('sub', 1))
+        
+        unread_count = None
+        with get_db_connection() as conn:
+            if conn:
+                cursor = conn.cursor()
+                unread_count = get_unread_count(cursor, technician_id)
                 cursor.close()
-            else:
-                updated_count = 0
+        
+        subscription = notification_broker.subscribe(technician_id)
+        if subscription is None:
+            return {
+                "message": "Too many open notification streams",
+                "status": False,
+                "data": {"fallback": f"{API_PREFIX}/notifications/poll", "retry_after": SSE_RETRY_AFTER_SECONDS}
+            }, 503, {'Retry-After': str(SSE_RETRY_AFTER_SECONDS)}
+        
+        def events():
+            # Streams are closed periodically so a worker thread is never held forever;
+            # clients reconnect after the retry delay
+            deadline = time.time() + SSE_STREAM_SECONDS
+            try:
+                yield "retry: 3000\n" + format_sse('ready', {"technician_id": technician_id, "unread_count": unread_count})
+                while time.time() < deadline:
+                    try:
+                        event, data = subscription.get(timeout=SSE_HEARTBEAT_SECONDS)
+                    except queue.Empty:
+                        yield ": heartbeat\n\n"
+                        continue
+                    yield format_sse(event, data)
+            finally:
+                notification_broker.unsubscribe(technician_id, subscription)
+        
+        return Response(events(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@notifications_ns.route('/poll')
+class NotificationPoll(Resource):
+    @notifications_ns.doc('poll_notifications', security='Bearer')
+    @notifications_ns.param('since', 'Cursor from the previous response; omit on the first call', type=int)
+    @notifications_ns.param('wait', f'Seconds to wait for an event, at most {LONG_POLL_SECONDS}', type=int, default=LONG_POLL_SECONDS)
+    @notifications_ns.response(200, 'Events after the cursor, possibly none')
+    @notifications_ns.response(400, 'Invalid since or wait')
+    @token_required
+    def get(self, current_user):
+        """Long-poll for the events /stream would send - returns on the first event or after `wait` seconds.
+
+        The first call returns a cursor and the unread count at once. Pass the cursor as
+        `since` on the next call; a resync event means events were missed and the client
+        should refetch its notifications and tickets.
+        """
+        technician_id = int(current_user.get('sub', 1))
+        try:
+            since = int(request.args['since']) if request.args.get('since') else None
+            wait = min(int(request.args.get('wait', LONG_POLL_SECONDS)), LONG_POLL_SECONDS)
+        except ValueError:
+            return {"message": "'since' and 'wait' must be whole numbers", "status": False, "data": None}, 400
+        if wait < 0 or (since is not None and since < 0):
+            return {"message": "'since' and 'wait' must not be negative", "status": False, "data": None}, 400
+        
+        unread_count = None
+        if since is None:
+            with get_db_connection() as conn:
+                if conn:
+                    cursor = conn.cursor()
+                    unread_count = get_unread_count(cursor, technician_id)
+                    cursor.close()
+        
+        # Subscribe before reading the store, so an event published in between still wakes us
+        subscription = notification_broker.subscribe(technician_id, 'poll') if since is not None and wait else None
+        try:
+            events, cursor = notification_broker.events_since(technician_id, since)
+            if subscription is not None and not events:
+                try:
+                    pushed = [subscription.get(timeout=wait)]
+                except queue.Empty:
+                    pushed = []
+                while not subscription.empty():
+                    pushed.append(subscription.get_nowait())
+                events, cursor = notification_broker.events_since(technician_id, since)
+                # Rows other services insert into notifications are only pushed, never stored
+                events += [{"event": event, "data": data} for event, data in pushed if event in ('notification', 'resync')]
+        finally:
+            if subscription is not None:
+                notification_broker.unsubscribe(technician_id, subscription)
         
         return {
-            "message": "All notifications marked as read",
+            "message": "Notification events retrieved",
             "status": True,
-            "data": {
-                "technician_id": technician_id,
-                "updated_count": updated_count,
-                "marked_at": datetime.now().isoformat()
-            }
+            "data": {"events": events, "cursor": cursor, "unread_count": unread_count}
         }
 
+@notifications_ns.route('/bulk-read')
+class BulkMarkRead(Resource):
+    @notifications_ns.expect(notification_bulk_model)
+    @notifications_ns.doc('bulk_mark_read', security='Bearer')
+    @notifications_ns.response(200, 'Notifications marked as read')
+    @notifications_ns.response(400, 'Invalid ids or before timestamp')
+    @token_required
+    def put(self, current_user):
+        """Mark a list of notifications, or all before a timestamp, as read"""
+        return bulk_notification_response(current_user, 'read', 'marked as read')
+
+@notifications_ns.route('/bulk-archive')
+class BulkArchive(Resource):
+    @notifications_ns.expect(notification_bulk_model)
+    @notifications_ns.doc('bulk_archive', security='Bearer')
+    @notifications_ns.response(200, 'Notifications archived')
+    @notifications_ns.response(400, 'Invalid ids or before timestamp')
+    @token_required
+    def put(self, current_user):
+        """Move a list of notifications, or all before a timestamp, to the archive"""
+        return bulk_notification_response(current_user, 'archive', 'archived')
+
+@notifications_ns.route('/bulk-delete')
+class BulkDelete(Resource):
+    @notifications_ns.expect(notification_bulk_model)
+    @notifications_ns.doc('bulk_delete', security='Bearer')
+    @notifications_ns.response(200, 'Notifications deleted')
+    @notifications_ns.response(400, 'Invalid ids or before timestamp')
+    @token_required
+    def put(self, current_user):
+        """Delete a list of notifications, or all before a timestamp"""
+        return bulk_notification_response(current_user, 'delete', 'deleted')
+
 # ==================== SCHEDULE ENDPOINTS ====================
+# Route ordering - nearest neighbour from the technician's last position, then 2-opt
+# until no swap shortens the route. Solved orders are memoized per technician and day,
+# keyed on the stops and start point, so any schedule change misses the cache.
+ROUTE_SPEED_KMH = float(os.getenv('ROUTE_SPEED_KMH', 30))
+ROUTE_SERVICE_MINUTES = int(os.getenv('ROUTE_SERVICE_MINUTES', 60))
+ROUTE_ETA_WINDOW_MINUTES = int(os.getenv('ROUTE_ETA_WINDOW_MINUTES', 30))
+ROUTE_MAX_2OPT_PASSES = 20
+ROUTE_CACHE_SIZE = 512
+WORKING_HOURS = {"start": "08:00", "end": "18:00"}
+
+_route_cache = {}
+_route_cache_lock = threading.Lock()
+
+def haversine_km(a, b):
+    lat1, lng1, lat2, lng2 = map(math.radians, (a[0], a[1], b[0], b[1]))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 12742 * math.asin(math.sqrt(h))
+
+def solve_route(start, points):
+    """Order `points` (lat, lng) for an open path from `start`; returns indexes into `points`"""
+    nodes = [start] + list(points)
+    n = len(nodes)
+    dist = [[haversine_km(a, b) for b in nodes] for a in nodes]
+    
+    # Nearest neighbour from the start node (0)
+    order = [0]
+    unvisited = set(range(1, n))
+    while unvisited:
+        last = dist[order[-1]]
+        nearest = min(unvisited, key=last.__getitem__)
+        order.append(nearest)
+        unvisited.remove(nearest)
+    
+    # 2-opt: reverse order[i..j] when it shortens the path; the start stays fixed and the end is open
+    for _ in range(ROUTE_MAX_2OPT_PASSES):
+        improved = False
+        for i in range(1, n - 1):
+            a, b = order[i - 1], order[i]
+            for j in range(i + 1, n):
+                c = order[j]
+                d = order[j + 1] if j + 1 < n else None
+                before = dist[a][b] + (dist[c][d] if d is not None else 0)
+                after = dist[a][c] + (dist[b][d] if d is not None else 0)
+                if after < before - 1e-9:
+                    order[i:j + 1] = reversed(order[i:j + 1])
+                    a, b = order[i - 1], order[i]
+                    improved = True
+        if not improved:
+            break
+    return [node - 1 for node in order[1:]]
+
+def get_route_stops(cursor, technician_id, date):
+    """Scheduled tickets for the day with the best known coordinates - the customer's, else the
+    position captured on that ticket - plus the technician's most recent captured position"""
+    cursor.execute("""
+        SELECT st.id, st.ticket_number, st.status, st.priority, st.product_name, st.scheduled_date,
+               c.contact_person AS customer_name, c.address AS customer_address,
+               COALESCE(c.latitude, st.technician_latitude) AS latitude,
+               COALESCE(c.longitude, st.technician_longitude) AS longitude
+        FROM service_tickets st
+        LEFT JOIN customers c ON st.customer_id = c.id
+        WHERE st.assigned_staff_id = %s AND st.status = 'SCHEDULED'
+          AND st.scheduled_date >= %s AND st.scheduled_date < %s
+        ORDER BY st.scheduled_date, st.id
+    """, (technician_id, date, date + timedelta(days=1)))
+    stops = cursor.fetchall()
+    
+    cursor.execute("""
+        SELECT technician_latitude, technician_longitude FROM service_tickets
+        WHERE assigned_staff_id = %s AND location_captured_at IS NOT NULL
+        ORDER BY location_captured_at DESC LIMIT 1
+    """, (technician_id,))
+    row = cursor.fetchone()
+    # A capture can store a timestamp without coordinates; only a full position is a start
+    start = None
+    if row and row['technician_latitude'] is not None and row['technician_longitude'] is not None:
+        start = (float(row['technician_latitude']), float(row['technician_longitude']))
+    return stops, start
+
+def optimize_route(technician_id, date, stops, start):
+    """Return (ordered stops, leg distances in km); stops without coordinates keep their order at the end"""
+    located = [stop for stop in stops if stop['latitude'] is not None and stop['longitude'] is not None]
+    unlocated = [stop for stop in stops if stop['latitude'] is None or stop['longitude'] is None]
+    points = [(float(stop['latitude']), float(stop['longitude'])) for stop in located]
+    if start is None and points:
+        start = points[0]
+    
+    key = (technician_id, date)
+    fingerprint = (start, tuple((stop['id'], point) for stop, point in zip(located, points)))
+    with _route_cache_lock:
+        cached = _route_cache.get(key)
+    if cached and cached[0] == fingerprint:
+        order = cached[1]
+    else:
+        order = solve_route(start, points) if points else []
+        with _route_cache_lock:
+            _route_cache.pop(key, None)
+            if len(_route_cache) >= ROUTE_CACHE_SIZE:
+                _route_cache.pop(next(iter(_route_cache)))
+            _route_cache[key] = (fingerprint, order)
+    
+    legs = []
+    previous = start
+    for index in order:
+        legs.append(haversine_km(previous, points[index]))
+        previous = points[index]
+    return [located[index] for index in order] + unlocated, legs + [None] * len(unlocated)
+
+def route_appointments(stops, legs, date):
+    """Arrival windows from driving time at ROUTE_SPEED_KMH plus ROUTE_SERVICE_MINUTES per stop"""
+    clock = datetime.combine(date, datetime.strptime(WORKING_HOURS["start"], '%H:%M').time())
+    if date == datetime.now().date():
+        clock = max(clock, datetime.now().replace(second=0, microsecond=0))
+    
+    appointments = []
+    for sequence, (stop, leg) in enumerate(zip(stops, legs), 1):
+        if leg is not None:
+            clock += timedelta(minutes=leg / ROUTE_SPEED_KMH * 60)
+        finish = clock + timedelta(minutes=ROUTE_SERVICE_MINUTES)
+        appointments.append({
+            "id": stop["id"],
+            "ticket_number": stop["ticket_number"],
+            "customer_name": stop["customer_name"],
+            "sequence": sequence,
+            "start_time": clock.strftime('%H:%M'),
+            "end_time": finish.strftime('%H:%M'),
+            "arrival_window": {
+                "start": clock.strftime('%H:%M'),
+                "end": (clock + timedelta(minutes=ROUTE_ETA_WINDOW_MINUTES)).strftime('%H:%M')
+            },
+            "travel_km": round(leg, 2) if leg is not None else None,
+            "status": stop["status"],
+            "address": stop["customer_address"],
+            "priority": stop["priority"],
+            "product_name": stop["product_name"]
+        })
+        clock = finish
+    return appointments
+
+def schedule_appointment(ticket):
+    return {
+        "id": ticket["id"],
+        "ticket_number": ticket["ticket_number"],
+        "customer_name": ticket["customer_name"],
+        "start_time": ticket["scheduled_date"].split('T')[1][:5] if 'T' in ticket["scheduled_date"] else "09:00",
+        "end_time": "11:00",  # Estimated
+        "status": ticket["status"],
+        "address": ticket["customer_address"],
+        "priority": ticket["priority"],
+        "product_name": ticket["product_name"]
+    }
+
 @schedule_ns.route('/')
 class Schedule(Resource):
     @schedule_ns.doc('get_schedule', security='Bearer')
     @schedule_ns.param('date', 'Date in YYYY-MM-DD format', default=datetime.now().strftime('%Y-%m-%d'))
-    @api.doc(security='Bearer')
+    @schedule_ns.param('optimize', 'Order stops to minimise travel and estimate arrival windows', type='boolean', default=False)
     @token_required
     def get(self, current_user):
         """Get technician schedule for specific date"""
         technician_id = int(current_user.get('sub', 1))
         date = request.args.get('date', datetime.now().strftime('%Y-%m-%d'))
         
+        if request.args.get('optimize', 'false').lower() == 'true':
+            try:
+                day = datetime.strptime(date, '%Y-%m-%d').date()
+            except ValueError:
+                return {"message": "Invalid date, expected YYYY-MM-DD", "status": False, "data": None}, 400
+            with get_db_connection(read_only=True) as conn:
+                if not conn:
+                    return {"message": "Database connection failed", "status": False, "data": None}, 500
+                cursor = conn.cursor(pymysql.cursors.DictCursor)
+                stops, start = get_route_stops(cursor, technician_id, day)
+                cursor.close()
+            ordered, legs = optimize_route(technician_id, day, stops, start)
+            travel = [leg for leg in legs if leg is not None]
+            
+            return {
+                "message": "Optimized schedule retrieved successfully",
+                "status": True,
+                "data": {
+                    "date": date,
+                    "optimized": True,
+                    "appointments": route_appointments(ordered, legs, day),
+                    "total_appointments": len(ordered),
+                    "total_travel_km": round(sum(travel), 2),
+                    "unlocated_appointments": len(legs) - len(travel),
+                    "working_hours": WORKING_HOURS
+                }
+            }
+        
         tickets = get_technician_tickets(technician_id, 'SCHEDULED')
         scheduled_tickets = [t for t in tickets if t["scheduled_date"].startswith(date)]
         
@@ -951,21 +3404,9 @@ class Schedule(Resource):
             "status": True,
             "data": {
                 "date": date,
-                "appointments": [
-                    {
-                        "id": ticket["id"],
-                        "ticket_number": ticket["ticket_number"],
-                        "customer_name": ticket["customer_name"],
-                        "start_time": ticket["scheduled_date"].split('T')[1][:5] if 'T' in ticket["scheduled_date"] else "09:00",
-                        "end_time": "11:00",  # Estimated
-                        "status": ticket["status"],
-                        "address": ticket["customer_address"],
-                        "priority": ticket["priority"],
-                        "product_name": ticket["product_name"]
-                    } for ticket in scheduled_tickets
-                ],
+                "appointments": [schedule_appointment(ticket) for ticket in scheduled_tickets],
                 "total_appointments": len(scheduled_tickets),
-                "working_hours": {"start": "08:00", "end": "18:00"}
+                "working_hours": WORKING_HOURS
             }
         }
 
@@ -973,7 +3414,6 @@ class Schedule(Resource):
 class WeeklySchedule(Resource):
     @schedule_ns.doc('get_weekly_schedule', security='Bearer')
     @schedule_ns.param('week_start', 'Week start date in YYYY-MM-DD format')
-    @api.doc(security='Bearer')
     @token_required
     def get(self, current_user):
         """Get technician weekly schedule"""
@@ -1002,20 +3442,28 @@ class WeeklySchedule(Resource):
 @profile_ns.route('/')
 class Profile(Resource):
     @profile_ns.doc('get_profile', security='Bearer')
-    @api.doc(security='Bearer')
     @token_required
     def get(self, current_user):
         """Get technician profile"""
         technician_id = int(current_user.get('sub', 1))
         technician = get_technician_data(technician_id)
-        tickets = get_technician_tickets(technician_id)
+        if not technician:
+            return {'message': 'Technician not found', 'status': False, 'data': None}, 404
+        
+        completed_total = 0
+        with get_db_connection(read_only=True) as conn:
+            if conn:
+                cursor = conn.cursor()
+                completed_total = get_ticket_counts(cursor, technician_id)["COMPLETED"]
+                cursor.close()
         
         profile_data = technician.copy()
         profile_data.update({
             "department": "Field Service",
             "join_date": "2020-01-15",
-            "performance_rating": 4.8,
-            "completed_tickets_total": len([t for t in tickets if t["status"] == "COMPLETED"]),
+            # No customer feedback is captured yet
+            "performance_rating": None,
+            "completed_tickets_total": completed_total,
             "certification_level": "Senior Technician",
             "last_login": datetime.now().isoformat()
         })
@@ -1028,7 +3476,6 @@ class Profile(Resource):
     
     @profile_ns.expect(profile_update_model)
     @profile_ns.doc('update_profile', security='Bearer')
-    @api.doc(security='Bearer')
     @token_required
     def put(self, current_user):
         """Update technician profile"""
@@ -1058,6 +3505,7 @@ class Profile(Resource):
                     cursor.execute(f"UPDATE users SET {', '.join(update_fields)} WHERE id = %s", 
                                  params + [technician_id])
                     conn.commit()
+                    technician_cache.invalidate(technician_id)
                 
                 cursor.close()
         
@@ -1071,57 +3519,464 @@ class Profile(Resource):
         }
 
 # ==================== REPORTS ENDPOINTS ====================
-# Reports endpoints removed - not needed for core service functionality
+# Each status change is logged in ticket_status_events and added to the per-day rollup
+# in the same transaction, so reports read a few pre-aggregated rows instead of
+# scanning service_tickets:
+#   technician_daily_stats - per technician and day: transitions into each status,
+#                            resolution minutes, on-time completions, parts cost
+# Current per-status counts are read live - tickets created or reassigned by the admin
+# app never pass through this API, and the (assigned_staff_id, status) index keeps the
+# count cheap.
+REPORT_STATUSES = ('SCHEDULED', 'IN_PROGRESS', 'COMPLETED', 'CANCELLED')
+REPORT_MAX_DAYS = 366
+REPORT_DEFAULT_DAYS = 30
+
+def record_ticket_transition(cursor, ticket, new_status, parts_cost=0):
+    """Apply one ticket update to the rollups; `ticket` is the row as it was before the update"""
+    if new_status not in REPORT_STATUSES:
+        raise ValueError(f"status must be one of {', '.join(REPORT_STATUSES)}")
+    technician_id = ticket['assigned_staff_id']
+    if technician_id is None:
+        return
+    now = datetime.now()
+    changed = ticket['status'] != new_status
+    
+    entered = {status: int(changed and status == new_status) for status in REPORT_STATUSES}
+    resolution_minutes = on_time = 0
+    if changed and new_status == 'COMPLETED':
+        if ticket.get('created_at'):
+            resolution_minutes = max(int((now - ticket['created_at']).total_seconds() // 60), 0)
+        scheduled = ticket.get('scheduled_date')
+        on_time = int(scheduled is None or now.date() <= scheduled.date())
+    
+    if changed or parts_cost:
+        cursor.execute("""
+            INSERT INTO technician_daily_stats (technician_id, stat_date, scheduled, in_progress, completed, cancelled,
+                                                resolution_minutes, completed_on_time, parts_cost)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                scheduled = scheduled + VALUES(scheduled), in_progress = in_progress + VALUES(in_progress),
+                completed = completed + VALUES(completed), cancelled = cancelled + VALUES(cancelled),
+                resolution_minutes = resolution_minutes + VALUES(resolution_minutes),
+                completed_on_time = completed_on_time + VALUES(completed_on_time),
+                parts_cost = parts_cost + VALUES(parts_cost)
+        """, (technician_id, now.date(), entered['SCHEDULED'], entered['IN_PROGRESS'], entered['COMPLETED'],
+              entered['CANCELLED'], resolution_minutes, on_time, parts_cost))
+    
+    if changed:
+        cursor.execute("""
+            INSERT INTO ticket_status_events (ticket_id, technician_id, status, changed_at, resolution_minutes, completed_on_time)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, (ticket.get('id'), technician_id, new_status, now, resolution_minutes, on_time))
+
+def rebuild_report_rollups(cursor):
+    """Recompute technician_daily_stats from the status event log and the parts used -
+    every column record_ticket_transition maintains, e.g. after a manual data fix"""
+    cursor.execute("DELETE FROM technician_daily_stats")
+    cursor.execute("""
+        INSERT INTO technician_daily_stats (technician_id, stat_date, scheduled, in_progress, completed, cancelled,
+                                            resolution_minutes, completed_on_time)
+        SELECT technician_id, DATE(changed_at),
+               SUM(CASE WHEN status = 'SCHEDULED' THEN transitions ELSE 0 END),
+               SUM(CASE WHEN status = 'IN_PROGRESS' THEN transitions ELSE 0 END),
+               SUM(CASE WHEN status = 'COMPLETED' THEN transitions ELSE 0 END),
+               SUM(CASE WHEN status = 'CANCELLED' THEN transitions ELSE 0 END),
+               SUM(resolution_minutes), SUM(completed_on_time)
+        FROM ticket_status_events
+        GROUP BY technician_id, DATE(changed_at)
+    """)
+    cursor.execute("""
+        INSERT INTO technician_daily_stats (technician_id, stat_date, parts_cost)
+        SELECT st.assigned_staff_id, DATE(p.created_at), SUM(p.quantity * p.unit_cost)
+        FROM service_ticket_parts p JOIN service_tickets st ON st.id = p.ticket_id
+        WHERE st.assigned_staff_id IS NOT NULL
+        GROUP BY st.assigned_staff_id, DATE(p.created_at)
+        ON DUPLICATE KEY UPDATE parts_cost = VALUES(parts_cost)
+    """)
+
+def get_ticket_counts(cursor, technician_id):
+    cursor.execute("""
+        SELECT status, COUNT(*) FROM service_tickets WHERE assigned_staff_id = %s GROUP BY status
+    """, (technician_id,))
+    counts = {status: 0 for status in REPORT_STATUSES}
+    counts.update({row[0]: int(row[1]) for row in cursor.fetchall()})
+    return counts
+
+def get_report_summary(cursor, technician_id, start, end):
+    cursor.execute("""
+        SELECT COALESCE(SUM(scheduled), 0), COALESCE(SUM(in_progress), 0), COALESCE(SUM(completed), 0),
+               COALESCE(SUM(cancelled), 0), COALESCE(SUM(resolution_minutes), 0),
+               COALESCE(SUM(completed_on_time), 0), COALESCE(SUM(parts_cost), 0)
+        FROM technician_daily_stats
+        WHERE technician_id = %s AND stat_date BETWEEN %s AND %s
+    """, (technician_id, start, end))
+    scheduled, in_progress, completed, cancelled, minutes, on_time, parts_cost = cursor.fetchone()
+    completed, cancelled = int(completed), int(cancelled)
+    return {
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "tickets": {"SCHEDULED": int(scheduled), "IN_PROGRESS": int(in_progress),
+                    "COMPLETED": completed, "CANCELLED": cancelled},
+        "avg_resolution_minutes": round(int(minutes) / completed, 1) if completed else None,
+        "completion_rate": round(100 * completed / (completed + cancelled), 1) if completed + cancelled else None,
+        "on_time_percentage": round(100 * int(on_time) / completed, 1) if completed else None,
+        "parts_cost": float(parts_cost)
+    }
+
+def report_date_range():
+    """Parse ?from=&to= (YYYY-MM-DD), defaulting to the last REPORT_DEFAULT_DAYS days"""
+    end = datetime.strptime(request.args['to'], '%Y-%m-%d').date() if request.args.get('to') else datetime.now().date()
+    start = (datetime.strptime(request.args['from'], '%Y-%m-%d').date() if request.args.get('from')
+             else end - timedelta(days=REPORT_DEFAULT_DAYS - 1))
+    if start > end or (end - start).days >= REPORT_MAX_DAYS:
+        raise ValueError(f"'from' must be on or before 'to' and at most {REPORT_MAX_DAYS} days earlier")
+    return start, end
+
+@reports_ns.route('/summary')
+class ReportSummary(Resource):
+    @reports_ns.doc('get_report_summary', security='Bearer')
+    @reports_ns.param('from', 'First day (YYYY-MM-DD), default 30 days ago')
+    @reports_ns.param('to', 'Last day (YYYY-MM-DD), default today')
+    @token_required
+    def get(self, current_user):
+        """Totals and rates for the technician over a date range"""
+        technician_id = int(current_user.get('sub', 1))
+        try:
+            start, end = report_date_range()
+        except ValueError as e:
+            return {"message": f"Invalid date range: {e}", "status": False, "data": None}, 400
+        
+        with get_db_connection(read_only=True) as conn:
+            if not conn:
+                return {"message": "Database connection failed", "status": False, "data": None}, 500
+            cursor = conn.cursor()
+            summary = get_report_summary(cursor, technician_id, start, end)
+            summary["open_tickets"] = get_ticket_counts(cursor, technician_id)
+            cursor.close()
+        
+        return {
+            "message": "Report summary retrieved successfully",
+            "status": True,
+            "data": summary
+        }
+
+@reports_ns.route('/daily')
+class ReportDaily(Resource):
+    @reports_ns.doc('get_daily_report', security='Bearer')
+    @reports_ns.param('from', 'First day (YYYY-MM-DD), default 30 days ago')
+    @reports_ns.param('to', 'Last day (YYYY-MM-DD), default today')
+    @token_required
+    def get(self, current_user):
+        """Per-day rollup rows for the technician; days without activity are omitted"""
+        technician_id = int(current_user.get('sub', 1))
+        try:
+            start, end = report_date_range()
+        except ValueError as e:
+            return {"message": f"Invalid date range: {e}", "status": False, "data": None}, 400
+        
+        with get_db_connection(read_only=True) as conn:
+            if not conn:
+                return {"message": "Database connection failed", "status": False, "data": None}, 500
+            cursor = conn.cursor(pymysql.cursors.DictCursor)
+            cursor.execute("""
+                SELECT stat_date, scheduled, in_progress, completed, cancelled, resolution_minutes,
+                       completed_on_time, parts_cost
+                FROM technician_daily_stats
+                WHERE technician_id = %s AND stat_date BETWEEN %s AND %s
+                ORDER BY stat_date
+            """, (technician_id, start, end))
+            days = [{
+                **row,
+                "stat_date": row['stat_date'].isoformat(),
+                "parts_cost": float(row['parts_cost'])
+            } for row in cursor.fetchall()]
+            cursor.close()
+        
+        return {
+            "message": "Daily report retrieved successfully",
+            "status": True,
+            "data": {"from": start.isoformat(), "to": end.isoformat(), "days": days}
+        }
 
 # ==================== INVENTORY ENDPOINTS ====================
+# Stock reservation - every stock change is a conditional UPDATE that covers all parts of a
+# request in one statement, so concurrent technicians can never take stock below zero
+class InsufficientStock(Exception):
+    def __init__(self, shortages):
+        super().__init__(f"Insufficient stock for part(s) {', '.join(str(s['part_id']) for s in shortages)}")
+        self.shortages = shortages
+
+def stock_quantities(parts):
+    """Sum quantities per inventory part id; parts without a part_id are not stock-tracked"""
+    quantities = {}
+    for part in parts:
+        if part.get('part_id') is None:
+            continue
+        part_id, quantity = int(part['part_id']), int(part.get('quantity', 1))
+        if quantity < 1:
+            raise ValueError(f"Quantity for part {part_id} must be at least 1")
+        quantities[part_id] = quantities.get(part_id, 0) + quantity
+    return quantities
+
+def quantity_case(quantities):
+    """CASE id WHEN ... THEN quantity END over sorted part ids, and its params"""
+    part_ids = sorted(quantities)
+    case_sql = f"CASE id {' '.join(['WHEN %s THEN %s'] * len(part_ids))} END"
+    return case_sql, [value for part_id in part_ids for value in (part_id, quantities[part_id])]
+
+def take_stock(cursor, quantities, reserve=False):
+    """Take stock for several parts in one statement, or raise InsufficientStock.
+
+    The caller must roll back on InsufficientStock - parts that did have
+    enough stock were already decremented. Ids are locked in primary key
+    order, so concurrent requests cannot deadlock on each other.
+    """
+    if not quantities:
+        return
+    part_ids = sorted(quantities)
+    placeholders = ', '.join(['%s'] * len(part_ids))
+    case_sql, case_params = quantity_case(quantities)
+    
+    assignments = [f"quantity_available = quantity_available - {case_sql}"]
+    params = list(case_params)
+    if reserve:
+        assignments.append(f"quantity_reserved = quantity_reserved + {case_sql}")
+        params += case_params
+    cursor.execute(f"""
+        UPDATE inventory SET {', '.join(assignments)}
+        WHERE id IN ({placeholders}) AND quantity_available >= {case_sql}
+    """, params + part_ids + case_params)
+    if cursor.rowcount == len(part_ids):
+        return
+    
+    cursor.execute(f"SELECT id, quantity_available FROM inventory WHERE id IN ({placeholders})", part_ids)
+    available = {row[0]: row[1] for row in cursor.fetchall()}
+    raise InsufficientStock([
+        {"part_id": part_id, "requested": quantities[part_id], "available": available.get(part_id, 0)}
+        for part_id in part_ids if available.get(part_id, 0) < quantities[part_id]
+    ])
+
+def reserve_parts(cursor, technician_id, request_id, parts):
+    """Hold stock for a parts request until it is used on a ticket"""
+    quantities = stock_quantities(parts)
+    take_stock(cursor, quantities, reserve=True)
+    cursor.executemany("""
+        INSERT INTO inventory_reservations (request_id, technician_id, part_id, quantity, status)
+        VALUES (%s, %s, %s, %s, 'reserved')
+    """, [(request_id, technician_id, part_id, quantity) for part_id, quantity in quantities.items()])
+    return quantities
+
+def consume_parts(cursor, technician_id, ticket_id, parts):
+    """Use parts on a ticket - from the technician's own reservations first, then from free stock"""
+    remaining = stock_quantities(parts)
+    if not remaining:
+        return
+    
+    # Delivered reservations are parts already in the technician's van
+    cursor.execute(f"""
+        SELECT id, part_id, quantity, status FROM inventory_reservations
+        WHERE technician_id = %s AND status IN ('reserved', 'delivered') AND part_id IN ({', '.join(['%s'] * len(remaining))})
+        ORDER BY id FOR UPDATE
+    """, [technician_id] + sorted(remaining))
+    from_reserved = {}
+    consumed_ids = []
+    for reservation_id, part_id, quantity, status in cursor.fetchall():
+        used = min(quantity, remaining[part_id])
+        if not used:
+            continue
+        if used == quantity:
+            consumed_ids.append(reservation_id)
+        else:
+            cursor.execute("UPDATE inventory_reservations SET quantity = quantity - %s WHERE id = %s", (used, reservation_id))
+        if status == 'reserved':
+            from_reserved[part_id] = from_reserved.get(part_id, 0) + used
+        remaining[part_id] -= used
+    
+    if consumed_ids:
+        cursor.execute(f"""
+            UPDATE inventory_reservations SET status = 'consumed', ticket_id = %s
+            WHERE id IN ({', '.join(['%s'] * len(consumed_ids))})
+        """, [ticket_id] + consumed_ids)
+    if from_reserved:
+        part_ids = sorted(from_reserved)
+        case_sql, case_params = quantity_case(from_reserved)
+        cursor.execute(f"""
+            UPDATE inventory SET quantity_reserved = quantity_reserved - {case_sql}
+            WHERE id IN ({', '.join(['%s'] * len(part_ids))})
+        """, case_params + part_ids)
+    take_stock(cursor, {part_id: quantity for part_id, quantity in remaining.items() if quantity})
+
+# Parts request lifecycle - reservations are held until the request settles
+PARTS_REQUEST_TRANSITIONS = {
+    'pending_approval': ('approved', 'rejected', 'cancelled'),
+    'approved': ('delivered', 'cancelled'),
+}
+
+class PartsRequestNotFound(Exception):
+    def __init__(self, request_id):
+        super().__init__(f"Parts request {request_id} not found")
+
+class InvalidTransition(Exception):
+    def __init__(self, current, status):
+        super().__init__(f"Cannot change a {current} parts request to {status}")
+
+def release_reservations(cursor, request_id, delivered=False):
+    """Settle a request's outstanding reservations; returns {part_id: quantity}.
+
+    Cancelled and rejected requests put the stock back. Delivered parts have left
+    the warehouse - they stop counting as reserved and stay with the technician
+    for consume_parts.
+    """
+    cursor.execute("""
+        SELECT id, part_id, quantity FROM inventory_reservations
+        WHERE request_id = %s AND status = 'reserved' ORDER BY id FOR UPDATE
+    """, (request_id,))
+    rows = cursor.fetchall()
+    if not rows:
+        return {}
+    quantities = {}
+    for _, part_id, quantity in rows:
+        quantities[part_id] = quantities.get(part_id, 0) + quantity
+    
+    reservation_ids = [row[0] for row in rows]
+    cursor.execute(f"""
+        UPDATE inventory_reservations SET status = %s WHERE id IN ({', '.join(['%s'] * len(reservation_ids))})
+    """, ['delivered' if delivered else 'released'] + reservation_ids)
+    part_ids = sorted(quantities)
+    case_sql, case_params = quantity_case(quantities)
+    assignments = [f"quantity_reserved = quantity_reserved - {case_sql}"]
+    params = list(case_params)
+    if not delivered:
+        assignments.append(f"quantity_available = quantity_available + {case_sql}")
+        params += case_params
+    cursor.execute(f"""
+        UPDATE inventory SET {', '.join(assignments)} WHERE id IN ({', '.join(['%s'] * len(part_ids))})
+    """, params + part_ids)
+    return quantities
+
+def change_parts_request_status(cursor, request_id, status, technician_id=None):
+    """Move a parts request along PARTS_REQUEST_TRANSITIONS and settle its reservations.
+
+    With technician_id set, only that technician's own requests are found.
+    """
+    query = "SELECT status FROM parts_requests WHERE request_id = %s"
+    params = [request_id]
+    if technician_id is not None:
+        query += " AND technician_id = %s"
+        params.append(technician_id)
+    cursor.execute(query + " FOR UPDATE", params)
+    row = cursor.fetchone()
+    if not row:
+        raise PartsRequestNotFound(request_id)
+    if status not in PARTS_REQUEST_TRANSITIONS.get(row[0], ()):
+        raise InvalidTransition(row[0], status)
+    
+    cursor.execute("UPDATE parts_requests SET status = %s WHERE request_id = %s", (status, request_id))
+    released = {}
+    if status in ('rejected', 'cancelled', 'delivered'):
+        released = release_reservations(cursor, request_id, delivered=status == 'delivered')
+    return {"previous_status": row[0], "released": released}
+
+# Parts request line items - one row per requested part, so demand can be aggregated in SQL
+PARTS_REQUEST_ITEM_COLUMNS = ('request_id', 'technician_id', 'part_id', 'part_name', 'quantity', 'urgency')
+
+def parts_request_item_rows(request_id, technician_id, parts):
+    return [(
+        request_id, technician_id,
+        int(part['part_id']) if part.get('part_id') is not None else None,
+        part.get('name'), int(part.get('quantity', 1)), part.get('urgency', 'normal')
+    ) for part in parts]
+
+def insert_parts_request_items(cursor, rows):
+    if rows:
+        cursor.executemany(f"""
+            INSERT INTO parts_request_items ({', '.join(PARTS_REQUEST_ITEM_COLUMNS)})
+            VALUES ({', '.join(['%s'] * len(PARTS_REQUEST_ITEM_COLUMNS))})
+        """, rows)
+
+def fetch_parts_request_items(cursor, request_ids):
+    """Line items for several requests in one query, keyed by request_id"""
+    items = {request_id: [] for request_id in request_ids}
+    if not request_ids:
+        return items
+    cursor.execute(f"""
+        SELECT i.request_id, i.part_id, i.part_name, i.quantity, i.urgency, inv.part_number, inv.name
+        FROM parts_request_items i
+        LEFT JOIN inventory inv ON inv.id = i.part_id
+        WHERE i.request_id IN ({', '.join(['%s'] * len(request_ids))})
+        ORDER BY i.id
+    """, list(request_ids))
+    for row in cursor.fetchall():
+        items[row['request_id']].append({
+            "part_id": row['part_id'],
+            "part_number": row['part_number'],
+            "name": row['name'] or row['part_name'],
+            "quantity": row['quantity'],
+            "urgency": row['urgency']
+        })
+    return items
+
+# Inventory listings - shared by every worker; any stock change invalidates them all
+INVENTORY_CACHE_SECONDS = int(os.getenv('INVENTORY_CACHE_SECONDS', 120))
+inventory_cache = TieredCache('inventory', INVENTORY_CACHE_SECONDS)
+
+def load_inventory_parts(category=None, location=None):
+    """(inventory, ttl) - nothing is cached when the database is unavailable"""
+    # Stock changes come from every technician, and this result is shared by all workers
+    # until the next change - a lagging replica would serve stale stock for the whole TTL
+    with get_db_connection(primary=True) as conn:
+        if not conn:
+            return None, 0
+        cursor = conn.cursor(pymysql.cursors.DictCursor)
+        query = "SELECT * FROM inventory WHERE 1=1"
+        params = []
+        
+        if category:
+            query += " AND category = %s"
+            params.append(category)
+        
+        if location:
+            query += " AND location = %s"
+            params.append(location)
+        
+        cursor.execute(query, params)
+        parts = cursor.fetchall()
+        
+        # Get categories and locations
+        cursor.execute("SELECT DISTINCT category FROM inventory")
+        categories = [row['category'] for row in cursor.fetchall()]
+        
+        cursor.execute("SELECT DISTINCT location FROM inventory")
+        locations = [row['location'] for row in cursor.fetchall()]
+        
+        cursor.close()
+    
+    return {
+        "parts": list(parts),
+        "total_count": len(parts),
+        "categories": categories,
+        "locations": locations
+    }, INVENTORY_CACHE_SECONDS
+
 @inventory_ns.route('/parts')
 class InventoryParts(Resource):
     @inventory_ns.doc('get_inventory_parts', security='Bearer')
     @inventory_ns.param('category', 'Filter by category')
     @inventory_ns.param('location', 'Filter by location', enum=['Van Inventory', 'Warehouse'])
-    @api.doc(security='Bearer')
     @token_required
     def get(self, current_user):
         """Get available parts inventory"""
         category = request.args.get('category')
         location = request.args.get('location')
         
-        with get_db_connection() as conn:
-            if conn:
-                cursor = conn.cursor(pymysql.cursors.DictCursor)
-                query = "SELECT * FROM inventory WHERE 1=1"
-                params = []
-                
-                if category:
-                    query += " AND category = %s"
-                    params.append(category)
-                
-                if location:
-                    query += " AND location = %s"
-                    params.append(location)
-                
-                cursor.execute(query, params)
-                parts = cursor.fetchall()
-                
-                # Get categories and locations
-                cursor.execute("SELECT DISTINCT category FROM inventory")
-                categories = [row['category'] for row in cursor.fetchall()]
-                
-                cursor.execute("SELECT DISTINCT location FROM inventory")
-                locations = [row['location'] for row in cursor.fetchall()]
-                
-                cursor.close()
-                
-                return {
-                    "message": "Inventory parts retrieved successfully",
-                    "status": True,
-                    "data": {
-                        "parts": parts,
-                        "total_count": len(parts),
-                        "categories": categories,
-                        "locations": locations
-                    }
-                }
+        inventory = inventory_cache.get('all', f"{category or ''}:{location or ''}",
+                                        lambda: load_inventory_parts(category, location))
+        if inventory:
+            return {
+                "message": "Inventory parts retrieved successfully",
+                "status": True,
+                "data": inventory
+            }
         
         return {
             "message": "No inventory data available",
@@ -1134,7 +3989,6 @@ class InventoryRequest(Resource):
     @inventory_ns.expect(inventory_request_model)
     @inventory_ns.doc('request_parts', security='Bearer')
     @inventory_ns.response(201, 'Parts request submitted')
-    @api.doc(security='Bearer')
     @token_required
     def post(self, current_user):
         """Request parts from inventory"""
@@ -1143,11 +3997,21 @@ class InventoryRequest(Resource):
         parts = data.get('parts', [])
         reason = data.get('reason', '')
         technician_id = int(current_user.get('sub', 1))
-        request_id = f"REQ{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        request_id = parts_request_ids.next_id()
         
         with get_db_connection() as conn:
             if conn:
                 cursor = conn.cursor()
+                try:
+                    item_rows = parts_request_item_rows(request_id, technician_id, parts)
+                    reserved = reserve_parts(cursor, technician_id, request_id, parts)
+                except (TypeError, ValueError) as e:
+                    conn.rollback()
+                    return {"message": f"Invalid parts: {e}", "status": False, "data": None}, 400
+                except InsufficientStock as e:
+                    conn.rollback()
+                    return {"message": str(e), "status": False, "data": {"shortages": e.shortages}}, 409
+                
                 cursor.execute("""
                     INSERT INTO parts_requests (request_id, technician_id, status, reason, parts_requested, parts_count, estimated_delivery)
                     VALUES (%s, %s, %s, %s, %s, %s, %s)
@@ -1156,8 +4020,12 @@ class InventoryRequest(Resource):
                     json.dumps(parts), len(parts), 
                     (datetime.now() + timedelta(days=2)).date()
                 ))
+                insert_parts_request_items(cursor, item_rows)
                 conn.commit()
                 cursor.close()
+                inventory_cache.invalidate('all')
+            else:
+                return {"message": "Database connection failed", "status": False, "data": None}, 500
         
         return {
             "message": "Parts request submitted successfully",
@@ -1169,6 +4037,7 @@ class InventoryRequest(Resource):
                 "estimated_delivery": (datetime.now() + timedelta(days=2)).strftime('%Y-%m-%d'),
                 "status": "pending_approval",
                 "reason": reason,
+                "reserved": [{"part_id": part_id, "quantity": quantity} for part_id, quantity in reserved.items()],
                 "submitted_at": datetime.now().isoformat()
             }
         }, 201
@@ -1176,8 +4045,7 @@ class InventoryRequest(Resource):
 @inventory_ns.route('/requests')
 class InventoryRequests(Resource):
     @inventory_ns.doc('get_inventory_requests', security='Bearer')
-    @inventory_ns.param('status', 'Filter by status', enum=['pending_approval', 'approved', 'delivered', 'cancelled'])
-    @api.doc(security='Bearer')
+    @inventory_ns.param('status', 'Filter by status', enum=['pending_approval', 'approved', 'rejected', 'delivered', 'cancelled'])
     @token_required
     def get(self, current_user):
         """Get technician's parts requests"""
@@ -1187,7 +4055,10 @@ class InventoryRequests(Resource):
         with get_db_connection() as conn:
             if conn:
                 cursor = conn.cursor(pymysql.cursors.DictCursor)
-                query = "SELECT * FROM parts_requests WHERE technician_id = %s"
+                query = """
+                    SELECT id, request_id, technician_id, status, reason, parts_count, estimated_delivery, created_at
+                    FROM parts_requests WHERE technician_id = %s
+                """
                 params = [technician_id]
                 
                 if status:
@@ -1197,12 +4068,14 @@ class InventoryRequests(Resource):
                 query += " ORDER BY created_at DESC"
                 cursor.execute(query, params)
                 requests = cursor.fetchall()
+                items = fetch_parts_request_items(cursor, [req['request_id'] for req in requests])
                 
                 # Convert datetime objects
                 for req in requests:
                     for key, value in req.items():
                         if hasattr(value, 'isoformat'):
                             req[key] = value.isoformat()
+                    req['parts_requested'] = items[req['request_id']]
                 
                 cursor.close()
                 
@@ -1221,9 +4094,531 @@ class InventoryRequests(Resource):
             "data": {"requests": [], "total_count": 0}
         }
 
+@inventory_ns.route('/requests/<string:request_id>/status')
+class InventoryRequestStatus(Resource):
+    @inventory_ns.expect(parts_request_status_model)
+    @inventory_ns.doc('update_parts_request_status', security='Bearer')
+    @inventory_ns.response(200, 'Status updated successfully')
+    @inventory_ns.response(404, 'Parts request not found')
+    @inventory_ns.response(409, 'Status change not allowed')
+    @token_required
+    def put(self, request_id, current_user):
+        """Approve, reject, cancel or deliver a parts request; settled requests release their stock"""
+        status = (request.get_json() or {}).get('status')
+        if status not in ('approved', 'rejected', 'cancelled', 'delivered'):
+            return {"message": "Invalid status", "status": False, "data": None}, 400
+        # Technicians may cancel their own requests; everything else needs a dispatch role
+        if can_dispatch(current_user):
+            technician_id = None
+        elif status == 'cancelled':
+            technician_id = int(current_user.get('sub', 1))
+        else:
+            return {"message": "Not allowed to change this parts request", "status": False, "data": None}, 403
+        
+        with get_db_connection(read_only=False) as conn:
+            if not conn:
+                return {"message": "Database connection failed", "status": False, "data": None}, 500
+            cursor = conn.cursor()
+            try:
+                result = change_parts_request_status(cursor, request_id, status, technician_id)
+            except PartsRequestNotFound as e:
+                conn.rollback()
+                return {"message": str(e), "status": False, "data": None}, 404
+            except InvalidTransition as e:
+                conn.rollback()
+                return {"message": str(e), "status": False, "data": None}, 409
+            conn.commit()
+            cursor.close()
+        
+        if result['released']:
+            inventory_cache.invalidate('all')
+        return {
+            "message": "Parts request status updated successfully",
+            "status": True,
+            "data": {
+                "request_id": request_id,
+                "status": status,
+                "previous_status": result['previous_status'],
+                "released": [{"part_id": part_id, "quantity": quantity} for part_id, quantity in result['released'].items()]
+            }
+        }
+
+@inventory_ns.route('/demand/parts')
+class InventoryDemandByPart(Resource):
+    @inventory_ns.doc('get_demand_by_part', security='Bearer')
+    @inventory_ns.param('status', 'Request status to count', enum=['pending_approval', 'approved', 'rejected', 'delivered', 'cancelled'])
+    @token_required
+    def get(self, current_user):
+        """Requested quantity per part across all technicians"""
+        status = request.args.get('status', 'pending_approval')
+        
+        with get_db_connection(read_only=True) as conn:
+            if not conn:
+                return {"message": "Database connection failed", "status": False, "data": None}, 500
+            cursor = conn.cursor(pymysql.cursors.DictCursor)
+            cursor.execute("""
+                SELECT i.part_id, MAX(inv.part_number) AS part_number, MAX(COALESCE(inv.name, i.part_name)) AS name,
+                       SUM(i.quantity) AS quantity, COUNT(DISTINCT i.request_id) AS requests,
+                       COUNT(DISTINCT i.technician_id) AS technicians, MAX(inv.quantity_available) AS quantity_available
+                FROM parts_requests r
+                JOIN parts_request_items i ON i.request_id = r.request_id
+                LEFT JOIN inventory inv ON inv.id = i.part_id
+                WHERE r.status = %s
+                GROUP BY i.part_id
+                ORDER BY quantity DESC
+            """, (status,))
+            demand = [{**row, "quantity": int(row['quantity'])} for row in cursor.fetchall()]
+            cursor.close()
+        
+        return {
+            "message": "Parts demand retrieved successfully",
+            "status": True,
+            "data": {"status": status, "parts": demand, "total_count": len(demand)}
+        }
+
+@inventory_ns.route('/demand/locations')
+class InventoryDemandByLocation(Resource):
+    @inventory_ns.doc('get_demand_by_location', security='Bearer')
+    @inventory_ns.param('status', 'Request status to count', enum=['pending_approval', 'approved', 'rejected', 'delivered', 'cancelled'])
+    @token_required
+    def get(self, current_user):
+        """Requested quantity per stock location across all technicians"""
+        status = request.args.get('status', 'pending_approval')
+        
+        with get_db_connection(read_only=True) as conn:
+            if not conn:
+                return {"message": "Database connection failed", "status": False, "data": None}, 500
+            cursor = conn.cursor(pymysql.cursors.DictCursor)
+            cursor.execute("""
+                SELECT inv.location, SUM(i.quantity) AS quantity, COUNT(DISTINCT i.part_id) AS parts,
+                       COUNT(DISTINCT i.request_id) AS requests
+                FROM parts_requests r
+                JOIN parts_request_items i ON i.request_id = r.request_id
+                LEFT JOIN inventory inv ON inv.id = i.part_id
+                WHERE r.status = %s
+                GROUP BY inv.location
+                ORDER BY quantity DESC
+            """, (status,))
+            demand = [{**row, "quantity": int(row['quantity'])} for row in cursor.fetchall()]
+            cursor.close()
+        
+        return {
+            "message": "Location demand retrieved successfully",
+            "status": True,
+            "data": {"status": status, "locations": demand, "total_count": len(demand)}
+        }
+
+# ==================== DISPATCH ENDPOINTS ====================
+# Per-worker grid index of the latest technician positions and open ticket locations.
+# It is loaded from the database every SPATIAL_REFRESH_SECONDS; in between, location
+# captures and status changes from any worker arrive through the shared store.
+SPATIAL_CELL_KM = float(os.getenv('SPATIAL_CELL_KM', 2))
+SPATIAL_REFRESH_SECONDS = int(os.getenv('SPATIAL_REFRESH_SECONDS', 60))
+SPATIAL_MAX_RADIUS_KM = 100
+SPATIAL_MAX_RESULTS = 50
+DISPATCH_ROLES = {role.strip() for role in os.getenv('DISPATCH_ROLES', 'admin,dispatcher').split(',') if role.strip()}
+OPEN_TICKET_STATUSES = ('SCHEDULED', 'IN_PROGRESS')
+KM_PER_DEGREE = 111.32
+
+register_shared_table("""
+    CREATE TABLE IF NOT EXISTS spatial_events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT NOT NULL,
+        entity_id INTEGER NOT NULL,
+        latitude REAL,
+        longitude REAL,
+        status TEXT,
+        created_at REAL NOT NULL
+    )
+""")
+
+class SpatialIndex:
+    """Grid of SPATIAL_CELL_KM cells per kind ('technician' or 'ticket'); queries only
+    visit the cells that can hold a match, then check exact great-circle distances."""
+
+    def __init__(self, cell_km=SPATIAL_CELL_KM):
+        self.cell_deg = cell_km / KM_PER_DEGREE
+        self.lock = threading.RLock()
+        self.points = {'technician': {}, 'ticket': {}}
+        self.cells = {'technician': {}, 'ticket': {}}
+        self.in_progress = {}
+        self.loaded_at = 0
+        self.last_event_id = 0
+
+    def cell(self, latitude, longitude):
+        return (math.floor(latitude / self.cell_deg), math.floor(longitude / self.cell_deg))
+
+    def upsert(self, kind, entity_id, latitude, longitude, meta):
+        with self.lock:
+            self.remove(kind, entity_id)
+            cell = self.cell(latitude, longitude)
+            self.points[kind][entity_id] = (latitude, longitude, cell, meta)
+            self.cells[kind].setdefault(cell, set()).add(entity_id)
+            if kind == 'ticket' and meta.get('status') == 'IN_PROGRESS':
+                self.in_progress[meta['technician_id']] = self.in_progress.get(meta['technician_id'], 0) + 1
+
+    def remove(self, kind, entity_id):
+        with self.lock:
+            point = self.points[kind].pop(entity_id, None)
+            if not point:
+                return None
+            members = self.cells[kind][point[2]]
+            members.discard(entity_id)
+            if not members:
+                del self.cells[kind][point[2]]
+            meta = point[3]
+            if kind == 'ticket' and meta.get('status') == 'IN_PROGRESS':
+                self.in_progress[meta['technician_id']] -= 1
+                if not self.in_progress[meta['technician_id']]:
+                    del self.in_progress[meta['technician_id']]
+            return point
+
+    def is_busy(self, technician_id):
+        return technician_id in self.in_progress
+
+    def ring_cells(self, center, ring, lng_scale):
+        # Cells at Chebyshev distance `ring`, with longitude steps widened by `lng_scale`
+        row, col = center
+        lng_ring = math.ceil(ring * lng_scale)
+        for dr in range(-ring, ring + 1):
+            for dc in range(-lng_ring, lng_ring + 1):
+                if abs(dr) == ring or abs(dc) > math.ceil((ring - 1) * lng_scale):
+                    yield (row + dr, col + dc)
+
+    def within(self, kind, latitude, longitude, radius_km):
+        """[(distance_km, entity_id, meta)] within radius_km, nearest first"""
+        lat_cells = math.ceil(radius_km / KM_PER_DEGREE / self.cell_deg)
+        lng_cells = math.ceil(radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01)) / self.cell_deg)
+        row, col = self.cell(latitude, longitude)
+        matches = []
+        with self.lock:
+            cells, points = self.cells[kind], self.points[kind]
+            for r in range(row - lat_cells, row + lat_cells + 1):
+                for c in range(col - lng_cells, col + lng_cells + 1):
+                    for entity_id in cells.get((r, c), ()):
+                        lat, lng, _, meta = points[entity_id]
+                        distance = haversine_km((latitude, longitude), (lat, lng))
+                        if distance <= radius_km:
+                            matches.append((distance, entity_id, meta))
+        matches.sort(key=lambda match: match[0])
+        return matches
+
+    def nearest(self, kind, latitude, longitude, k, max_km=SPATIAL_MAX_RADIUS_KM, accept=None):
+        """Up to k [(distance_km, entity_id, meta)] within max_km, searching outwards ring by ring"""
+        cos_lat = max(math.cos(math.radians(latitude)), 0.01)
+        cell_km = self.cell_deg * KM_PER_DEGREE * cos_lat
+        center = self.cell(latitude, longitude)
+        found = []
+        with self.lock:
+            cells, points = self.cells[kind], self.points[kind]
+            for ring in range(int(max_km / cell_km) + 2):
+                for cell in self.ring_cells(center, ring, 1 / cos_lat):
+                    for entity_id in cells.get(cell, ()):
+                        lat, lng, _, meta = points[entity_id]
+                        if accept and not accept(entity_id, meta):
+                            continue
+                        distance = haversine_km((latitude, longitude), (lat, lng))
+                        if distance <= max_km:
+                            found.append((distance, entity_id, meta))
+                found.sort(key=lambda match: match[0])
+                # Anything not yet visited is at least `ring` cells away
+                if len(found) >= k and found[k - 1][0] <= ring * cell_km:
+                    break
+        return found[:k]
+
+    def publish(self, kind, entity_id, latitude=None, longitude=None, status=None):
+        if kind == 'technician':
+            try:
+                latitude, longitude = parse_coordinates(latitude, longitude)
+            except ValueError as e:
+                log.warning("Spatial event dropped", kind=kind, entity_id=entity_id, error=str(e))
+                return
+        try:
+            get_shared_store().execute(
+                "INSERT INTO spatial_events (kind, entity_id, latitude, longitude, status, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (kind, entity_id, latitude, longitude, status, time.time()))
+        except sqlite3.Error as e:
+            log.warning("Spatial event publish failed", error=str(e))
+
+    def apply(self, kind, entity_id, latitude, longitude, status):
+        if kind == 'technician':
+            latitude, longitude = parse_coordinates(latitude, longitude)
+            self.upsert(kind, entity_id, latitude, longitude, {"updated_at": datetime.now().isoformat()})
+            return
+        point = self.points['ticket'].get(entity_id)
+        if status and status not in OPEN_TICKET_STATUSES:
+            self.remove('ticket', entity_id)
+        elif point:
+            # Tickets not in the index yet are picked up by the next full load
+            self.upsert('ticket', entity_id, point[0], point[1], {**point[3], "status": status or point[3]['status']})
+
+    def sync(self):
+        """Reload when stale, then apply events published since the last sync"""
+        if time.time() - self.loaded_at >= SPATIAL_REFRESH_SECONDS:
+            self.load()
+        rows = get_shared_store().execute(
+            "SELECT id, kind, entity_id, latitude, longitude, status FROM spatial_events WHERE id > ? ORDER BY id",
+            (self.last_event_id,)).fetchall()
+        with self.lock:
+            for event_id, kind, entity_id, latitude, longitude, status in rows:
+                try:
+                    self.apply(kind, entity_id, latitude, longitude, status)
+                except (TypeError, ValueError) as e:
+                    # Skip it - one bad row must not stop every worker from syncing
+                    log.warning("Spatial event skipped", event_id=event_id, kind=kind, error=str(e))
+                self.last_event_id = event_id
+
+    def load(self):
+        store = get_shared_store()
+        store.execute("DELETE FROM spatial_events WHERE created_at < ?", (time.time() - 2 * SPATIAL_REFRESH_SECONDS,))
+        last_event_id = store.execute("SELECT COALESCE(MAX(id), 0) FROM spatial_events").fetchone()[0]
+        with get_db_connection(read_only=True) as conn:
+            if not conn:
+                return
+            cursor = conn.cursor(pymysql.cursors.DictCursor)
+            cursor.execute("""
+                SELECT st.assigned_staff_id, st.technician_latitude, st.technician_longitude, st.location_captured_at
+                FROM service_tickets st
+                JOIN (
+                    SELECT assigned_staff_id, MAX(location_captured_at) AS captured_at FROM service_tickets
+                    WHERE location_captured_at IS NOT NULL GROUP BY assigned_staff_id
+                ) latest ON latest.assigned_staff_id = st.assigned_staff_id AND latest.captured_at = st.location_captured_at
+            """)
+            technicians = cursor.fetchall()
+            cursor.execute(f"""
+                SELECT st.id, st.ticket_number, st.assigned_staff_id, st.status, st.priority,
+                       COALESCE(c.latitude, st.technician_latitude) AS latitude,
+                       COALESCE(c.longitude, st.technician_longitude) AS longitude
+                FROM service_tickets st
+                LEFT JOIN customers c ON st.customer_id = c.id
+                WHERE st.status IN ({', '.join(['%s'] * len(OPEN_TICKET_STATUSES))})
+            """, OPEN_TICKET_STATUSES)
+            tickets = cursor.fetchall()
+            cursor.close()
+        
+        with self.lock:
+            self.points = {'technician': {}, 'ticket': {}}
+            self.cells = {'technician': {}, 'ticket': {}}
+            self.in_progress = {}
+            for row in technicians:
+                if row['technician_latitude'] is not None and row['technician_longitude'] is not None:
+                    self.upsert('technician', row['assigned_staff_id'], float(row['technician_latitude']),
+                                float(row['technician_longitude']), {"updated_at": row['location_captured_at'].isoformat()})
+            for row in tickets:
+                if row['latitude'] is not None and row['longitude'] is not None:
+                    self.upsert('ticket', row['id'], float(row['latitude']), float(row['longitude']), {
+                        "ticket_number": row['ticket_number'],
+                        "technician_id": row['assigned_staff_id'],
+                        "status": row['status'],
+                        "priority": row['priority']
+                    })
+            # Events older than this load are already reflected in the database
+            self.last_event_id = last_event_id
+            self.loaded_at = time.time()
+
+spatial_index = SpatialIndex()
+
+def parse_point(args):
+    """(lat, lng) from ?lat=&lng=, or None when neither is given"""
+    if args.get('lat') is None and args.get('lng') is None:
+        return None
+    return parse_coordinates(args.get('lat'), args.get('lng'))
+
+def can_dispatch(current_user):
+    """Dispatch roles may see other technicians' positions and settle their parts requests"""
+    return current_user.get('role') in DISPATCH_ROLES
+
+@dispatch_ns.route('/tickets/nearby')
+class NearbyTickets(Resource):
+    @dispatch_ns.doc('get_nearby_tickets', security='Bearer')
+    @dispatch_ns.param('lat', 'Latitude; with lng, overrides technician_id')
+    @dispatch_ns.param('lng', 'Longitude')
+    @dispatch_ns.param('technician_id', 'Search around this technician\'s last position (default: you; others need a dispatch role)', type=int)
+    @dispatch_ns.param('radius_km', 'Search radius in km', type=float, default=5)
+    @token_required
+    def get(self, current_user):
+        """Open tickets within a radius, nearest first"""
+        try:
+            point = parse_point(request.args)
+            technician_id = int(request.args.get('technician_id', current_user.get('sub', 1)))
+            radius_km = float(request.args.get('radius_km', 5))
+        except (KeyError, ValueError) as e:
+            return {"message": f"Invalid parameters: {e}", "status": False, "data": None}, 400
+        if technician_id != int(current_user.get('sub', 1)) and not can_dispatch(current_user):
+            return {"message": "Not allowed to look up other technicians", "status": False, "data": None}, 403
+        if not 0 < radius_km <= SPATIAL_MAX_RADIUS_KM:
+            return {"message": f"radius_km must be between 0 and {SPATIAL_MAX_RADIUS_KM}", "status": False, "data": None}, 400
+        
+        spatial_index.sync()
+        if point is None:
+            position = spatial_index.points['technician'].get(technician_id)
+            if not position:
+                return {"message": "No known position for technician", "status": False, "data": None}, 404
+            point = position[:2]
+        
+        matches = spatial_index.within('ticket', point[0], point[1], radius_km)[:SPATIAL_MAX_RESULTS]
+        return {
+            "message": "Nearby tickets retrieved successfully",
+            "status": True,
+            "data": {
+                "center": {"latitude": point[0], "longitude": point[1]},
+                "radius_km": radius_km,
+                "tickets": [{"ticket_id": ticket_id, "distance_km": round(distance, 3), **meta}
+                            for distance, ticket_id, meta in matches],
+                "total_count": len(matches)
+            }
+        }
+
+@dispatch_ns.route('/technicians/nearest')
+class NearestTechnicians(Resource):
+    @dispatch_ns.doc('get_nearest_technicians', security='Bearer')
+    @dispatch_ns.param('ticket_id', 'Search around this open ticket', type=int)
+    @dispatch_ns.param('lat', 'Latitude; with lng, overrides ticket_id')
+    @dispatch_ns.param('lng', 'Longitude')
+    @dispatch_ns.param('k', 'Number of technicians', type=int, default=5)
+    @dispatch_ns.param('available', 'Skip technicians with a ticket in progress', type='boolean', default=True)
+    @dispatch_ns.response(403, 'Dispatch role required')
+    @token_required
+    def get(self, current_user):
+        """Closest technicians by last known position"""
+        if not can_dispatch(current_user):
+            return {"message": "Dispatch role required", "status": False, "data": None}, 403
+        try:
+            point = parse_point(request.args)
+            k = int(request.args.get('k', 5))
+        except (KeyError, ValueError) as e:
+            return {"message": f"Invalid parameters: {e}", "status": False, "data": None}, 400
+        if not 1 <= k <= SPATIAL_MAX_RESULTS:
+            return {"message": f"k must be between 1 and {SPATIAL_MAX_RESULTS}", "status": False, "data": None}, 400
+        available_only = request.args.get('available', 'true').lower() == 'true'
+        
+        spatial_index.sync()
+        if point is None:
+            ticket = spatial_index.points['ticket'].get(request.args.get('ticket_id', type=int))
+            if not ticket:
+                return {"message": "Give lat/lng or the id of an open ticket with a known location", "status": False, "data": None}, 404
+            point = ticket[:2]
+        
+        accept = (lambda technician_id, meta: not spatial_index.is_busy(technician_id)) if available_only else None
+        matches = spatial_index.nearest('technician', point[0], point[1], k, accept=accept)
+        return {
+            "message": "Nearest technicians retrieved successfully",
+            "status": True,
+            "data": {
+                "center": {"latitude": point[0], "longitude": point[1]},
+                "technicians": [{
+                    "technician_id": technician_id,
+                    "distance_km": round(distance, 3),
+                    "busy": spatial_index.is_busy(technician_id),
+                    **meta
+                } for distance, technician_id, meta in matches],
+                "total_count": len(matches)
+            }
+        }
+
+# ==================== APP FACTORY ====================
+API_VERSION = '1.0'
+
+DEFAULT_CONFIG = {
+    'SECRET_KEY': SECRET_KEY,
+    'DB_CONFIG': DB_CONFIG,
+    'RATE_LIMIT_ENABLED': RATE_LIMIT_ENABLED,
+    # Swagger UI and the spec are off when SWAGGER_ENABLED=false, e.g. in production
+    'SWAGGER_ENABLED': os.getenv('SWAGGER_ENABLED', 'true').lower() == 'true',
+    # The spec only changes on deploy, so the cache file is keyed on this module's mtime
+    'OPENAPI_CACHE_PATH': os.getenv('OPENAPI_CACHE_PATH', os.path.join(
+        tempfile.gettempdir(), f"ostrich-openapi-{API_VERSION}-{int(os.path.getmtime(__file__))}.json"))
+}
+
+class CachedSpecApi(Api):
+    """Api that loads its Swagger spec from a file built once per deploy instead of per worker"""
+
+    @property
+    def __schema__(self):
+        if not self._schema:
+            cache_path = self.app.config.get('OPENAPI_CACHE_PATH')
+            if cache_path and os.path.exists(cache_path):
+                with open(cache_path) as f:
+                    self._schema = json.load(f)
+            else:
+                schema = super().__schema__
+                if cache_path and 'error' not in schema:
+                    # Write atomically - other workers may be reading the same file
+                    tmp_path = f"{cache_path}.{os.getpid()}"
+                    with open(tmp_path, 'w') as f:
+                        json.dump(schema, f)
+                    os.replace(tmp_path, cache_path)
+        return self._schema
+
+def create_app(config=None):
+    """Build the Flask app; `config` overrides the environment-derived DEFAULT_CONFIG.
+
+    Module settings are never changed - helpers read SECRET_KEY and DB_CONFIG from
+    current_app.config, so apps built with different config don't affect each other.
+    """
+    app = Flask(__name__)
+    app.config.update(DEFAULT_CONFIG)
+    app.config.update(config or {})
+    # A partial DB_CONFIG overrides single keys of the environment's
+    app.config['DB_CONFIG'] = {**DB_CONFIG, **app.config['DB_CONFIG']}
+    
+    CORS(app, origins="*", allow_headers=["Content-Type", "Authorization", "Idempotency-Key", "X-Request-ID"], expose_headers=["X-Request-ID"], methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"])
+    app.add_url_rule('/', 'api_root', api_root)
+    app.add_url_rule('/health', 'health_check', health_check)
+    configure_logging()
+    app.before_request(assign_request_id)
+    app.after_request(add_request_id_header)
+    app.before_request(start_request_budget)
+    app.before_request(enforce_rate_limit)
+    app.before_request(claim_idempotency_key)
+    app.after_request(store_idempotent_response)
+    app.teardown_request(release_idempotency_key)
+    
+    # Swagger API setup with comprehensive documentation
+    swagger_enabled = app.config['SWAGGER_ENABLED']
+    api = CachedSpecApi(
+        version=API_VERSION, 
+        title='Ostrich Service Technician API',
+        description='Complete API for Service Technician Mobile App - Test all endpoints with Swagger UI',
+        doc='/docs/' if swagger_enabled else False,
+        prefix=API_PREFIX,  # Add API prefix
+        authorizations={
+            'Bearer': {
+                'type': 'apiKey',
+                'in': 'header',
+                'name': 'Authorization',
+                'description': 'Add "Bearer " before your JWT token'
+            }
+        },
+        security='Bearer',
+        decorators=[abort_request_responses]
+    )
+    # Resources are collected first and bound to the app in one pass by init_app
+    for namespace in NAMESPACES:
+        api.add_namespace(namespace)
+    api.init_app(app, add_specs=swagger_enabled)
+    start_health_probe(app)
+    
+    @app.cli.command('build-openapi')
+    def build_openapi():
+        """Prebuild the cached OpenAPI spec, e.g. from a release phase"""
+        with app.test_request_context():
+            api.__schema__
+        print(f"OpenAPI spec written to {app.config['OPENAPI_CACHE_PATH']}")
+    
+    return app
+
+def __getattr__(name):
+    # `gunicorn main:app` still works - the app is built on first access, not at import
+    if name == 'app':
+        globals()['app'] = create_app()
+        return globals()['app']
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 if __name__ == '__main__':
     port = int(os.getenv('PORT', 8002))
     debug_mode = os.getenv('FLASK_ENV') == 'development'
+    app = create_app()
     print(f"Starting Ostrich Service Technician API on port {port}")
     print(f"Swagger UI available at: http://0.0.0.0:{port}/docs/")
     print(f"Test credentials: username='demo.tech', password='password123'")
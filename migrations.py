@@ -0,0 +1,464 @@
+"""Versioned schema migrations for the service tables.
+
+    python migrations.py upgrade        # apply pending migrations
+    python migrations.py status         # list applied / pending versions
+    python migrations.py rebuild-reports  # recompute report rollups from the status event log
+
+Every migration is idempotent (CREATE ... IF NOT EXISTS, index checks against
+information_schema) because MySQL DDL commits implicitly and cannot be rolled
+back if a later statement fails.
+"""
+import argparse
+import json
+import sys
+from datetime import datetime
+
+from main import get_db_connection, insert_parts_request_items, parts_request_item_rows, rebuild_report_rollups
+
+MIGRATION_LOCK = 'ostrich_service_migrations'
+
+def add_index(cursor, table, name, columns):
+    """Create an index unless one with the same name already exists"""
+    cursor.execute("""
+        SELECT 1 FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+        LIMIT 1
+    """, (table, name))
+    if not cursor.fetchone():
+        cursor.execute(f"CREATE INDEX {name} ON {table} ({', '.join(columns)})")
+
+def drop_index(cursor, table, name):
+    """Drop an index if it exists"""
+    cursor.execute("""
+        SELECT 1 FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+        LIMIT 1
+    """, (table, name))
+    if cursor.fetchone():
+        cursor.execute(f"DROP INDEX {name} ON {table}")
+
+def add_column(cursor, table, name, definition):
+    """Add a column unless it already exists"""
+    cursor.execute("""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+        LIMIT 1
+    """, (table, name))
+    if not cursor.fetchone():
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+
+# ==================== MIGRATIONS ====================
+def baseline_tables(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            username VARCHAR(100) NOT NULL UNIQUE,
+            password_hash VARCHAR(255),
+            first_name VARCHAR(100),
+            last_name VARCHAR(100),
+            email VARCHAR(255),
+            phone VARCHAR(20),
+            role VARCHAR(50) NOT NULL,
+            is_active TINYINT(1) NOT NULL DEFAULT 1,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS customers (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            contact_person VARCHAR(255),
+            phone VARCHAR(20),
+            email VARCHAR(255),
+            address TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS service_tickets (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            ticket_number VARCHAR(32) NOT NULL UNIQUE,
+            customer_id INT,
+            assigned_staff_id INT,
+            product_name VARCHAR(255),
+            product_model VARCHAR(100),
+            issue_description TEXT,
+            status VARCHAR(20) NOT NULL DEFAULT 'SCHEDULED',
+            priority VARCHAR(10) NOT NULL DEFAULT 'MEDIUM',
+            scheduled_date DATETIME,
+            completed_date DATETIME,
+            technician_notes TEXT,
+            work_performed TEXT,
+            technician_latitude DECIMAL(10, 7),
+            technician_longitude DECIMAL(10, 7),
+            location_captured_at DATETIME,
+            photos JSON,
+            photo_count INT NOT NULL DEFAULT 0,
+            customer_signature_url VARCHAR(255),
+            customer_signature_name VARCHAR(255),
+            signature_captured_at DATETIME,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS service_ticket_parts (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            ticket_id INT NOT NULL,
+            part_name VARCHAR(255),
+            quantity INT NOT NULL DEFAULT 1,
+            unit_cost DECIMAL(10, 2) NOT NULL DEFAULT 0,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS notifications (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT NOT NULL,
+            title VARCHAR(255),
+            message TEXT,
+            type VARCHAR(50),
+            is_read TINYINT(1) NOT NULL DEFAULT 0,
+            ticket_id INT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS otp_logs (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            phone_number VARCHAR(20) NOT NULL,
+            otp_code VARCHAR(10) NOT NULL,
+            purpose VARCHAR(20),
+            status VARCHAR(20) NOT NULL,
+            expires_at DATETIME NOT NULL,
+            verified_at DATETIME,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS parts_requests (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            request_id VARCHAR(32) NOT NULL UNIQUE,
+            technician_id INT NOT NULL,
+            status VARCHAR(32) NOT NULL,
+            reason TEXT,
+            parts_requested JSON,
+            parts_count INT NOT NULL DEFAULT 0,
+            estimated_delivery DATE,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS inventory (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            part_number VARCHAR(50) NOT NULL UNIQUE,
+            name VARCHAR(255) NOT NULL,
+            category VARCHAR(100),
+            quantity_available INT NOT NULL DEFAULT 0,
+            unit_cost DECIMAL(10, 2) NOT NULL DEFAULT 0,
+            location VARCHAR(100)
+        )
+    """)
+
+def notifications_archive(cursor):
+    # Needed by /notifications/bulk-archive; rows are copied with an explicit column list
+    cursor.execute("CREATE TABLE IF NOT EXISTS notifications_archive LIKE notifications")
+
+def hot_path_indexes(cursor):
+    add_index(cursor, 'service_tickets', 'idx_tickets_staff_status_date', ['assigned_staff_id', 'status', 'scheduled_date'])
+    add_index(cursor, 'service_ticket_parts', 'idx_ticket_parts_ticket', ['ticket_id'])
+    add_index(cursor, 'notifications', 'idx_notifications_user_read_created', ['user_id', 'is_read', 'created_at'])
+    add_index(cursor, 'notifications', 'idx_notifications_user_created', ['user_id', 'created_at'])
+    add_index(cursor, 'otp_logs', 'idx_otp_phone_status_expires', ['phone_number', 'status', 'expires_at'])
+    add_index(cursor, 'otp_logs', 'idx_otp_status_expires', ['status', 'expires_at'])
+    add_index(cursor, 'parts_requests', 'idx_parts_requests_tech_status_created', ['technician_id', 'status', 'created_at'])
+    add_index(cursor, 'users', 'idx_users_username_role', ['username', 'role'])
+    add_index(cursor, 'users', 'idx_users_phone_role', ['phone', 'role'])
+
+def inventory_reservations(cursor):
+    add_column(cursor, 'inventory', 'quantity_reserved', 'INT NOT NULL DEFAULT 0')
+    add_column(cursor, 'service_ticket_parts', 'part_id', 'INT NULL AFTER ticket_id')
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS inventory_reservations (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            request_id VARCHAR(32) NOT NULL,
+            technician_id INT NOT NULL,
+            part_id INT NOT NULL,
+            quantity INT NOT NULL,
+            status VARCHAR(20) NOT NULL DEFAULT 'reserved',
+            ticket_id INT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    add_index(cursor, 'inventory_reservations', 'idx_reservations_tech_status_part', ['technician_id', 'status', 'part_id'])
+    add_index(cursor, 'inventory_reservations', 'idx_reservations_request', ['request_id'])
+
+BACKFILL_CHUNK = 500
+
+def parts_request_items(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS parts_request_items (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            request_id VARCHAR(32) NOT NULL,
+            technician_id INT NOT NULL,
+            part_id INT,
+            part_name VARCHAR(255),
+            quantity INT NOT NULL DEFAULT 1,
+            urgency VARCHAR(20),
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    add_index(cursor, 'parts_request_items', 'idx_request_items_request', ['request_id'])
+    add_index(cursor, 'parts_request_items', 'idx_request_items_part', ['part_id', 'quantity'])
+    add_index(cursor, 'parts_requests', 'idx_parts_requests_status', ['status', 'request_id'])
+    
+    # Backfill from the JSON column, skipping requests that already have items
+    last_id = 0
+    while True:
+        cursor.execute("""
+            SELECT r.id, r.request_id, r.technician_id, r.parts_requested FROM parts_requests r
+            WHERE r.id > %s AND NOT EXISTS (SELECT 1 FROM parts_request_items i WHERE i.request_id = r.request_id)
+            ORDER BY r.id LIMIT %s
+        """, (last_id, BACKFILL_CHUNK))
+        requests = cursor.fetchall()
+        if not requests:
+            break
+        rows = []
+        for row_id, request_id, technician_id, parts_json in requests:
+            try:
+                parts = json.loads(parts_json or '[]')
+                rows += parts_request_item_rows(request_id, technician_id, [p for p in parts if isinstance(p, dict)])
+            except (TypeError, ValueError) as e:
+                print(f"Skipping parts request {request_id}: {e}")
+        insert_parts_request_items(cursor, rows)
+        last_id = requests[-1][0]
+
+def report_rollups(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS technician_daily_stats (
+            technician_id INT NOT NULL,
+            stat_date DATE NOT NULL,
+            scheduled INT NOT NULL DEFAULT 0,
+            in_progress INT NOT NULL DEFAULT 0,
+            completed INT NOT NULL DEFAULT 0,
+            cancelled INT NOT NULL DEFAULT 0,
+            resolution_minutes BIGINT NOT NULL DEFAULT 0,
+            completed_on_time INT NOT NULL DEFAULT 0,
+            parts_cost DECIMAL(12, 2) NOT NULL DEFAULT 0,
+            PRIMARY KEY (technician_id, stat_date)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS technician_ticket_counts (
+            technician_id INT NOT NULL,
+            status VARCHAR(20) NOT NULL,
+            tickets INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (technician_id, status)
+        )
+    """)
+    # Initial backfill - only completions can be recovered from service_tickets
+    cursor.execute("""
+        INSERT IGNORE INTO technician_daily_stats (technician_id, stat_date, completed, resolution_minutes, completed_on_time)
+        SELECT assigned_staff_id, DATE(completed_date), COUNT(*),
+               SUM(GREATEST(TIMESTAMPDIFF(MINUTE, created_at, completed_date), 0)),
+               SUM(scheduled_date IS NULL OR DATE(completed_date) <= DATE(scheduled_date))
+        FROM service_tickets
+        WHERE status = 'COMPLETED' AND completed_date IS NOT NULL AND assigned_staff_id IS NOT NULL
+        GROUP BY assigned_staff_id, DATE(completed_date)
+    """)
+
+def route_coordinates(cursor):
+    add_column(cursor, 'customers', 'latitude', 'DECIMAL(10, 7) NULL')
+    add_column(cursor, 'customers', 'longitude', 'DECIMAL(10, 7) NULL')
+    add_index(cursor, 'service_tickets', 'idx_tickets_staff_location_captured', ['assigned_staff_id', 'location_captured_at'])
+
+def open_ticket_index(cursor):
+    # SpatialIndex.load reads every open ticket
+    add_index(cursor, 'service_tickets', 'idx_tickets_status', ['status'])
+
+def id_sequences(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS id_sequences (
+            name VARCHAR(64) PRIMARY KEY,
+            next_value BIGINT NOT NULL
+        )
+    """)
+
+def technician_profiles(cursor):
+    add_column(cursor, 'users', 'career_start_date', 'DATE NULL')
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS technician_specializations (
+            technician_id INT NOT NULL,
+            specialization VARCHAR(100) NOT NULL,
+            PRIMARY KEY (technician_id, specialization)
+        )
+    """)
+
+def retention(cursor):
+    cursor.execute("CREATE TABLE IF NOT EXISTS parts_requests_archive LIKE parts_requests")
+    cursor.execute("CREATE TABLE IF NOT EXISTS parts_request_items_archive LIKE parts_request_items")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS retention_runs (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            policy VARCHAR(64) NOT NULL,
+            started_at DATETIME NOT NULL,
+            finished_at DATETIME NOT NULL,
+            rows_moved INT NOT NULL,
+            chunks INT NOT NULL,
+            seconds DECIMAL(10, 3) NOT NULL,
+            KEY idx_retention_runs_policy (policy, id)
+        )
+    """)
+    # Index the retention.py chunk queries so each chunk is a range scan
+    add_index(cursor, 'otp_logs', 'idx_otp_expires', ['expires_at'])
+    add_index(cursor, 'notifications', 'idx_notifications_read_created', ['is_read', 'created_at'])
+    add_index(cursor, 'parts_requests', 'idx_parts_requests_status_created', ['status', 'created_at'])
+
+def ticket_status_events(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ticket_status_events (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            ticket_id INT NULL,
+            technician_id INT NOT NULL,
+            status VARCHAR(20) NOT NULL,
+            changed_at DATETIME NOT NULL,
+            transitions INT NOT NULL DEFAULT 1,
+            resolution_minutes BIGINT NOT NULL DEFAULT 0,
+            completed_on_time INT NOT NULL DEFAULT 0,
+            KEY idx_status_events_tech_changed (technician_id, changed_at)
+        )
+    """)
+    # Seed one row per existing rollup day and status, so rebuilding reproduces today's rollups
+    cursor.execute("SELECT 1 FROM ticket_status_events LIMIT 1")
+    if not cursor.fetchone():
+        for status, column in [('SCHEDULED', 'scheduled'), ('IN_PROGRESS', 'in_progress'),
+                               ('COMPLETED', 'completed'), ('CANCELLED', 'cancelled')]:
+            totals = "resolution_minutes, completed_on_time" if status == 'COMPLETED' else "0, 0"
+            cursor.execute(f"""
+                INSERT INTO ticket_status_events (technician_id, status, changed_at, transitions,
+                                                  resolution_minutes, completed_on_time)
+                SELECT technician_id, %s, stat_date, {column}, {totals}
+                FROM technician_daily_stats WHERE {column} > 0
+            """, (status,))
+    # Per-status counts are read live from service_tickets now
+    cursor.execute("DROP TABLE IF EXISTS technician_ticket_counts")
+
+def drop_username_role_index(cursor):
+    # users.username is UNIQUE already, so this index only cost writes
+    drop_index(cursor, 'users', 'idx_users_username_role')
+
+def release_settled_reservations(cursor):
+    # Requests settled (or already archived) before reservations were released still hold stock
+    cursor.execute("""
+        SELECT v.id, v.part_id, v.quantity, r.status FROM inventory_reservations v
+        JOIN (SELECT request_id, status FROM parts_requests
+              UNION ALL SELECT request_id, status FROM parts_requests_archive) r ON r.request_id = v.request_id
+        WHERE v.status = 'reserved' AND r.status IN ('rejected', 'cancelled', 'delivered')
+    """)
+    reserved, returned, new_status = {}, {}, {}
+    for reservation_id, part_id, quantity, request_status in cursor.fetchall():
+        reserved[part_id] = reserved.get(part_id, 0) + quantity
+        if request_status != 'delivered':
+            returned[part_id] = returned.get(part_id, 0) + quantity
+        new_status.setdefault('delivered' if request_status == 'delivered' else 'released', []).append(reservation_id)
+    for part_id, quantity in reserved.items():
+        cursor.execute("""
+            UPDATE inventory SET quantity_reserved = quantity_reserved - %s, quantity_available = quantity_available + %s
+            WHERE id = %s
+        """, (quantity, returned.get(part_id, 0), part_id))
+    for status, ids in new_status.items():
+        for i in range(0, len(ids), BACKFILL_CHUNK):
+            chunk = ids[i:i + BACKFILL_CHUNK]
+            cursor.execute(f"UPDATE inventory_reservations SET status = %s WHERE id IN ({', '.join(['%s'] * len(chunk))})",
+                           [status] + chunk)
+
+MIGRATIONS = [
+    (1, 'baseline tables', baseline_tables),
+    (2, 'notifications archive', notifications_archive),
+    (3, 'hot path indexes', hot_path_indexes),
+    (4, 'inventory reservations', inventory_reservations),
+    (5, 'parts request items', parts_request_items),
+    (6, 'report rollups', report_rollups),
+    (7, 'route coordinates', route_coordinates),
+    (8, 'open ticket index', open_ticket_index),
+    (9, 'id sequences', id_sequences),
+    (10, 'technician profiles', technician_profiles),
+    (11, 'retention', retention),
+    (12, 'ticket status events', ticket_status_events),
+    (13, 'drop redundant username index', drop_username_role_index),
+    (14, 'release settled reservations', release_settled_reservations),
+]
+
+# ==================== RUNNER ====================
+def applied_versions(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            applied_at DATETIME NOT NULL
+        )
+    """)
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+def upgrade(target=None):
+    with get_db_connection() as conn:
+        if not conn:
+            print("Database connection failed")
+            return 1
+        cursor = conn.cursor()
+        # Only one process (e.g. one release dyno) migrates at a time
+        cursor.execute("SELECT GET_LOCK(%s, 60)", (MIGRATION_LOCK,))
+        if cursor.fetchone()[0] != 1:
+            print("Another migration is running")
+            return 1
+        try:
+            applied = applied_versions(cursor)
+            for version, name, migrate in MIGRATIONS:
+                if version in applied or (target is not None and version > target):
+                    continue
+                print(f"Applying {version:03d} {name}")
+                migrate(cursor)
+                cursor.execute("INSERT INTO schema_migrations (version, name, applied_at) VALUES (%s, %s, %s)",
+                               (version, name, datetime.now()))
+                conn.commit()
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (MIGRATION_LOCK,))
+            cursor.close()
+    print("Schema is up to date")
+    return 0
+
+def status():
+    with get_db_connection() as conn:
+        if not conn:
+            print("Database connection failed")
+            return 1
+        cursor = conn.cursor()
+        applied = applied_versions(cursor)
+        cursor.close()
+    for version, name, _ in MIGRATIONS:
+        print(f"{version:03d} {'applied' if version in applied else 'pending':8} {name}")
+    return 0
+
+def rebuild_reports():
+    # A repair tool, e.g. after fixing ticket_status_events or parts rows by hand
+    with get_db_connection() as conn:
+        if not conn:
+            print("Database connection failed")
+            return 1
+        cursor = conn.cursor()
+        rebuild_report_rollups(cursor)
+        conn.commit()
+        cursor.close()
+    print("Report rollups rebuilt")
+    return 0
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Ostrich service schema migrations')
+    parser.add_argument('command', choices=['upgrade', 'status', 'rebuild-reports'])
+    parser.add_argument('--target', type=int, help='Stop after this migration version')
+    args = parser.parse_args()
+
+    if args.command == 'upgrade':
+        sys.exit(upgrade(args.target))
+    elif args.command == 'status':
+        sys.exit(status())
+    sys.exit(rebuild_reports())
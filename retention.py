@@ -0,0 +1,190 @@
+"""Retention and archival for tables that only ever grow.
+
+    python retention.py run                 # one pass over every policy
+    python retention.py run --every 3600    # keep running, one pass per hour
+    python retention.py run --policy otp_logs --dry-run
+    python retention.py status              # rows due per policy and the last runs
+
+Rows are moved in chunks of RETENTION_CHUNK_SIZE primary keys, each chunk in
+its own short transaction, with a pause in between so request traffic is never
+stuck behind a long lock. Archived rows are copied to the *_archive table in the
+same transaction that deletes them.
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+from main import NOTIFICATION_COLUMNS, PARTS_REQUEST_ITEM_COLUMNS, get_db_connection
+
+RETENTION_LOCK = 'ostrich_service_retention'
+RETENTION_CHUNK_SIZE = int(os.getenv('RETENTION_CHUNK_SIZE', 500))
+RETENTION_PAUSE_SECONDS = float(os.getenv('RETENTION_PAUSE_SECONDS', 0.1))
+RETENTION_MAX_ROWS = int(os.getenv('RETENTION_MAX_ROWS', 200000))
+RETENTION_OTP_HOURS = int(os.getenv('RETENTION_OTP_HOURS', 24))
+RETENTION_NOTIFICATION_DAYS = int(os.getenv('RETENTION_NOTIFICATION_DAYS', 30))
+RETENTION_PARTS_REQUEST_DAYS = int(os.getenv('RETENTION_PARTS_REQUEST_DAYS', 90))
+
+PARTS_REQUEST_COLUMNS = ('id', 'request_id', 'technician_id', 'status', 'reason', 'parts_requested', 'parts_count',
+                         'estimated_delivery', 'created_at')
+PARTS_REQUEST_ITEM_ARCHIVE_COLUMNS = ('id',) + PARTS_REQUEST_ITEM_COLUMNS + ('created_at',)
+
+# ==================== POLICIES ====================
+# (name, table, archive table or None to purge, archived columns, WHERE clause, params,
+# ORDER BY, dependents). ORDER BY follows the index that serves the WHERE clause, so
+# each chunk is a short range read. Dependents are (table, archive table, column,
+# archived columns) rows that follow their parent's `column`. Archived columns are
+# named on both sides of the copy, so a column added to a live table can't shift values.
+def policies(now=None):
+    now = now or datetime.now()
+    return [
+        ('otp_logs', 'otp_logs', None, None,
+         "expires_at < %s", (now - timedelta(hours=RETENTION_OTP_HOURS),), 'expires_at, id', []),
+        ('notifications', 'notifications', 'notifications_archive', NOTIFICATION_COLUMNS,
+         "is_read = 1 AND created_at < %s", (now - timedelta(days=RETENTION_NOTIFICATION_DAYS),), 'created_at, id', []),
+        ('parts_requests', 'parts_requests', 'parts_requests_archive', PARTS_REQUEST_COLUMNS,
+         # A request whose reservations still hold stock stays until they are released
+         "status IN ('delivered', 'rejected', 'cancelled') AND created_at < %s AND NOT EXISTS ("
+         "SELECT 1 FROM inventory_reservations v WHERE v.request_id = parts_requests.request_id AND v.status = 'reserved')",
+         (now - timedelta(days=RETENTION_PARTS_REQUEST_DAYS),), 'created_at, id',
+         [('parts_request_items', 'parts_request_items_archive', 'request_id', PARTS_REQUEST_ITEM_ARCHIVE_COLUMNS)]),
+    ]
+
+# ==================== RUNNER ====================
+def copy_rows(cursor, table, archive, columns, column, keys):
+    """Copy the rows whose `column` is in keys into the archive table"""
+    column_list = ', '.join(columns)
+    cursor.execute(f"""
+        INSERT INTO {archive} ({column_list})
+        SELECT {column_list} FROM {table} WHERE {column} IN ({', '.join(['%s'] * len(keys))})
+    """, keys)
+
+def move_chunk(cursor, table, archive, columns, where, params, order, dependents):
+    """Archive (or purge) one chunk; returns the number of parent rows moved"""
+    # Pick candidates with a plain read, which takes no locks, then lock only those rows
+    # by primary key, re-checking the predicate in case one changed in between
+    cursor.execute(f"SELECT id FROM {table} WHERE {where} ORDER BY {order} LIMIT %s", params + (RETENTION_CHUNK_SIZE,))
+    candidates = [row[0] for row in cursor.fetchall()]
+    if not candidates:
+        return 0
+    key_columns = ['id'] + [column for _, _, column, _ in dependents]
+    cursor.execute(f"""
+        SELECT {', '.join(key_columns)} FROM {table}
+        WHERE id IN ({', '.join(['%s'] * len(candidates))}) AND {where} FOR UPDATE
+    """, candidates + list(params))
+    rows = cursor.fetchall()
+    if not rows:
+        # Every candidate changed under us; the next pass picks fresh ones
+        return 0
+
+    for position, (child, child_archive, column, child_columns) in enumerate(dependents, 1):
+        keys = [row[position] for row in rows]
+        placeholders = ', '.join(['%s'] * len(keys))
+        if child_archive:
+            copy_rows(cursor, child, child_archive, child_columns, column, keys)
+        cursor.execute(f"DELETE FROM {child} WHERE {column} IN ({placeholders})", keys)
+
+    ids = [row[0] for row in rows]
+    placeholders = ', '.join(['%s'] * len(ids))
+    if archive:
+        copy_rows(cursor, table, archive, columns, 'id', ids)
+    cursor.execute(f"DELETE FROM {table} WHERE id IN ({placeholders})", ids)
+    return len(ids)
+
+def count_due(cursor, table, where, params):
+    cursor.execute(f"SELECT COUNT(*) FROM {table} WHERE {where}", params)
+    return cursor.fetchone()[0]
+
+def apply_policy(conn, name, table, archive, columns, where, params, order, dependents, dry_run=False):
+    cursor = conn.cursor()
+    started_at = datetime.now()
+    clock = time.monotonic()
+    moved = chunks = 0
+
+    if dry_run:
+        due = count_due(cursor, table, where, params)
+        cursor.close()
+        print(f"{name:15} {due} rows due (dry run)")
+        return due
+
+    while moved < RETENTION_MAX_ROWS:
+        count = move_chunk(cursor, table, archive, columns, where, params, order, dependents)
+        conn.commit()
+        if not count:
+            break
+        moved += count
+        chunks += 1
+        elapsed = time.monotonic() - clock
+        print(f"{name:15} chunk {chunks}: {moved} rows in {elapsed:.1f}s ({moved / max(elapsed, 0.001):.0f} rows/s)")
+        time.sleep(RETENTION_PAUSE_SECONDS)
+
+    elapsed = time.monotonic() - clock
+    cursor.execute("""
+        INSERT INTO retention_runs (policy, started_at, finished_at, rows_moved, chunks, seconds)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """, (name, started_at, datetime.now(), moved, chunks, round(elapsed, 3)))
+    conn.commit()
+    cursor.close()
+    print(f"{name:15} done: {moved} rows {'archived to ' + archive if archive else 'purged'} in {chunks} chunks, {elapsed:.1f}s")
+    return moved
+
+def run(selected=None, dry_run=False):
+    with get_db_connection() as conn:
+        if not conn:
+            print("Database connection failed")
+            return 1
+        cursor = conn.cursor()
+        # Only one process purges at a time; a second one just skips this pass
+        cursor.execute("SELECT GET_LOCK(%s, 0)", (RETENTION_LOCK,))
+        if cursor.fetchone()[0] != 1:
+            print("Another retention run is in progress")
+            return 1
+        try:
+            for name, table, archive, columns, where, params, order, dependents in policies():
+                if selected and name not in selected:
+                    continue
+                apply_policy(conn, name, table, archive, columns, where, params, order, dependents, dry_run)
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (RETENTION_LOCK,))
+            cursor.close()
+    return 0
+
+def status():
+    with get_db_connection() as conn:
+        if not conn:
+            print("Database connection failed")
+            return 1
+        cursor = conn.cursor()
+        for name, table, archive, _, where, params, _, _ in policies():
+            due = count_due(cursor, table, where, params)
+            cursor.execute("""
+                SELECT finished_at, rows_moved, seconds FROM retention_runs
+                WHERE policy = %s ORDER BY id DESC LIMIT 1
+            """, (name,))
+            last = cursor.fetchone()
+            last_run = f"last run {last[0]:%Y-%m-%d %H:%M} moved {last[1]} rows in {last[2]}s" if last else "never run"
+            print(f"{name:15} {due} rows due, {last_run}")
+        cursor.close()
+    return 0
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Ostrich service retention and archival')
+    parser.add_argument('command', choices=['run', 'status'])
+    parser.add_argument('--policy', action='append', choices=[policy[0] for policy in policies()],
+                        help='Only apply this policy (repeatable)')
+    parser.add_argument('--dry-run', action='store_true', help='Count rows due without moving them')
+    parser.add_argument('--every', type=int, help='Repeat the run every N seconds')
+    args = parser.parse_args()
+
+    if args.command == 'status':
+        sys.exit(status())
+    if not args.every:
+        sys.exit(run(args.policy, args.dry_run))
+    while True:
+        try:
+            run(args.policy, args.dry_run)
+        except Exception as e:
+            # A failed pass (e.g. database failover) must not stop the loop
+            print(f"Retention run failed: {e}")
+        time.sleep(args.every)
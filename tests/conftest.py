@@ -0,0 +1,67 @@
+"""Shared fixtures.
+
+Tests that need MySQL run against a local stand-in database given by TEST_DB_HOST
+(plus TEST_DB_PORT, TEST_DB_USER, TEST_DB_PASSWORD and TEST_DB_NAME, which must end
+in _test because it is dropped and recreated). They are skipped when it is not set
+or not reachable, e.g.
+
+    docker run -d -p 3306:3306 -e MYSQL_ALLOW_EMPTY_PASSWORD=1 mysql:8
+    TEST_DB_HOST=127.0.0.1 python -m pytest
+"""
+import os
+import sys
+import tempfile
+
+import pymysql
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+TEST_DB = {
+    'host': os.getenv('TEST_DB_HOST'),
+    'port': int(os.getenv('TEST_DB_PORT', 3306)),
+    'user': os.getenv('TEST_DB_USER', 'root'),
+    'password': os.getenv('TEST_DB_PASSWORD', ''),
+    'database': os.getenv('TEST_DB_NAME', 'ostrich_service_test'),
+}
+
+# main.py reads its settings at import time, so point it at the stand-in (or at
+# nothing) before anything imports it - tests must never reach the configured database
+os.environ.update({
+    'DB_HOST': TEST_DB['host'] or '127.0.0.1',
+    'DB_PORT': str(TEST_DB['port'] if TEST_DB['host'] else 9),
+    'DB_USER': TEST_DB['user'],
+    'DB_PASSWORD': TEST_DB['password'],
+    'DB_NAME': TEST_DB['database'],
+    'DB_SSL': os.getenv('TEST_DB_SSL', 'false'),
+    'DB_CONNECT_TIMEOUT': '2',
+    'DB_REPLICA_HOSTS': '',
+    'RATE_LIMIT_ENABLED': 'false',
+    'SHARED_STATE_PATH': os.path.join(tempfile.mkdtemp(prefix='ostrich-tests-'), 'shared.db'),
+    'OPENAPI_CACHE_PATH': '',
+})
+
+def connect_stand_in(database=None):
+    return pymysql.connect(host=TEST_DB['host'], port=TEST_DB['port'], user=TEST_DB['user'],
+                           password=TEST_DB['password'], database=database, connect_timeout=3, autocommit=True)
+
+@pytest.fixture(scope='session')
+def stand_in_db():
+    """A freshly migrated stand-in database; yields a connect() function for it"""
+    if not TEST_DB['host']:
+        pytest.skip("TEST_DB_HOST is not set - no stand-in MySQL database")
+    if not TEST_DB['database'].endswith('_test'):
+        pytest.fail("TEST_DB_NAME must end in _test, it is dropped and recreated")
+    try:
+        server = connect_stand_in()
+    except pymysql.Error as e:
+        pytest.skip(f"Stand-in database unreachable: {e}")
+    with server.cursor() as cursor:
+        cursor.execute(f"DROP DATABASE IF EXISTS `{TEST_DB['database']}`")
+        cursor.execute(f"CREATE DATABASE `{TEST_DB['database']}`")
+    server.close()
+
+    import migrations
+    assert migrations.upgrade() == 0
+    yield lambda: connect_stand_in(TEST_DB['database'])
@@ -0,0 +1,41 @@
+"""IDs handed out by several worker processes at once never collide.
+
+The allocator and the connection pool are created and used in this process before
+the workers fork, as under gunicorn, so each worker starts with an inherited block
+and inherited pooled connections that it must not reuse.
+"""
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import main
+
+PROCESSES = 6
+THREADS = 4
+IDS_PER_THREAD = 150
+
+allocators = {}
+
+def allocate(block_size):
+    """Runs in a forked worker: several threads drawing from the inherited allocator"""
+    allocator = allocators[block_size]
+    with ThreadPoolExecutor(THREADS) as executor:
+        batches = list(executor.map(lambda _: [allocator.next() for _ in range(IDS_PER_THREAD)], range(THREADS)))
+    return batches
+
+@pytest.mark.parametrize('block_size', [1, 7, 100])
+def test_ids_are_unique_across_processes(stand_in_db, block_size):
+    allocator = allocators[block_size] = main.IdAllocator(f'stress_{block_size}', 'T', block_size=block_size)
+    parent_values = [allocator.next() for _ in range(3)]
+
+    with multiprocessing.get_context('fork').Pool(PROCESSES) as pool:
+        results = pool.map(allocate, [block_size] * PROCESSES)
+
+    values = parent_values + [value for batches in results for batch in batches for value in batch]
+    assert len(values) == 3 + PROCESSES * THREADS * IDS_PER_THREAD
+    assert len(set(values)) == len(values), "the same id was handed out twice"
+    # Each thread sees its values increase
+    for batches in results:
+        for batch in batches:
+            assert batch == sorted(batch)
@@ -0,0 +1,246 @@
+"""EXPLAIN every SQL statement main.py runs, against the stand-in database.
+
+The scenario drives the API the way the mobile app does, plus the background and
+CLI-only helpers, while recording each statement main.py sends to MySQL. Every
+recorded statement is then EXPLAINed, and a full scan of a growing table that no
+index could serve fails. The statements come from main.py itself, so the check
+cannot drift from the real SQL. Every cursor.execute() call site in main.py must be
+reached by the scenario or be listed in NOT_EXERCISED, so new SQL is checked too.
+"""
+import ast
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+import bcrypt
+import pymysql
+import pytest
+
+import main
+
+# Tables that grow with usage; small lookup tables such as inventory may be scanned
+PLAN_CHECKED_TABLES = {
+    'users', 'service_tickets', 'service_ticket_parts', 'notifications', 'notifications_archive', 'otp_logs',
+    'parts_requests', 'parts_request_items', 'inventory_reservations', 'technician_daily_stats',
+    'ticket_status_events', 'technician_specializations',
+}
+EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+# Enclosing function -> why the scenario cannot reach its statements
+NOT_EXERCISED = {}
+
+MAIN_FILE = os.path.abspath(main.__file__)
+TECHNICIAN_ID, OTHER_TECHNICIAN_ID = 1, 2
+PHONE = '9876543210'
+
+def execute_call_sites():
+    """{line: enclosing function} for every cursor.execute/executemany call in main.py"""
+    with open(MAIN_FILE) as f:
+        tree = ast.parse(f.read())
+    sites = {}
+
+    def visit(node, scope):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.ClassDef)):
+                visit(child, f"{scope}.{child.name}" if scope else child.name)
+                continue
+            if (isinstance(child, ast.Call) and isinstance(child.func, ast.Attribute)
+                    and child.func.attr in ('execute', 'executemany')
+                    and isinstance(child.func.value, ast.Name) and child.func.value.id == 'cursor'):
+                sites[child.lineno] = scope
+            visit(child, scope)
+
+    visit(tree, '')
+    return sites
+
+class StatementRecorder:
+    """Patches pymysql so every statement is kept with the main.py line that sent it"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.statements = {}
+
+    def __enter__(self):
+        self.original = pymysql.cursors.Cursor.execute
+        recorder = self
+
+        def execute(cursor, query, args=None):
+            frame = sys._getframe(1)
+            while frame and os.path.abspath(frame.f_code.co_filename) != MAIN_FILE:
+                frame = frame.f_back
+            if frame:
+                with recorder.lock:
+                    recorder.statements.setdefault(frame.f_lineno, {}).setdefault(query, cursor.mogrify(query, args))
+            return recorder.original(cursor, query, args)
+
+        pymysql.cursors.Cursor.execute = execute
+        return self
+
+    def __exit__(self, *exc):
+        pymysql.cursors.Cursor.execute = self.original
+
+def seed(connect):
+    password_hash = bcrypt.hashpw(b'password123', bcrypt.gensalt(4)).decode()
+    now = datetime.now()
+    with connect() as conn, conn.cursor() as cursor:
+        cursor.executemany("""
+            INSERT INTO users (id, username, password_hash, first_name, last_name, email, phone, role)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, 'service_staff')
+        """, [(TECHNICIAN_ID, 'demo.tech', password_hash, 'Demo', 'Tech', 'demo@example.com', PHONE),
+              (OTHER_TECHNICIAN_ID, 'other.tech', password_hash, 'Other', 'Tech', 'other@example.com', '9876543220')])
+        cursor.execute("INSERT INTO technician_specializations VALUES (%s, 'Motors')", (TECHNICIAN_ID,))
+        cursor.executemany("""
+            INSERT INTO customers (id, contact_person, phone, address, latitude, longitude) VALUES (%s, %s, %s, %s, %s, %s)
+        """, [(1, 'Asha Rao', '9000000001', 'MG Road', 12.9716, 77.5946),
+              (2, 'Ravi Kumar', '9000000002', 'Indiranagar', 12.9784, 77.6408)])
+        cursor.executemany("""
+            INSERT INTO service_tickets (id, ticket_number, customer_id, assigned_staff_id, product_name,
+                                         issue_description, status, scheduled_date, completed_date,
+                                         technician_latitude, technician_longitude, location_captured_at)
+            VALUES (%s, %s, %s, %s, 'Pump motor', 'Motor overheating', %s, %s, %s, %s, %s, %s)
+        """, [(1, 'TKT0001', 1, TECHNICIAN_ID, 'SCHEDULED', now, None, None, None, None),
+              (2, 'TKT0002', 2, TECHNICIAN_ID, 'IN_PROGRESS', now, None, 12.97, 77.60, now),
+              (3, 'TKT0003', 1, TECHNICIAN_ID, 'COMPLETED', now - timedelta(days=1), now, None, None, None),
+              (4, 'TKT0004', 2, OTHER_TECHNICIAN_ID, 'SCHEDULED', now, None, 12.98, 77.64, now)])
+        cursor.executemany("""
+            INSERT INTO notifications (user_id, title, message, type, is_read, ticket_id, created_at)
+            VALUES (%s, 'Ticket assigned', 'A ticket was assigned to you', 'ticket', 0, 1, %s)
+        """, [(TECHNICIAN_ID, now - timedelta(hours=hours)) for hours in range(6)])
+        cursor.executemany("""
+            INSERT INTO inventory (id, part_number, name, category, quantity_available, unit_cost, location)
+            VALUES (%s, %s, %s, 'Motors', 10, 25.00, 'Warehouse')
+        """, [(1, 'P-001', 'Bearing'), (2, 'P-002', 'Capacitor')])
+
+def run_scenario(client):
+    token = main.create_access_token({"sub": str(TECHNICIAN_ID), "username": "demo.tech", "role": "dispatcher"})
+    headers = {"Authorization": f"Bearer {token}"}
+    api = main.API_PREFIX
+    today = datetime.now().strftime('%Y-%m-%d')
+
+    def call(method, path, expected=(200,), **kwargs):
+        response = getattr(client, method)(f"{api}{path}", headers=headers, **kwargs)
+        assert response.status_code in expected, (method, path, response.status_code, response.get_json())
+        return response.get_json()
+
+    call('post', '/auth/login', json={"username": "demo.tech", "password": "password123"})
+    call('post', '/auth/send-otp', json={"contact": PHONE})
+    call('post', '/auth/verify-otp', json={"contact": PHONE, "otp": "123456"})
+
+    call('get', '/dashboard/')
+    call('get', '/dashboard/home')
+
+    call('get', '/tickets/assigned')
+    call('get', '/tickets/completed')
+    call('get', '/tickets/', query_string={"ids": "1,2,3"})
+    call('get', '/tickets/1')
+    call('get', '/tickets/search', query_string={"q": "motor"})
+
+    notifications = call('get', '/notifications/')['data']['notifications']
+    ids = [notification['id'] for notification in notifications]
+    call('put', f"/notifications/{ids[0]}/read")
+    call('get', '/notifications/unread-count')
+    call('put', '/notifications/bulk-read', json={"ids": ids[1:3]})
+    call('put', '/notifications/bulk-archive', json={"ids": ids[3:4]})
+    call('put', '/notifications/bulk-delete', json={"ids": ids[4:5]})
+    call('put', '/notifications/mark-all-read')
+
+    call('get', '/schedule/', query_string={"date": today})
+    call('get', '/schedule/', query_string={"date": today, "optimize": "true"})
+    call('get', '/schedule/week')
+
+    call('get', '/profile/')
+    call('put', '/profile/', json={"phone": PHONE})
+
+    call('get', '/reports/summary')
+    call('get', '/reports/daily')
+
+    call('get', '/inventory/parts')
+    call('post', '/inventory/request', expected=(201,),
+         json={"parts": [{"part_id": 1, "name": "Bearing", "quantity": 2}], "reason": "Stock running low"})
+    call('post', '/inventory/request', expected=(409,),
+         json={"parts": [{"part_id": 2, "name": "Capacitor", "quantity": 1000}], "reason": "Too many"})
+    call('get', '/inventory/requests')
+    call('get', '/inventory/demand/parts')
+    call('get', '/inventory/demand/locations')
+
+    # Part 1 comes out of the reservation above, part 2 straight from stock
+    call('put', '/tickets/2/status', json={"status": "COMPLETED", "notes": "Done", "parts_used": [
+        {"part_id": 1, "name": "Bearing", "quantity": 1, "cost": 25},
+        {"part_id": 2, "name": "Capacitor", "quantity": 1, "cost": 25}]})
+    call('post', '/tickets/1/location', json={"latitude": 12.9716, "longitude": 77.5946})
+    call('post', '/tickets/1/photos')
+    call('post', '/tickets/1/signature', json={"customer_name": "Asha Rao"})
+    call('post', '/tickets/1/parts', json={"parts": [{"name": "Bearing", "quantity": 1, "cost": 25}]})
+    call('post', '/tickets/batch', json={"operations": [
+        # Uses up the rest of the part 1 reservation
+        {"op": "status", "ticket_id": 1, "status": "IN_PROGRESS", "parts_used": [
+            {"part_id": 1, "name": "Bearing", "quantity": 1, "cost": 25}]},
+        {"op": "location", "ticket_id": 1, "latitude": 12.97, "longitude": 77.59},
+        {"op": "signature", "ticket_id": 1, "customer_name": "Asha Rao"},
+        {"op": "parts", "ticket_id": 1, "parts": []},
+        {"op": "status", "ticket_id": 4, "status": "COMPLETED"},
+    ]})
+
+    # One request cancelled, so its stock goes back, and one delivered to the van
+    def parts_request():
+        return call('post', '/inventory/request', expected=(201,),
+                    json={"parts": [{"part_id": 2, "name": "Capacitor", "quantity": 1}]})['data']['request_id']
+    cancelled, delivered = parts_request(), parts_request()
+    call('put', f"/inventory/requests/{cancelled}/status", json={"status": "cancelled"})
+    call('put', f"/inventory/requests/{delivered}/status", json={"status": "approved"})
+    call('put', f"/inventory/requests/{delivered}/status", json={"status": "delivered"})
+    call('put', f"/inventory/requests/{delivered}/status", expected=(409,), json={"status": "cancelled"})
+
+    call('get', '/dispatch/tickets/nearby', query_string={"lat": 12.97, "lng": 77.6, "radius_km": 20})
+    call('get', '/dispatch/technicians/nearest', query_string={"lat": 12.97, "lng": 77.6, "available": "false"})
+
+    # Background and CLI-only paths
+    main.probe_databases()
+    otp_store = main.DatabaseOTPStore()
+    otp_store.save(PHONE, '654321', time.time() + 300)
+    otp_store.check(PHONE, '654321')
+    otp_store.discard(PHONE)
+    otp_store.purge_expired()
+    main.notification_broker.last_notification_id = 0
+    main.notification_broker.deliver_new_notifications([TECHNICIAN_ID])
+    with main.get_db_connection() as conn:
+        cursor = conn.cursor()
+        main.rebuild_report_rollups(cursor)
+        conn.commit()
+        cursor.close()
+
+def full_scans(cursor, statement):
+    cursor.execute(f"EXPLAIN {statement}")
+    columns = [column[0] for column in cursor.description]
+    plan = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    # Tiny tables are often scanned even with an index available; only a scan that
+    # no index could have served is a problem
+    return [row for row in plan
+            if row.get('type') == 'ALL' and row.get('table') in PLAN_CHECKED_TABLES and not row.get('possible_keys')]
+
+@pytest.fixture(scope='module')
+def recorded_statements(stand_in_db):
+    seed(stand_in_db)
+    app = main.create_app({'TESTING': True})
+    with StatementRecorder() as recorder:
+        run_scenario(app.test_client())
+    return recorder.statements
+
+def test_every_call_site_is_exercised(recorded_statements):
+    missing = {line: scope for line, scope in execute_call_sites().items()
+               if line not in recorded_statements and scope not in NOT_EXERCISED}
+    assert not missing, f"main.py statements not reached by the scenario: {missing}"
+
+def test_no_unindexed_full_scans(stand_in_db, recorded_statements):
+    failures = []
+    with stand_in_db() as conn, conn.cursor() as cursor:
+        for line, statements in sorted(recorded_statements.items()):
+            for statement in statements.values():
+                keyword = statement.lstrip().split(None, 1)[0].upper()
+                if keyword not in EXPLAINABLE or (keyword == 'SELECT' and not re.search(r'\bFROM\b', statement, re.I)):
+                    continue
+                for row in full_scans(cursor, statement):
+                    failures.append(f"main.py:{line} scans {row['table']}: {' '.join(statement.split())[:200]}")
+    assert not failures, "\n".join(failures)